@@ -0,0 +1,157 @@
+import inspect
+import json
+import time
+from functools import wraps
+
+from PySide6 import QtCore
+
+# The actions of MainGUI that are recorded and can be replayed by replayActions
+RECORDED_ACTIONS = ['event_next_frame', 'event_previous_frame', 'event_jump_forward', 'event_jump_backward',
+                    'event_go_to_frame', 'event_frame_slider', 'event_quality_strip', 'event_move_to_index',
+                    'event_next_low_confidence', 'event_next_divergent', 'event_mark_start', 'event_mark_end',
+                    'event_swap_frame', 'event_swap_sequence', 'event_propagate_forward', 'event_propagate_backward',
+                    'event_relabel_animals', 'event_label_point', 'event_done_labeling', 'event_find_bad_tracking',
+                    'event_fix_jumps']
+# The actions that load another video or h5 file. The files are recorded instead, as a load entry
+LOADING_ACTIONS = ['open_vid_file', 'open_h5_file', 'open_project', 'event_next_session', 'event_previous_session']
+
+
+def gui_inputs(gui):
+    """
+    What was typed or chosen in the widgets the actions read from, so they can be set the same way to replay them
+    :param gui: the MainGUI
+    :return: dictionary of the widget names and their text, value or choice
+    """
+    return {'goto_frame': gui.goto_frame.text(), 'frame_slider': gui.frame_slider_widget.value(),
+            'jump_number': gui.jump_number.text(), 'frame_from': gui.frame_from.text(),
+            'frame_to': gui.frame_to.text(), 'prop_line': gui.prop_line.text(),
+            'prop_animal': gui.prop_animal.currentText(), 'label_animal': gui.label_animal.currentText(),
+            'body_part_row': gui.body_parts_list.currentRow(),
+            'left_click_label': gui.label_with_left_click.isChecked()}
+
+
+def set_gui_inputs(gui, inputs):
+    """
+    Set the widgets the actions read from without triggering their events
+    :param gui: the MainGUI
+    :param inputs: dictionary from gui_inputs
+    """
+    widgets = {'goto_frame': (gui.goto_frame, 'setText'), 'frame_slider': (gui.frame_slider_widget, 'setValue'),
+               'jump_number': (gui.jump_number, 'setText'), 'frame_from': (gui.frame_from, 'setText'),
+               'frame_to': (gui.frame_to, 'setText'), 'prop_line': (gui.prop_line, 'setText'),
+               'prop_animal': (gui.prop_animal, 'setCurrentText'),
+               'label_animal': (gui.label_animal, 'setCurrentText'),
+               'body_part_row': (gui.body_parts_list, 'setCurrentRow'),
+               'left_click_label': (gui.label_with_left_click, 'setChecked')}
+    for name, value in inputs.items():
+        if name in widgets:
+            widget, setter = widgets[name]
+            widget.blockSignals(True)
+            getattr(widget, setter)(value)
+            widget.blockSignals(False)
+
+
+def encode_args(args):
+    # The arguments of the signals as JSON: clicked points and mouse buttons
+    encoded = []
+    for arg in args:
+        if isinstance(arg, QtCore.QPointF):
+            encoded.append({'point': [arg.x(), arg.y()]})
+        elif isinstance(arg, QtCore.Qt.MouseButton):
+            encoded.append({'button': arg.value})
+        else:
+            encoded.append(arg)
+    return encoded
+
+
+def decode_args(args):
+    decoded = []
+    for arg in args:
+        if isinstance(arg, dict) and 'point' in arg:
+            decoded.append(QtCore.QPointF(*arg['point']))
+        elif isinstance(arg, dict) and 'button' in arg:
+            decoded.append(QtCore.Qt.MouseButton(arg['button']))
+        else:
+            decoded.append(arg)
+    return decoded
+
+
+class ActionRecorder:
+    """
+    Record the actions of an annotation session to a trace file, to replay the way annotators use the GUI as a
+    benchmark (see replayActions). Each action is a line of JSON with the seconds since the recording started, the
+    action and its arguments, the frame number before and after it, what was typed in the widgets it reads from and
+    how long it took in milliseconds. Only the actions started by the annotator are recorded, not the actions they call.
+    The actions are wrapped on the MainGUI before its widgets are connected to them
+    """
+
+    def __init__(self, gui, trace_file):
+        """
+        :param gui: the MainGUI, before its widgets are made
+        :param trace_file: the filepath for the trace. It is overwritten
+        """
+        self.gui = gui
+        self.trace_file = trace_file
+        self.recording = False
+        self._depth = 0
+        self._files = (None, None)
+        self._start = time.perf_counter()
+        # Line buffered, so the trace is kept up to the last action if the GUI crashes
+        self._file = open(trace_file, 'w', buffering=1)
+        for name in RECORDED_ACTIONS + LOADING_ACTIONS:
+            setattr(gui, name, self._wrap(name, getattr(gui, name)))
+
+    def start(self):
+        self._start = time.perf_counter()
+        self.recording = True
+
+    def _wrap(self, name, action):
+        # Qt passes the arguments of the signal, e.g. checked, which it leaves out for the actions that do not take them
+        n_args = len(inspect.signature(action).parameters)
+
+        @wraps(action)
+        def recorded(*args):
+            args = args[:n_args]
+            if not self.recording or self._depth:
+                return action(*args)
+            gui = self.gui
+            entry = {'t': round(time.perf_counter() - self._start, 4), 'action': name, 'args': encode_args(args),
+                     'frame': gui.frame_number, 'inputs': gui_inputs(gui)}
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return action(*args)
+            finally:
+                milliseconds = (time.perf_counter() - start) * 1000
+                self._depth -= 1
+                if name in LOADING_ACTIONS:
+                    self._record_files()
+                else:
+                    entry.update(frame_after=gui.frame_number, ms=round(milliseconds, 3))
+                    self._write(entry)
+        return recorded
+
+    def _record_files(self):
+        gui = self.gui
+        files = (gui.video_name or None, gui.h5_name or None)
+        if files != self._files:
+            self._files = files
+            self._write({'t': round(time.perf_counter() - self._start, 4), 'action': 'load', 'video_name': files[0],
+                         'h5_name': files[1], 'frame': gui.frame_number})
+
+    def _write(self, entry):
+        if not self._file.closed:
+            self._file.write(json.dumps(entry) + '\n')
+
+    def close(self):
+        self.recording = False
+        self._file.close()
+
+
+def read_trace(trace_file):
+    """
+    :param trace_file: the filepath for a trace recorded by ActionRecorder
+    :return: list with the dictionary of each entry
+    """
+    with open(trace_file, 'r') as fr:
+        return [json.loads(line) for line in fr if line.strip()]
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from PySide6 import QtWidgets
+from PySide6.QtCore import Signal
+
+from frameView import FrameView
+
+
+class CameraPanel(QtWidgets.QWidget):
+    """
+    The frames of the other cameras of the session in a grid, each with its tracked points, its frame offset from the
+    main video and a button to remove it. The frames are read by a multiCamera.CameraRig and set with set_frames
+    """
+    # The index of the camera and its new offset
+    offset_changed = Signal(int, int)
+    # The index of the camera to remove
+    remove_clicked = Signal(int)
+
+    def __init__(self, scale_factor=0.5, columns=2, parent=None):
+        """
+        :param scale_factor: the fraction the frames are resized by to show them
+        :param columns: the number of cameras side by side
+        """
+        super().__init__(parent)
+        self.scale_factor = scale_factor
+        self.columns = columns
+        self.views = []
+        self._layout = QtWidgets.QGridLayout(self)
+        self._layout.setContentsMargins(2, 2, 2, 2)
+
+    def set_cameras(self, cameras):
+        """
+        Make a view for each camera
+        :param cameras: the multiCamera.Camera of each camera
+        """
+        while self._layout.count():
+            self._layout.takeAt(0).widget().deleteLater()
+        self.views = []
+        for index, camera in enumerate(cameras):
+            box = QtWidgets.QWidget()
+            box_layout = QtWidgets.QVBoxLayout(box)
+            box_layout.setContentsMargins(0, 0, 0, 0)
+            header = QtWidgets.QHBoxLayout()
+            header.addWidget(QtWidgets.QLabel(Path(camera.video_name).name))
+            header.addStretch()
+            header.addWidget(QtWidgets.QLabel('Offset'))
+            offset = QtWidgets.QSpinBox()
+            offset.setRange(-camera.length, camera.length)
+            offset.setValue(camera.offset)
+            offset.setToolTip('The frame of this camera at frame 0 of the main video')
+            offset.valueChanged[int].connect(lambda value, i=index: self.offset_changed.emit(i, value))
+            header.addWidget(offset)
+            remove = QtWidgets.QToolButton()
+            remove.setText('Remove')
+            remove.clicked.connect(lambda checked=False, i=index: self.remove_clicked.emit(i))
+            header.addWidget(remove)
+            box_layout.addLayout(header)
+            view = FrameView(self.scale_factor)
+            box_layout.addWidget(view)
+            self.views.append(view)
+            self._layout.addWidget(box, index // self.columns, index % self.columns)
+
+    def set_frames(self, frames, overlays, bpt_indices):
+        """
+        Show a frame of each camera
+        :param frames: the frame of each camera. None where a camera has no such frame
+        :param overlays: the tracked points and the body points with a low likelihood of each camera (see
+        multiCamera.Camera.overlay)
+        :param bpt_indices: the skeleton of each camera as indices of the body parts
+        """
+        for view, frame, (points, uncertain), indices in zip(self.views, frames, overlays, bpt_indices):
+            view.frame_item.setVisible(frame is not None)
+            if frame is None:
+                view.set_points(None, [])
+                continue
+            view.set_frame(frame)
+            view.set_points(points, indices, uncertain)
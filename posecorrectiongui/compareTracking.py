@@ -0,0 +1,90 @@
+import itertools
+import math
+import warnings
+import numpy as np
+import pandas as pd
+
+
+def comparison_points(h5, individuals, bodyparts, n_frames):
+    """
+    The x and y of the tracked points of another h5 file of the same video, e.g. of another model or before the
+    corrections, lined up with the tracked points they are compared with. The body parts are matched by name, and the
+    individuals by name if they all have the same names, otherwise in their order
+    :param h5: the h5 data of the other file in the DLC MultiIndex format
+    :param individuals: the names of the individuals to line up with
+    :param bodyparts: the names of the body parts to line up with
+    :param n_frames: the number of frames to line up with. Frames the other file does not have are missing
+    :return: array with shape (frames, individuals, body parts, 2). Missing where the other file has no such point
+    """
+    other_individuals = h5.columns.get_level_values('individuals').unique().to_list()
+    if not set(individuals) <= set(other_individuals):
+        other_individuals = (other_individuals + [None] * len(individuals))[:len(individuals)]
+    else:
+        other_individuals = list(individuals)
+    scorer = h5.columns.get_level_values('scorer').unique()[0]
+    columns = pd.MultiIndex.from_product([[scorer], other_individuals, bodyparts, ['x', 'y']],
+                                         names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    points = np.full((n_frames, len(individuals), len(bodyparts), 2), np.nan, dtype=np.float32)
+    n = min(n_frames, len(h5))
+    points[:n] = h5.iloc[:n].reindex(columns=columns).to_numpy(dtype=np.float32).reshape(points[:n].shape)
+    return points
+
+
+def _best_matching(data, other):
+    # The distances between the body points of every individual of data and every individual of other, with shape
+    # (frames, individuals, individuals, body parts), and the individual of other matched to each one of data
+    n_individuals = data.shape[1]
+    distances = np.hypot(data[:, :, None, :, 0] - other[:, None, :, :, 0],
+                         data[:, :, None, :, 1] - other[:, None, :, :, 1])
+    # Mean distance of each pair of individuals. Pairs with no body points in common add nothing, and the identities
+    # in the same order win ties
+    pair = np.nanmean(distances, axis=3)
+    permutations = np.array(list(itertools.permutations(range(n_individuals))), dtype=np.int64)
+    cost = np.nansum(pair[:, np.arange(n_individuals), permutations], axis=2)
+    return distances, permutations[np.argmin(cost, axis=1)]
+
+
+def frame_divergence(data, other, chunk_size=65536):
+    """
+    How far apart two trackings of a video are in each frame, in one pass over all the frames. The individuals are
+    matched so the mean distance of their body points is the smallest (swapped identities are not a divergence), and
+    the distances are between the body points of the matched individuals. Body points missing in either tracking are
+    left out
+    :param data: the x and y of the tracked points with shape (frames, individuals, body parts, 2 or more coords)
+    :param other: the x and y of the other tracked points, with the same shape (see comparison_points)
+    :param chunk_size: the number of frames worked out at once, to keep the memory used down. It is divided by the
+    number of ways to match the individuals, as every frame has a cost for each of them
+    :return: the largest and the mean distance in pixels of each frame (NaN where no body points are in both), and
+    array with shape (frames, individuals) of the individual of other matched to each individual of data
+    """
+    n_frames, n_individuals = data.shape[:2]
+    largest = np.full(n_frames, np.nan, dtype=np.float32)
+    mean = np.full(n_frames, np.nan, dtype=np.float32)
+    matching = np.zeros((n_frames, n_individuals), dtype=np.int8)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        # All NaN frames and pairs are expected
+        warnings.simplefilter('ignore', RuntimeWarning)
+        chunk_size = max(1, chunk_size // math.factorial(n_individuals))
+        for start in range(0, n_frames, chunk_size):
+            end = min(start + chunk_size, n_frames)
+            distances, matched = _best_matching(np.asarray(data[start:end, ..., :2], dtype=np.float32),
+                                                np.asarray(other[start:end, ..., :2], dtype=np.float32))
+            distances = distances[np.arange(end - start)[:, None], np.arange(n_individuals), matched]
+            largest[start:end] = np.nanmax(distances, axis=(1, 2))
+            mean[start:end] = np.nanmean(distances, axis=(1, 2))
+            matching[start:end] = matched
+    return largest, mean, matching
+
+
+def divergence_order(largest):
+    """
+    The frames ranked by divergence, for going through them from the most divergent
+    :param largest: the largest distance of each frame (see frame_divergence)
+    :return: the frame numbers from the largest distance down, without the frames with no body points in both, and
+    array with the rank of each frame in them (-1 for the frames left out)
+    """
+    order = np.argsort(-np.nan_to_num(largest, nan=-1.0), kind='stable')
+    order = order[:np.count_nonzero(~np.isnan(largest))]
+    ranks = np.full(len(largest), -1, dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return order, ranks
@@ -0,0 +1,866 @@
+import os
+import threading
+from contextlib import contextmanager
+import cv2
+import numpy as np
+import pandas as pd
+
+from plotTrackedPoints import create_body_indices, plot_points
+from findBadTracking import bad_tracking_filename, sidecar_filename, skeleton_edge_outliers, keypoint_jumps
+from interpolatePoints import interpolate_points
+from smoothPoints import smooth_points
+from decoderPool import DecoderPool
+from moveToIndex import next_flagged_frame
+from saveFrames import save_frame
+from exportFrames import export_frames, export_labeled_data
+from exportVideo import export_overlay_video
+from stageTimer import StageTimer
+from reviewProgress import ReviewProgress, VISITED, REVIEWED, EDITED
+from trackingQuality import frame_scores, uncertain_points, ScorePyramid
+from trackingFeatures import TrackingFeatures
+from compareTracking import comparison_points, frame_divergence, divergence_order
+from correctionLog import (CorrectionLog, correction_log_filename, EDIT_NAMES, SWAP, PROPAGATE, RELABEL, REMOVE,
+                           INTERPOLATE)
+
+# HDF5 is not thread safe, so h5 files read in the background (projectQueue) and saved by the engine take turns
+h5_lock = threading.RLock()
+
+
+class CorrectionEngine:
+    """
+    Load a video and its h5 file and correct the tracked points without the GUI. The tracked points are kept in
+    memory as an array with shape (frames, individuals, body parts, coords) and are only written to the h5 file by
+    save(). With autosave every edit is saved straight away, unless the edits are grouped with batch()
+
+    Example
+    -------
+    engine = CorrectionEngine('video.mp4', 'videoCNN.h5', skeleton=config['skeleton'])
+    with engine.batch():
+        engine.swap_sequence(100, 250)
+        engine.propagate(300, 'forward', 10, 'ind1')
+    """
+
+    def __init__(self, video_name=None, h5_name=None, skeleton=None, autosave=False, timer=None, max_gap=30,
+                 pcutoff=0.6, edge_threshold=3.5, baseline_window=None, decoder_workers=0):
+        """
+        :param video_name: the filepath for the video
+        :param h5_name: the filepath for the h5 file
+        :param skeleton: the defined skeleton for the tracked points
+        :param autosave: save the h5 file after every edit
+        :param timer: the StageTimer to time the stages with
+        :param max_gap: read through the frames in between instead of seeking when a frame is at most this many
+        frames ahead
+        :param pcutoff: the likelihood below which a body point is uncertain, for h5 files with the likelihood
+        :param edge_threshold: the robust z-score of its length above which a skeleton edge is an outlier
+        :param baseline_window: the number of frames around each frame the bad tracking thresholds are worked out over
+        (rolling medians and MADs). Over the whole file if None
+        :param decoder_workers: the number of worker processes that decode the frames far from the current one (see
+        decoderPool). Frames are only read with the video of the engine if 0
+        """
+        self.skeleton = skeleton if skeleton is not None else []
+        self.pcutoff = pcutoff
+        self.edge_threshold = edge_threshold
+        self.baseline_window = baseline_window
+        self.autosave = autosave
+        self.timer = timer if timer is not None else StageTimer()
+        self.max_gap = max_gap
+        self.decoder_workers = decoder_workers
+
+        self.video_name = None
+        self.cap = None
+        self.decoder_pool = None
+        self.length = 0
+        self.fps = 30.0
+        self.indexlength = 1
+        self.position = -1
+        self.frame_number = -1
+        self.frame = None
+
+        self.h5_name = None
+        self.data = None
+        self.flagged = None
+        self.uncertain = None
+        self.low_confidence_counts = None
+        self._low_confidence = None
+        self._edge_flags = None
+        self.edge_baseline = None
+        self.features = None
+        self.dirty = None
+        self.corrections = None
+        self.progress = None
+        # A second h5 file of the video to compare with (see load_comparison)
+        self.comparison = None
+        self.comparison_name = None
+        self.divergence = None
+        self.matching = None
+        self._divergence_order = None
+        self.modified = False
+        self.edit_count = 0
+        self._batch_depth = 0
+        self._h5 = None
+        self._quality = None
+
+        if video_name is not None:
+            self.load_video(video_name)
+        if h5_name is not None:
+            self.load_h5(h5_name)
+
+    # Loading ##########################################################################################################
+    def load_video(self, video_name, cap=None):
+        """
+        Open the video
+        :param video_name: the filepath for the video
+        :param cap: the video if it has already been opened
+        :return: the last frame number of the video
+        """
+        if cap is None:
+            cap = cv2.VideoCapture(video_name)
+        if not cap.isOpened():
+            raise FileNotFoundError(f'Unable to open the video {video_name}')
+        if self.cap is not None:
+            self.cap.release()
+        if self.decoder_pool is not None:
+            self.decoder_pool.close()
+            self.decoder_pool = None
+        self.video_name = video_name
+        self.cap = cap
+        if self.decoder_workers > 0:
+            self.decoder_pool = DecoderPool(video_name, self.decoder_workers, max_gap=self.max_gap)
+        self.length = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) - 1
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.indexlength = int(np.ceil(np.log10(max(self.length, 2))))
+        self.position = 0
+        self.frame_number = -1
+        self.frame = None
+        return self.length
+
+    def load_h5(self, h5_name, h5=None, animal_key=None):
+        """
+        Load the tracked points
+        :param h5_name: the filepath for the h5 file
+        :param h5: the h5 data if it has already been read
+        :param animal_key: the key of the h5 data in the h5 file if it is already known
+        """
+        with self.timer.stage('h5_read', self.frame_number), h5_lock:
+            if h5 is None:
+                h5 = pd.read_hdf(h5_name)
+            if animal_key is None:
+                with pd.HDFStore(h5_name, 'r') as df:
+                    animal_key = df.keys()[0]
+        self.animal_key = animal_key
+
+        self.scorer = h5.columns.get_level_values('scorer').unique().item()
+        self.individuals = h5.columns.get_level_values('individuals').unique().to_list()
+        self.bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
+        self.coords = h5.columns.get_level_values('coords').unique().to_list()
+        # The array has every combination of individual, body part and coord (e.g. x, y and likelihood). Only the
+        # columns of the h5 file are saved, in their order, so nothing is added or lost
+        self.h5_columns = h5.columns
+        self.columns = pd.MultiIndex.from_product([[self.scorer], self.individuals, self.bodyparts, self.coords],
+                                                  names=['scorer', 'individuals', 'bodyparts', 'coords'])
+        self.index = h5.index
+        self.data = h5.reindex(columns=self.columns).to_numpy(dtype=float, copy=True).reshape(
+            (len(h5), len(self.individuals), len(self.bodyparts), len(self.coords)))
+        self.bpt_indices = create_body_indices(self.bodyparts, self.skeleton)
+        self.uncertain = uncertain_points(self.data, self.coords, self.pcutoff)
+        self.low_confidence_counts = None if self.uncertain is None else self.uncertain.sum(axis=2, dtype=np.int16)
+        self._low_confidence = None
+        self._edge_flags = None
+        # The frames edited since the bad tracking was found, whose features are worked out again by find_bad_tracking
+        self.features = None
+        self.dirty = np.zeros(len(self.data), dtype=bool)
+
+        # The corrections are kept apart from the h5 file too, to replay them onto a new tracking run
+        log_file = correction_log_filename(h5_name)
+        if os.path.exists(log_file):
+            self.corrections = CorrectionLog.load(log_file, self.individuals, self.bodyparts)
+        else:
+            self.corrections = CorrectionLog(self.individuals, self.bodyparts)
+
+        self.h5_name = h5_name
+        self.flagged = None
+        self.modified = False
+        self.close_comparison()
+        self._h5 = h5
+        self._quality = None
+        if self.progress is not None:
+            self.progress.flush()
+        self.progress = ReviewProgress(len(self.data), sidecar_filename(h5_name, 'review_progress.bits'))
+
+    def load_session(self, session):
+        """
+        Load a video and h5 file that were loaded in the background (see projectQueue.PreparedSession)
+        :param session: the PreparedSession
+        :return: the last frame number of the video
+        """
+        self.load_video(session.video_name, cap=session.cap)
+        session.cap = None
+        if session.frame is not None:
+            self.frame_number = session.frame_number
+            self.frame = session.frame
+            self.position = session.frame_number + 1
+        self.load_h5(session.h5_name, h5=session.h5, animal_key=session.animal_key)
+        self.flagged = session.flagged
+        self._quality = None
+        return self.length
+
+    @property
+    def h5(self):
+        """
+        The tracked points as h5 data in the DLC MultiIndex format
+        """
+        if self._h5 is None:
+            h5 = pd.DataFrame(self.data.reshape((len(self.data), -1)), index=self.index, columns=self.columns)
+            if not h5.columns.equals(self.h5_columns):
+                h5 = h5.reindex(columns=self.h5_columns)
+            self._h5 = h5
+        return self._h5
+
+    @property
+    def quality(self):
+        """
+        The ScorePyramid of the tracking quality score of each frame (see trackingQuality.frame_scores). It uses the
+        saved frames with bad tracking and is kept up to date by the edits
+        """
+        if self._quality is None:
+            if self.flagged is None and os.path.exists(bad_tracking_filename(self.h5_name)):
+                self.next_flagged_frame(0)
+            with self.timer.stage('quality_scores', self.frame_number):
+                self._quality = ScorePyramid(frame_scores(self.data, self.flagged))
+        return self._quality
+
+    @property
+    def edge_flags(self):
+        """
+        Boolean array with shape (frames, individuals, skeleton edges) of the skeleton edges with outlier lengths (see
+        findBadTracking.skeleton_edge_outliers). Kept up to date by the edits
+        """
+        if self._edge_flags is None and self.data is not None and len(self.bpt_indices):
+            with self.timer.stage('edge_outliers', self.frame_number):
+                self._edge_flags, self.edge_baseline = skeleton_edge_outliers(self.data, self.bpt_indices,
+                                                                              self.edge_threshold,
+                                                                              window=self.baseline_window)
+        return self._edge_flags
+
+    def edge_outliers(self, frame_number):
+        """
+        The skeleton edges with outlier lengths in a frame
+        :param frame_number: the frame number
+        :return: list of (individual, body part, body part) for each edge
+        """
+        if self.edge_flags is None:
+            return []
+        individuals, edges = np.nonzero(self.edge_flags[frame_number])
+        return [(self.individuals[i], self.bodyparts[self.bpt_indices[e][0]], self.bodyparts[self.bpt_indices[e][1]])
+                for i, e in zip(individuals, edges)]
+
+    # Navigation #######################################################################################################
+    def read_frame(self, frame_number):
+        """
+        Read a frame from the video. Frames a little ahead are reached by grabbing the frames in between, which is
+        faster than seeking from a keyframe. Frames behind or far ahead, or already prefetched, come from the decoder
+        pool, if there is one, and otherwise are sought
+        :param frame_number: the frame number
+        :return: the frame (not a copy, do not draw on it)
+        """
+        if frame_number == self.frame_number and self.frame is not None:
+            return self.frame
+        gap = frame_number - self.position
+        near = 0 <= gap <= self.max_gap and self.position >= 0
+        if self.decoder_pool is not None and (not near or frame_number in self.decoder_pool):
+            with self.timer.stage('pool', frame_number):
+                try:
+                    frame = self.decoder_pool.read(frame_number)
+                except (IndexError, TimeoutError):
+                    frame = None
+                    if not self.decoder_pool.alive:
+                        # The workers could not start e.g. a script without a __main__ guard, so frames are sought
+                        self.decoder_pool.close()
+                        self.decoder_pool = None
+            if frame is not None:
+                # The video of the engine stays where it was, for the frames after it
+                self.frame_number = frame_number
+                self.frame = frame
+                return frame
+        if 0 < gap <= self.max_gap and self.position >= 0:
+            with self.timer.stage('grab', frame_number):
+                for _ in range(gap):
+                    self.cap.grab()
+        elif gap != 0:
+            with self.timer.stage('seek', frame_number):
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        with self.timer.stage('decode', frame_number):
+            ret, frame = self.cap.read()
+        if not ret:
+            self.position = -1
+            raise IndexError(f'Unable to read frame {frame_number}')
+        self.position = frame_number + 1
+        self.frame_number = frame_number
+        self.frame = frame
+        return frame
+
+    def prefetch(self, frame_numbers):
+        """
+        Decode frames in the background with the decoder pool, e.g. the next frames with bad tracking, so moving to
+        them does not wait for the video. Does nothing without a decoder pool
+        :param frame_numbers: the frame numbers
+        """
+        if self.decoder_pool is not None:
+            self.decoder_pool.prefetch(frame_numbers)
+
+    def render_frame(self, frame_number, overlay=True):
+        """
+        Read a frame from the video and plot the tracked points on it
+        :param frame_number: the frame number
+        :param overlay: plot the tracked points
+        :return: a copy of the frame with the plotted skeleton points
+        """
+        image = self.read_frame(frame_number).copy()
+        if overlay and self.data is not None:
+            with self.timer.stage('plot', frame_number):
+                points, uncertain, highlight = self.overlay(frame_number)
+                image = plot_points(image, points, self.bpt_indices, uncertain=uncertain, highlight=highlight)
+        return image
+
+    def overlay(self, frame_number):
+        """
+        The tracked points of a frame and how to plot them (see plotTrackedPoints.plot_points)
+        :param frame_number: the frame number
+        :return: the tracked points with shape (individuals, body parts, coords), the body points with a low likelihood
+        and the skeleton edges with outlier lengths (None when not known)
+        """
+        edge_flags = self.edge_flags
+        return (self.data[frame_number], None if self.uncertain is None else self.uncertain[frame_number],
+                None if edge_flags is None else edge_flags[frame_number])
+
+    def clamp(self, frame_number):
+        return int(min(max(frame_number, 0), self.length))
+
+    # Edits ############################################################################################################
+    def individual_index(self, animal_ident):
+        """
+        The index of an individual in the tracked points
+        :param animal_ident: the name of the individual. The last digit is used when the name is not in the h5 file
+        """
+        if animal_ident in self.individuals:
+            return self.individuals.index(animal_ident)
+        return int(animal_ident[-1:]) - 1
+
+    def swap(self, frame_number, individuals=(0, 1)):
+        """
+        Swap the labels for mis-tracked points on the animals for a single frame
+        :param frame_number: the frame number
+        :param individuals: the indices of the two individuals to swap
+        """
+        self.swap_sequence(frame_number, frame_number + 1, individuals)
+
+    def swap_sequence(self, from_frame, to_frame, individuals=(0, 1)):
+        """
+        Swap the labels for mis-tracked points on the animals for a sequence of frames
+        :param from_frame: the frame number to start from for the sequence to swap
+        :param to_frame: the frame number to end for the sequence to swap (not included)
+        :param individuals: the indices of the two individuals to swap
+        """
+        first, second = individuals
+        before = self.data[from_frame:to_frame, ..., :2].copy()
+        self.data[from_frame:to_frame, [first, second]] = self.data[from_frame:to_frame, [second, first]]
+        self._edited(from_frame, to_frame, kind=SWAP, before=before)
+
+    def propagate(self, frame_number, forward_backward='forward', steps=1, animal_ident='both'):
+        """
+        Propagate rightly tracked body points forward or backward, i.e. copy them to the next or previous frames
+        :param frame_number: the frame number for the current image
+        :param forward_backward: propagate forward or backward
+        :param steps: the number of frames to update from the current one
+        :param animal_ident: the animal identity or 'both' to propagate frames for
+        """
+        if animal_ident == 'both':
+            animals = slice(None)
+        else:
+            animals = self.individual_index(animal_ident)
+        if forward_backward == 'backward':
+            start, end = max(frame_number - steps, 0), frame_number
+        else:
+            start, end = frame_number + 1, frame_number + steps
+        before = self.data[start:end, ..., :2].copy()
+        self.data[start:end, animals] = self.data[frame_number, animals]
+        self._edited(start, end, kind=PROPAGATE, before=before)
+
+    def relabel(self, frame_number, new_points):
+        """
+        Replace the tracked points of a frame with the relabeled body points
+        :param frame_number: the frame number for the image that was relabeled
+        :param new_points: the new tracked points for each individual (from relabel_points)
+        """
+        before = self.data[frame_number:frame_number + 1, ..., :2].copy()
+        for animal_ident, points in new_points.items():
+            i = self.individual_index(animal_ident)
+            self.data[frame_number, i, :, :2] = np.asarray(points).reshape((len(self.bodyparts), 2))
+            # Body points placed by hand are certain
+            if 'likelihood' in self.coords:
+                self.data[frame_number, i, :, self.coords.index('likelihood')] = 1.0
+        self._edited(frame_number, frame_number + 1, kind=RELABEL, before=before)
+
+    def remove_points(self, mask):
+        """
+        Set body points to missing e.g. the jumps from find_jumps
+        :param mask: boolean array with shape (frames, individuals, body parts) of the body points to remove
+        :return: the number of body points removed
+        """
+        frames = np.flatnonzero(mask.any(axis=(1, 2)))
+        if not len(frames):
+            return 0
+        before = self.data[frames, ..., :2]
+        self.data[..., :2][mask] = np.nan
+        self._edited(frames[0], frames[-1] + 1, frames, REMOVE, before)
+        return int(mask.sum())
+
+    def interpolate(self, mask=None, max_gap=None):
+        """
+        Fill the missing body points by linear interpolation (see interpolatePoints.interpolate_points)
+        :param mask: boolean array with shape (frames, individuals, body parts) of more body points to replace e.g. the
+        jumps from find_jumps. The ones that cannot be filled are removed
+        :param max_gap: the longest run of missing frames to fill. All of them are filled by default
+        :return: the number of body points filled
+        """
+        points, filled = interpolate_points(self.data, mask, max_gap)
+        changed = filled if mask is None else filled | mask
+        frames = np.flatnonzero(changed.any(axis=(1, 2)))
+        if not len(frames):
+            return 0
+        before = self.data[frames, ..., :2]
+        self.data[..., :2][changed] = points[changed]
+        self._edited(frames[0], frames[-1] + 1, frames, INTERPOLATE, before)
+        return int(filled.sum())
+
+    def find_jumps(self, threshold=3.5, max_length=15):
+        """
+        Find the body points that jump away for a few frames (see findBadTracking.keypoint_jumps)
+        :param threshold: the robust z-score of the displacement above which a body point jumped
+        :param max_length: the most frames a body point stays away before the return jump
+        :return: boolean array with shape (frames, individuals, body parts) of the body points that jumped away
+        """
+        with self.timer.stage('jumps', self.frame_number):
+            return keypoint_jumps(self.data, threshold, max_length, window=self.baseline_window)[0]
+
+    def fix_jumps(self, threshold=3.5, max_length=15, max_gap=None):
+        """
+        Replace the body points that jump away by interpolation between the frames before and after the jump
+        :param threshold: the robust z-score of the displacement above which a body point jumped
+        :param max_length: the most frames a body point stays away before the return jump
+        :param max_gap: the longest run of missing frames to fill. The jumps in longer runs are removed
+        :return: the number of body points that jumped
+        """
+        jumps = self.find_jumps(threshold, max_length)
+        self.interpolate(jumps, max_gap)
+        return int(jumps.sum())
+
+    def _smoothing_range(self, start=0, end=None, individuals=None):
+        end = len(self.data) if end is None else min(end, len(self.data))
+        individuals = slice(None) if individuals is None else np.asarray(individuals)
+        return max(start, 0), end, individuals
+
+    def smooth(self, method='median', window=7, polyorder=2, outlier_threshold=None, max_gap=0, start=0, end=None,
+               individuals=None):
+        """
+        Smooth the trajectories of the body points and repair their outliers and gaps in one pass over the frames (see
+        smoothPoints.smooth_points)
+        :param method: 'median' for a running median, 'savgol' for a Savitzky-Golay filter
+        :param window: the number of frames in the window of the filter. Odd
+        :param polyorder: the order of the polynomial of the Savitzky-Golay filter
+        :param outlier_threshold: the most pixels a body point can be from the running median before it is removed.
+        No outliers are removed if None
+        :param max_gap: the longest run of missing frames to fill. None fills all of them and 0 none
+        :param start: the first frame to smooth
+        :param end: the frame to smooth up to (not included). The last frame by default
+        :param individuals: the indices of the individuals to smooth. All of them by default
+        :return: the number of outliers removed and the number of body points filled
+        """
+        start, end, individuals = self._smoothing_range(start, end, individuals)
+        if end - start < 1:
+            return 0, 0
+        with self.timer.stage('smooth', self.frame_number):
+            data = self.data[start:end, individuals]
+            smoothed, outliers, filled = smooth_points(data, method, window, polyorder, outlier_threshold, max_gap)
+            # Only the removed and filled body points go in the correction log, not the jitter of every point
+            repaired = outliers | filled
+            rows, ind, bpt = np.nonzero(repaired)
+            kinds = np.where(filled[rows, ind, bpt], INTERPOLATE, REMOVE)
+            names = np.arange(len(self.individuals))[individuals]
+            before = data[rows, ind, bpt, :2]
+            for kind in (INTERPOLATE, REMOVE):
+                chosen = kinds == kind
+                self.corrections.record_points(kind, rows[chosen] + start, names[ind[chosen]], bpt[chosen],
+                                               before[chosen], smoothed[rows[chosen], ind[chosen], bpt[chosen]])
+            data[..., :2] = smoothed
+            self.data[start:end, individuals] = data
+        self._edited(start, end, np.arange(start, end))
+        return int(outliers.sum()), int(filled.sum())
+
+    def preview_smoothing(self, frame_number, method='median', window=7, polyorder=2, outlier_threshold=None,
+                          max_gap=0, start=0, end=None, individuals=None):
+        """
+        The tracked points of a frame before and after smooth, without changing them. Only the frames around it are
+        smoothed, so it is quick on long videos
+        :param frame_number: the frame number
+        :return: the x and y of the body points with shape (individuals, body parts, 2) before and after smoothing
+        """
+        before = self.data[frame_number, ..., :2].astype(float)
+        after = before.copy()
+        start, end, individuals = self._smoothing_range(start, end, individuals)
+        if not start <= frame_number < end:
+            return before, after
+        # The outliers are found against a running median of a window, gaps up to max_gap long are filled between the
+        # points on either side, and the filter has its own window, so the frames further away than the margin do not
+        # change the frame. Gaps of any length are filled without max_gap, so the frames are extended until the gaps
+        # near the frame end within them
+        half = window // 2
+        margin = 2 * window + (max_gap or window) + 1
+        while True:
+            first, last = max(start, frame_number - margin), min(end, frame_number + margin + 1)
+            data = self.data[first:last, individuals]
+            smoothed, outliers, _ = smooth_points(data, method, window, polyorder, outlier_threshold, max_gap)
+            if max_gap is not None or (first, last) == (start, end):
+                break
+            valid = ~(np.isnan(data[..., :2]).any(axis=-1) | outliers)
+            position = frame_number - first
+            if ((first == start or valid[2 * half:max(position - 2 * half, 0) + 1].any(axis=0).all())
+                    and (last == end or valid[position + 2 * half:len(data) - 2 * half].any(axis=0).all())):
+                break
+            margin *= 2
+        after[individuals] = smoothed[frame_number - first]
+        return before, after
+
+    def _edited(self, start, end, frames=None, kind=None, before=None):
+        # frames: the frame numbers changed by a fix over the whole file. They are marked edited but not reviewed
+        # kind and before: the edit and the x and y of the frames before it, for the correction log
+        if before is not None:
+            rows = np.arange(start, start + len(before)) if frames is None else frames
+            self.corrections.record(kind, rows, before, self.data[rows, ..., :2])
+        self._h5 = None
+        self.edit_count += 1
+        if self.uncertain is not None:
+            self.uncertain[start:end] = uncertain_points(self.data[start:end], self.coords, self.pcutoff)
+            self.low_confidence_counts[start:end] = self.uncertain[start:end].sum(axis=2)
+            self._low_confidence = None
+        if self._quality is not None:
+            # The swap likelihood of the frame after the edit changes too
+            self._quality.update(start, frame_scores(self.data, self.flagged, start, end + 1))
+        if self._edge_flags is not None:
+            # Scored against the lengths before the edit. A rolling baseline has a median and MAD for each frame
+            median, mad = self.edge_baseline
+            if median.ndim == 3:
+                median, mad = median[start:end], mad[start:end]
+            self._edge_flags[start:end] = skeleton_edge_outliers(self.data[start:end], self.bpt_indices,
+                                                                 self.edge_threshold, (median, mad))[0]
+        if self.comparison is not None:
+            largest, mean, self.matching[start:end] = frame_divergence(self.data[start:end],
+                                                                       self.comparison[start:end])
+            self.divergence[0][start:end], self.divergence[1][start:end] = largest, mean
+            self._divergence_order = None
+        self.modified = True
+        if frames is not None:
+            self.dirty[frames] = True
+            self.progress.mark(EDITED, frames)
+        else:
+            self.dirty[start:end] = True
+            self.progress.mark_range(EDITED, start, end)
+            self.progress.mark_range(REVIEWED, start, end)
+        if self.autosave and self._batch_depth == 0:
+            self.save()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group edits so the h5 file is only saved once at the end when autosave is used
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self.autosave and self._batch_depth == 0 and self.modified:
+                self.save()
+
+    def save(self, h5_name=None):
+        """
+        Save the tracked points (overwrites the h5 file by default)
+        :param h5_name: the filepath to save the h5 file to
+        """
+        h5_name = h5_name or self.h5_name
+        with self.timer.stage('h5_write', self.frame_number), h5_lock:
+            self.h5.to_hdf(h5_name, key=self.animal_key)
+            self.progress.flush()
+            if self.corrections.modified or h5_name != self.h5_name:
+                self.corrections.save(correction_log_filename(h5_name))
+        self.modified = False
+
+    def replay_corrections(self, log_file, tolerance=2.0, force=False):
+        """
+        Apply the corrections of a correction log, e.g. of an earlier tracking run of the video, to the tracked points
+        (see correctionLog.CorrectionLog.replay). The frames corrected are marked reviewed
+        :param log_file: the filepath for the correction log
+        :param tolerance: the most pixels the tracked points can be from a point before it was corrected
+        :param force: correct the points the tracked points already differ from too
+        :return: DataFrame with the status of each corrected point of the log
+        """
+        report = CorrectionLog.load(log_file).replay(self.data, self.individuals, self.bodyparts, self.coords,
+                                                     tolerance, force)
+        applied = report[report['status'].isin(['applied', 'forced'])]
+        if len(applied):
+            kinds = {name: kind for kind, name in EDIT_NAMES.items()}
+            self.corrections.record_points(applied['edit'].map(kinds).to_numpy(), applied['frame'].to_numpy(),
+                                           [self.individuals.index(name) for name in applied['individual']],
+                                           [self.bodyparts.index(name) for name in applied['bodypart']],
+                                           applied[['new_x', 'new_y']].to_numpy(),
+                                           applied[['after_x', 'after_y']].to_numpy())
+            frames = np.unique(applied['frame'].to_numpy())
+            with self.batch():
+                self._edited(frames[0], frames[-1] + 1, frames)
+                self.progress.mark(REVIEWED, frames)
+        return report
+
+    # Bad tracking #####################################################################################################
+    def find_bad_tracking(self, full=False):
+        """
+        Find the frames with bad tracking in the tracked points and save them next to the h5 file: the frames found by
+        detect_bad_tracking, the frames with skeleton edges of outlier lengths and the frames with body points that
+        jumped away. The features of the frames are saved too (see trackingFeatures), so after that only the frames
+        edited since, or changed in the h5 file since, are worked out again and scored against the same baselines
+        :param full: work out the features and the baselines of all the frames again
+        :return: the sorted frame numbers with bad tracking
+        """
+        features = TrackingFeatures(sidecar_filename(self.h5_name, 'tracking_features'), self.bodyparts,
+                                    self.bpt_indices, self.baseline_window, self.edge_threshold)
+        if self.features is not None and self.features.params == features.params:
+            features = self.features
+        elif not full and features.load(len(self.data)):
+            # Saved in an earlier session, so the h5 file may have been changed since
+            with self.timer.stage('stale_frames', self.frame_number):
+                self.dirty[features.stale_frames(self.data)] = True
+        else:
+            full = True
+        if full:
+            with self.timer.stage('features', self.frame_number):
+                self.flagged = features.compute(self.data)
+            self._quality = None
+        else:
+            with self.timer.stage('features', self.frame_number):
+                changed = features.update(self.data, np.flatnonzero(self.dirty))
+            self.flagged = features.flagged
+            if self._quality is not None and len(changed):
+                start, end = changed[0], changed[-1] + 1
+                self._quality.update(start, frame_scores(self.data, self.flagged, start, end))
+        self.features = features
+        self.dirty[:] = False
+        self._edge_flags, self.edge_baseline = features.edge_flags, features.edge_baseline
+        np.save(bad_tracking_filename(self.h5_name), self.flagged)
+        return self.flagged
+
+    def next_flagged_frame(self, frame_number):
+        """
+        Find the next frame with bad tracking. Loads the saved frames when find_bad_tracking has not been run
+        :param frame_number: the current frame number
+        :return: the next frame number and the percentage gone through. None if there are no more frames
+        """
+        if self.flagged is None:
+            self.flagged = np.unique(np.load(bad_tracking_filename(self.h5_name))).astype(int)
+        return next_flagged_frame(self.flagged, frame_number)
+
+    def next_unreviewed_frame(self, frame_number):
+        """
+        Find the next frame with bad tracking that has not been reviewed yet. Wraps around to the start
+        :param frame_number: the current frame number
+        :return: the next frame number and the percentage of the frames with bad tracking reviewed. None if all the
+        frames have been reviewed
+        """
+        self.next_flagged_frame(frame_number)
+        next_frame = self.progress.next_unset(REVIEWED, self.flagged, frame_number)
+        if next_frame is None:
+            return None
+        return next_frame, self.progress.percentage(REVIEWED, self.flagged)
+
+    def prefetch_unreviewed(self, frame_number, count=4):
+        """
+        Decode the next frames with bad tracking that have not been reviewed yet in the background, so moving on to
+        them does not wait for the video. Does nothing without a decoder pool or before finding the bad tracking
+        :param frame_number: the current frame number
+        :param count: the number of frames to decode
+        """
+        if self.decoder_pool is None or self.flagged is None or self.progress is None:
+            return
+        unset = self.flagged[~self.progress.is_set(REVIEWED, self.flagged)]
+        if len(unset) == 0:
+            return
+        i = np.searchsorted(unset, frame_number, side='right')
+        self.prefetch(unset[(i + np.arange(min(count, len(unset)))) % len(unset)])
+
+    def low_confidence_frames(self):
+        """
+        The frames where any individual has body points with a likelihood below pcutoff
+        :return: the sorted frame numbers. None if the h5 file has no likelihood
+        """
+        if self.low_confidence_counts is None:
+            return None
+        if self._low_confidence is None:
+            self._low_confidence = np.flatnonzero(self.low_confidence_counts.any(axis=1))
+        return self._low_confidence
+
+    def next_low_confidence_frame(self, frame_number):
+        """
+        Find the next frame with body points with a likelihood below pcutoff
+        :param frame_number: the current frame number
+        :return: the next frame number and the percentage gone through. None if there are no more frames or the h5
+        file has no likelihood
+        """
+        frames = self.low_confidence_frames()
+        if frames is None:
+            return None
+        return next_flagged_frame(frames, frame_number)
+
+    def mark_visited(self, frame_number):
+        if self.progress is not None:
+            self.progress.mark(VISITED, frame_number)
+
+    def mark_reviewed(self, frame_number):
+        if self.progress is not None:
+            self.progress.mark(REVIEWED, frame_number)
+
+    def review_summary(self, n_segments=10):
+        """
+        The number of frames with bad tracking, reviewed and edited in each segment of the video
+        :param n_segments: the number of segments to split the video into
+        :return: the segment size and a dictionary with the counts for each segment
+        """
+        self.next_flagged_frame(0)
+        segment_size = max(-(-len(self.data) // n_segments), 1)
+        n_segments = -(-len(self.data) // segment_size)
+        flagged = np.bincount(self.flagged // segment_size, minlength=n_segments)
+        return segment_size, {'flagged': flagged,
+                              'reviewed': self.progress.segment_counts(REVIEWED, segment_size, self.flagged),
+                              'edited': self.progress.segment_counts(EDITED, segment_size)}
+
+    # Comparison #######################################################################################################
+    def load_comparison(self, h5_name):
+        """
+        Load a second h5 file of the video to compare the tracked points with, e.g. of another model or from before the
+        corrections, and work out how far apart they are in each frame (see compareTracking.frame_divergence). The
+        divergence is kept up to date by the edits
+        :param h5_name: the filepath for the other h5 file
+        """
+        with self.timer.stage('h5_read', self.frame_number), h5_lock:
+            h5 = pd.read_hdf(h5_name)
+        self.comparison = comparison_points(h5, self.individuals, self.bodyparts, len(self.data))
+        self.comparison_name = h5_name
+        with self.timer.stage('divergence', self.frame_number):
+            largest, mean, self.matching = frame_divergence(self.data, self.comparison)
+        self.divergence = (largest, mean)
+        self._divergence_order = None
+
+    def close_comparison(self):
+        self.comparison = None
+        self.comparison_name = None
+        self.divergence = None
+        self.matching = None
+        self._divergence_order = None
+
+    def divergence_ranking(self):
+        """
+        The frames ranked by divergence from the comparison, from the largest distance down, and the rank of each frame
+        (see compareTracking.divergence_order). None without a comparison
+        """
+        if self.comparison is None:
+            return None
+        if self._divergence_order is None:
+            self._divergence_order = divergence_order(self.divergence[0])
+        return self._divergence_order
+
+    def next_divergent_frame(self, frame_number=None, step=1):
+        """
+        Find the frame ranked next by divergence from the comparison
+        :param frame_number: the current frame number. Goes to the most divergent frame if None or if the frame has no
+        body points in both
+        :param step: 1 for the next less divergent frame, -1 for the next more divergent one
+        :return: the frame number and its rank from 0. None if there are no more frames or there is no comparison
+        """
+        if self.comparison is None:
+            return None
+        order, ranks = self.divergence_ranking()
+        if frame_number is None or ranks[frame_number] < 0:
+            rank = 0
+        else:
+            rank = ranks[frame_number] + step
+        if not 0 <= rank < len(order):
+            return None
+        return int(order[rank]), int(rank)
+
+    def divergence_at(self, frame_number):
+        """
+        :param frame_number: the frame number
+        :return: the largest and the mean distance in pixels from the comparison in the frame and its rank from 0 by
+        divergence. None without a comparison or if no body points are in both
+        """
+        if self.comparison is None or np.isnan(self.divergence[0][frame_number]):
+            return None
+        return (float(self.divergence[0][frame_number]), float(self.divergence[1][frame_number]),
+                int(self.divergence_ranking()[1][frame_number]))
+
+    def comparison_overlay(self, frame_number):
+        """
+        The tracked points of the comparison in a frame, with each individual in the place of the individual it is
+        matched to
+        :param frame_number: the frame number
+        :return: the x and y with shape (individuals, body parts, 2). None without a comparison
+        """
+        if self.comparison is None:
+            return None
+        return self.comparison[frame_number, self.matching[frame_number]]
+
+    # Frames ###########################################################################################################
+    def save_frame(self, frame_number, output_path):
+        """
+        Save a frame of the video as a png image
+        :param frame_number: the frame number
+        :param output_path: the folder to save the image in
+        """
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
+        save_frame(frame=self.read_frame(frame_number), index=frame_number, indexlength=self.indexlength,
+                   output_path=output_path)
+
+    def export_frames(self, frame_numbers, output_path, keypoints=False, processes=None):
+        """
+        Save many frames of the video as png images e.g. the frames with bad tracking for training data
+        :param frame_numbers: the frame numbers to save
+        :param output_path: the folder to save the images in
+        :param keypoints: also save the tracked points of the frames in the DLC labeled-data layout
+        :param processes: the number of processes to encode the png images with
+        :return: the frame numbers that were saved
+        """
+        saved = export_frames(self.video_name, frame_numbers, output_path, self.indexlength, processes=processes)
+        if keypoints and self.data is not None:
+            export_labeled_data(self.h5, saved, output_path, self.indexlength)
+        return saved
+
+    def export_video(self, output_file, start=0, end=None, codec='mp4v', progress=None):
+        """
+        Save a video (or a range of frames) with the corrected tracked points plotted on every frame
+        :param output_file: the filepath for the exported video
+        :param start: the first frame number to export
+        :param end: the last frame number to export. Exports to the end of the video by default
+        :param codec: the fourcc code for the video codec
+        :param progress: function called with the number of frames written and the total. Return False to cancel
+        :return: the number of frames written, the time it took in seconds and the frames per second
+        """
+        return export_overlay_video(self.video_name, self.data, self.bpt_indices, output_file, start, end, codec,
+                                    progress=progress, uncertain=self.uncertain)
+
+    def close(self):
+        if self.progress is not None:
+            self.progress.flush()
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.decoder_pool is not None:
+            self.decoder_pool.close()
+            self.decoder_pool = None
@@ -0,0 +1,259 @@
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+
+from findBadTracking import sidecar_filename
+
+# The kinds of edits
+SWAP, PROPAGATE, RELABEL, REMOVE, INTERPOLATE = 1, 2, 3, 4, 5
+EDIT_NAMES = {SWAP: 'swap', PROPAGATE: 'propagate', RELABEL: 'relabel', REMOVE: 'remove', INTERPOLATE: 'interpolate'}
+
+# The arrays of the points of a log and their types in the saved file
+_FIELDS = ('kind', 'frames', 'individuals', 'bodyparts', 'before', 'after')
+_DTYPES = (np.uint8, np.int32, np.uint16, np.uint16, np.float32, np.float32)
+# The saved file is written again as a whole once more points were appended to it than it had, or after this many saves
+_MIN_COMPACT_POINTS = 100000
+_MAX_APPENDED_CHUNKS = 1000
+
+
+def same_points(first, second, tolerance=0.0):
+    """
+    Whether body points are at the same place
+    :param first: array with the x and y along the last axis
+    :param second: array with the x and y along the last axis
+    :param tolerance: the most pixels apart the points can be
+    :return: boolean array, True where both points are within the tolerance or both are missing
+    """
+    with np.errstate(invalid='ignore'):
+        close = np.hypot(first[..., 0] - second[..., 0], first[..., 1] - second[..., 1]) <= tolerance
+    return close | (np.isnan(first).any(axis=-1) & np.isnan(second).any(axis=-1))
+
+
+def correction_log_filename(h5_path):
+    """
+    The filepath for the correction log of a h5 file. It is saved next to the h5 file
+    :param h5_path: path to the h5 file
+    """
+    return sidecar_filename(h5_path, 'corrections.npz')
+
+
+def _reindex(indices, names, new_names):
+    # The indices of the names in the new names. The names not in them are added to the end
+    new_names = list(new_names)
+    for name in names:
+        if name not in new_names:
+            new_names.append(name)
+    return np.array([new_names.index(name) for name in names], dtype=np.int64)[indices], new_names
+
+
+class CorrectionLog:
+    """
+    The body points corrected by hand, with where each was before its first edit and where it is after its last one.
+    The points are kept by frame number, individual name and body part name, not by the h5 file, so the corrections can
+    be replayed onto the tracking of another model of the same video (see replay). Each point is only kept once however
+    often it was edited, and points edited back to where they were are dropped
+    """
+
+    def __init__(self, individuals, bodyparts):
+        """
+        :param individuals: the names of the individuals
+        :param bodyparts: the names of the body parts
+        """
+        self.individuals = list(individuals)
+        self.bodyparts = list(bodyparts)
+        self.modified = False
+        self._chunks = []
+        # The points recorded since the log was last saved, and what the file it was saved to holds
+        self._pending = []
+        self._log_file = None
+        self._file_names = None
+        self._file_points = 0
+        self._appended_points = 0
+        self._appended_chunks = 0
+
+    def record(self, kind, frames, before, after):
+        """
+        Record the body points changed by an edit
+        :param kind: SWAP, PROPAGATE, RELABEL, REMOVE or INTERPOLATE
+        :param frames: the frame numbers of the rows of before and after
+        :param before: the x and y of the body points before the edit with shape (frames, individuals, body parts, 2)
+        :param after: the x and y after the edit, with the same shape
+        """
+        rows, individuals, bodyparts = np.nonzero(~same_points(before, after))
+        self.record_points(kind, np.asarray(frames)[rows], individuals, bodyparts,
+                           before[rows, individuals, bodyparts], after[rows, individuals, bodyparts])
+
+    def record_points(self, kind, frames, individuals, bodyparts, before, after):
+        """
+        Record changed body points
+        :param kind: SWAP, PROPAGATE, RELABEL, REMOVE or INTERPOLATE
+        :param frames: the frame number of each point
+        :param individuals: the index of the individual of each point
+        :param bodyparts: the index of the body part of each point
+        :param before: the x and y of each point before the edit with shape (points, 2)
+        :param after: the x and y of each point after the edit with shape (points, 2)
+        """
+        if not len(frames):
+            return
+        kind = np.broadcast_to(np.asarray(kind, dtype=np.uint8), (len(frames),))
+        chunk = (kind, np.asarray(frames, dtype=np.int64), np.asarray(individuals, dtype=np.int64),
+                 np.asarray(bodyparts, dtype=np.int64), np.asarray(before, dtype=np.float32),
+                 np.asarray(after, dtype=np.float32))
+        self._chunks.append(chunk)
+        self._pending.append(chunk)
+        self.modified = True
+
+    def entries(self):
+        """
+        The corrected body points
+        :return: the kind of the last edit, the frame numbers, the individual indices, the body part indices, the x and
+        y before the first edit and the x and y after the last edit of each point
+        """
+        if not self._chunks:
+            empty, points = np.zeros(0, dtype=np.int64), np.zeros((0, 2), dtype=np.float32)
+            return empty.astype(np.uint8), empty, empty, empty, points, points
+        if len(self._chunks) > 1:
+            kind, frames, individuals, bodyparts, before, after = (np.concatenate(values) for values in
+                                                                   zip(*self._chunks))
+            # The first edit of each point has the place before and the last one the place after
+            key = (frames * len(self.individuals) + individuals) * len(self.bodyparts) + bodyparts
+            _, first = np.unique(key, return_index=True)
+            _, last = np.unique(key[::-1], return_index=True)
+            last = len(key) - 1 - last
+            kind, after = kind[last], after[last]
+            frames, individuals, bodyparts, before = frames[first], individuals[first], bodyparts[first], before[first]
+            edited = ~same_points(before, after)
+            self._chunks = [tuple(values[edited] for values in (kind, frames, individuals, bodyparts, before, after))]
+        return self._chunks[0]
+
+    def __len__(self):
+        return len(self.entries()[0])
+
+    def save(self, log_file):
+        """
+        Save the log as a npz file. It is saved with every edit when the h5 file is autosaved, so only the points
+        recorded since the last save are appended to the file, as arrays of their own. The file is written again as a
+        whole, with each point once, when it is another file, or once the points appended outnumber the ones it had
+        :param log_file: the filepath for the log
+        """
+        log_file = str(log_file)
+        appended = self._appended_points + sum(len(chunk[0]) for chunk in self._pending)
+        if (log_file == self._log_file and os.path.exists(log_file)
+                and self._file_names == (self.individuals, self.bodyparts)
+                and appended <= max(self._file_points, _MIN_COMPACT_POINTS)
+                and self._appended_chunks < _MAX_APPENDED_CHUNKS):
+            self._append(log_file)
+        else:
+            self._write(log_file)
+        self._pending = []
+        self.modified = False
+
+    def _write(self, log_file):
+        # Not compressed, so the points can be appended to it
+        entries = self.entries()
+        arrays = {field: values.astype(dtype) for field, values, dtype in zip(_FIELDS, entries, _DTYPES)}
+        # Written to a temporary file first, so the log is never left half written
+        temporary_file = f'{log_file}.tmp.npz'
+        np.savez(temporary_file, **arrays, individual_names=np.array(self.individuals, dtype=str),
+                 bodypart_names=np.array(self.bodyparts, dtype=str))
+        os.replace(temporary_file, log_file)
+        self._log_file = log_file
+        self._file_names = (list(self.individuals), list(self.bodyparts))
+        self._file_points, self._appended_points, self._appended_chunks = len(entries[0]), 0, 0
+
+    def _append(self, log_file):
+        # The points recorded since the last save, in the order they were recorded, as one more chunk of arrays
+        if not self._pending:
+            return
+        chunk = [np.concatenate(values) for values in zip(*self._pending)]
+        number = self._appended_chunks + 1
+        with zipfile.ZipFile(log_file, 'a', allowZip64=True) as archive:
+            for field, values, dtype in zip(_FIELDS, chunk, _DTYPES):
+                with archive.open(f'chunk{number}_{field}.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, values.astype(dtype), allow_pickle=False)
+        self._appended_chunks = number
+        self._appended_points += len(chunk[0])
+
+    @classmethod
+    def load(cls, log_file, individuals=None, bodyparts=None):
+        """
+        Load a saved log
+        :param log_file: the filepath for the log
+        :param individuals: the names of the individuals to index the points by, e.g. of the h5 file the log is used
+        with. The names of the log by default
+        :param bodyparts: the names of the body parts to index the points by
+        :return: the CorrectionLog
+        """
+        with np.load(log_file, allow_pickle=False) as saved:
+            names = saved['individual_names'].tolist(), saved['bodypart_names'].tolist()
+            # The points appended by save after the ones written as a whole, in the order they were recorded
+            n_chunks = sum(1 for key in saved.files if key.startswith('chunk') and key.endswith('_kind'))
+            chunks = [[saved[field] for field in _FIELDS]]
+            chunks += [[saved[f'chunk{number}_{field}'] for field in _FIELDS] for number in range(1, n_chunks + 1)]
+        entries = [np.concatenate(values) for values in zip(*chunks)]
+        entries[2], individuals = _reindex(entries[2], names[0], names[0] if individuals is None else individuals)
+        entries[3], bodyparts = _reindex(entries[3], names[1], names[1] if bodyparts is None else bodyparts)
+        log = cls(individuals, bodyparts)
+        # Each chunk is recorded on its own, so the appended points are merged with the ones before them
+        splits = np.cumsum([len(chunk[0]) for chunk in chunks])[:-1]
+        for chunk in zip(*(np.split(values, splits) for values in entries)):
+            log.record_points(*chunk)
+        log.modified = False
+        log._pending = []
+        log._log_file = str(log_file)
+        log._file_names = (names[0], names[1])
+        log._file_points = len(chunks[0][0])
+        log._appended_points = len(entries[0]) - log._file_points
+        log._appended_chunks = n_chunks
+        return log
+
+    def replay(self, data, individuals, bodyparts, coords=('x', 'y'), tolerance=2.0, force=False):
+        """
+        Apply the corrections to the tracked points of another tracking run in one pass. A point is corrected where the
+        new tracking is where the point was before it was corrected. Where it is already where the point was corrected
+        to there is nothing to do, and anywhere else is a conflict, e.g. the new model tracked the point differently.
+        Conflicts are only corrected with force
+        :param data: the new tracked points with shape (frames, individuals, body parts, coords). Changed in place
+        :param individuals: the names of the individuals of the new tracked points
+        :param bodyparts: the names of the body parts of the new tracked points
+        :param coords: the names of the coords. The likelihood of the corrected points is set to 1
+        :param tolerance: the most pixels the new tracking can be from a point to be at the same place
+        :param force: correct the conflicts too
+        :return: DataFrame with a row for each corrected point in the log: its frame, individual, body part and last
+        edit, its place before and after the correction and in the new tracking, and its status: 'applied', 'already
+        corrected', 'conflict' (or 'forced' with force), or 'missing' if the new tracking has no such point
+        """
+        kind, frames, individual_index, bodypart_index, before, after = self.entries()
+        new_individuals = np.array([individuals.index(name) if name in individuals else -1
+                                    for name in self.individuals], dtype=np.int64)[individual_index]
+        new_bodyparts = np.array([bodyparts.index(name) if name in bodyparts else -1
+                                  for name in self.bodyparts], dtype=np.int64)[bodypart_index]
+        known = (new_individuals >= 0) & (new_bodyparts >= 0) & (frames < len(data))
+        new = np.full((len(frames), 2), np.nan)
+        new[known] = data[frames[known], new_individuals[known], new_bodyparts[known], :2]
+
+        # Checked against the place after first, so a point moved less than the tolerance is not corrected again
+        status = np.where(same_points(new, after, tolerance), 'already corrected',
+                          np.where(same_points(new, before, tolerance), 'applied',
+                                   'forced' if force else 'conflict')).astype(object)
+        status[~known] = 'missing'
+        apply = known & ((status == 'applied') | (status == 'forced'))
+        points = (frames[apply], new_individuals[apply], new_bodyparts[apply])
+        data[points + (slice(0, 2),)] = after[apply]
+        if 'likelihood' in coords:
+            # Body points placed by hand are certain
+            placed = ~np.isnan(after[apply]).any(axis=1)
+            data[tuple(values[placed] for values in points) + (list(coords).index('likelihood'),)] = 1.0
+
+        with np.errstate(invalid='ignore'):
+            distance = np.hypot(*(new - before).T)
+        return pd.DataFrame({'frame': frames,
+                             'individual': np.array(self.individuals, dtype=object)[individual_index],
+                             'bodypart': np.array(self.bodyparts, dtype=object)[bodypart_index],
+                             'edit': np.array([EDIT_NAMES.get(k, '') for k in range(256)], dtype=object)[kind],
+                             'status': status,
+                             'before_x': before[:, 0], 'before_y': before[:, 1],
+                             'after_x': after[:, 0], 'after_y': after[:, 1],
+                             'new_x': new[:, 0], 'new_y': new[:, 1],
+                             'distance': distance})
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def _extremes(buckets):
+    # The positions of the min and the max in each bucket (axis 1) and the values at them. Missing values are never
+    # picked unless the whole bucket is missing. The samples of the buckets are copied to the last axis first, as
+    # argmin and argmax along a contiguous axis are many times quicker
+    samples = np.moveaxis(buckets, 1, -1)
+    work = samples.copy()
+    missing = np.isnan(work)
+    np.copyto(work, np.inf, where=missing)
+    lowest = work.argmin(axis=-1)
+    np.copyto(work, -np.inf, where=missing)
+    highest = work.argmax(axis=-1)
+    return (lowest, np.take_along_axis(samples, lowest[..., None], axis=-1)[..., 0],
+            highest, np.take_along_axis(samples, highest[..., None], axis=-1)[..., 0])
+
+
+def min_max_decimate(values, n_buckets):
+    """
+    Decimate traces for plotting. The samples are split into buckets and only the min and the max of each bucket are
+    kept, at the samples they are at and in the order they come in, so the spikes, jumps and slopes of the traces stay
+    visible, unlike with plain subsampling. Buckets with only missing values give missing values, so the gaps stay
+    visible too
+    :param values: array with the samples along the first axis e.g. shape (frames, individuals, body parts, coords)
+    :param n_buckets: the number of buckets e.g. the number of pixel columns of the plot
+    :return: the sample positions kept and the values at them, both with the shape of the values and the samples along
+    the first axis. Each trace has its own positions
+    """
+    n_samples = len(values)
+    if n_samples <= 2 * n_buckets:
+        positions = np.arange(n_samples).reshape((-1,) + (1,) * (values.ndim - 1))
+        return np.broadcast_to(positions, values.shape), values
+    size = -(-n_samples // n_buckets)
+    n_full = n_samples // size
+    # Reducing whole buckets of a reshaped array is much faster than a loop or np.minimum.reduceat along the first axis
+    extremes = [_extremes(values[:n_full * size].reshape((n_full, size) + values.shape[1:]))]
+    if n_full * size < n_samples:
+        extremes.append(_extremes(values[None, n_full * size:]))
+    lowest_at, lowest, highest_at, highest = (np.concatenate(arrays) for arrays in zip(*extremes))
+    starts = np.arange(0, n_samples, size).reshape((-1,) + (1,) * (values.ndim - 1))
+    # The min and the max of each bucket in time order
+    min_first = lowest_at <= highest_at
+    positions = np.stack([starts + np.where(min_first, lowest_at, highest_at),
+                          starts + np.where(min_first, highest_at, lowest_at)], axis=1)
+    decimated = np.stack([np.where(min_first, lowest, highest), np.where(min_first, highest, lowest)], axis=1)
+    shape = (2 * len(starts),) + values.shape[1:]
+    return positions.reshape(shape), decimated.reshape(shape)
@@ -0,0 +1,265 @@
+import atexit
+import multiprocessing
+import threading
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+import cv2
+import numpy as np
+
+
+def _decode_worker(video_name, shm_name, frame_shape, n_slots, conn, max_gap):
+    # Runs in the worker process: decode the requested frames into the slots of the shared memory block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((n_slots,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    cap = cv2.VideoCapture(video_name)
+    position = 0
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            frame_number, slot = request
+            gap = frame_number - position
+            if 0 <= gap <= max_gap:
+                for _ in range(gap):
+                    cap.grab()
+            else:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+            ok = ret and frame.shape == slots.shape[1:]
+            if ok:
+                slots[slot] = frame
+                position = frame_number + 1
+            else:
+                position = -1
+            conn.send((frame_number, slot, ok))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        cap.release()
+        del slots
+        shm.close()
+
+
+class DecoderPool:
+    """
+    Worker processes that each decode frames of the video with their own capture, for reading frames far apart. Each
+    worker owns a region of the video, and a frame just ahead of where a worker is reads on from there instead of
+    seeking, so each worker stays warm in its region. The decoded frames come back through shared memory, without
+    pickling them, and are kept in a small cache, so frames can be read ahead (prefetch) while the current one is shown
+    """
+
+    def __init__(self, video_name, n_workers=2, slots=2, max_gap=30, cache_size=16):
+        """
+        :param video_name: the filepath for the video
+        :param n_workers: the number of worker processes
+        :param slots: the most frames each worker decodes ahead of being collected
+        :param max_gap: a worker reads on instead of seeking when a frame is at most this many frames ahead of it
+        :param cache_size: the number of decoded frames kept
+        """
+        cap = cv2.VideoCapture(video_name)
+        if not cap.isOpened():
+            raise FileNotFoundError(f'Unable to open the video {video_name}')
+        self.length = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        cap.release()
+        self.video_name = video_name
+        self.n_workers = n_workers
+        self.n_slots = slots
+        self.max_gap = max_gap
+        self.cache_size = cache_size
+
+        # Spawned, as forking a process with Qt and decoder threads running is not safe
+        context = multiprocessing.get_context('spawn')
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._shms, self._slots, self._conns, self._processes = [], [], [], []
+        for _ in range(n_workers):
+            shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_decode_worker, daemon=True,
+                                      args=(video_name, shm.name, self.frame_shape, slots, child_conn, max_gap))
+            process.start()
+            child_conn.close()
+            self._shms.append(shm)
+            self._slots.append(np.ndarray((slots,) + self.frame_shape, dtype=np.uint8, buffer=shm.buf))
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        # Where each worker will be after its requests, its free slots and its requests waiting for a slot
+        self._positions = [region * self.length // n_workers for region in range(n_workers)]
+        self._free_slots = [list(range(slots)) for _ in range(n_workers)]
+        self._waiting = [deque() for _ in range(n_workers)]
+        self._decoding = [set() for _ in range(n_workers)]
+        self._alive = [True] * n_workers
+        self._requested = set()
+        self._failed = set()
+        self._cache = OrderedDict()
+        self._pinned = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name='decoder-pool', daemon=True)
+        self._collector.start()
+        # The shared memory outlives the process unless it is unlinked
+        atexit.register(self.close)
+
+    @property
+    def alive(self):
+        """
+        :return: whether any of the workers is still running
+        """
+        return any(self._alive) and not self._closed
+
+    def _worker_for(self, frame_number):
+        # A worker that can read on to the frame, otherwise the worker that owns the region of the frame, or the
+        # next one running. None if all of the workers stopped
+        for worker, position in enumerate(self._positions):
+            if self._alive[worker] and 0 <= frame_number - position <= self.max_gap:
+                return worker
+        region = min(frame_number * self.n_workers // max(self.length, 1), self.n_workers - 1)
+        for offset in range(self.n_workers):
+            worker = (region + offset) % self.n_workers
+            if self._alive[worker]:
+                return worker
+        return None
+
+    def _dispatch(self, worker):
+        # Send the waiting requests of a worker while it has free slots. Called with the condition held
+        while self._waiting[worker] and self._free_slots[worker]:
+            frame_number = self._waiting[worker].popleft()
+            self._decoding[worker].add(frame_number)
+            self._conns[worker].send((frame_number, self._free_slots[worker].pop()))
+
+    def _request(self, frame_number):
+        # Called with the condition held
+        if frame_number in self._cache or frame_number in self._requested:
+            return
+        worker = self._worker_for(frame_number)
+        if worker is None:
+            self._failed.add(frame_number)
+            return
+        self._positions[worker] = frame_number + 1
+        self._requested.add(frame_number)
+        self._failed.discard(frame_number)
+        self._waiting[worker].append(frame_number)
+        self._dispatch(worker)
+
+    def _collect(self):
+        # Runs in a thread: copy the decoded frames out of the shared memory into the cache
+        conns = list(self._conns)
+        while conns:
+            for conn in wait(conns):
+                worker = self._conns.index(conn)
+                try:
+                    frame_number, slot, ok = conn.recv()
+                except (EOFError, OSError):
+                    # The worker stopped (or could not start), so its requests fail instead of waiting for it
+                    conns.remove(conn)
+                    with self._condition:
+                        self._alive[worker] = False
+                        lost = self._decoding[worker] | set(self._waiting[worker])
+                        self._failed |= lost
+                        self._requested -= lost
+                        self._decoding[worker].clear()
+                        self._waiting[worker].clear()
+                        self._condition.notify_all()
+                    continue
+                with self._condition:
+                    self._decoding[worker].discard(frame_number)
+                    if ok:
+                        self._cache[frame_number] = self._slots[worker][slot].copy()
+                        self._evict()
+                    else:
+                        self._failed.add(frame_number)
+                    self._requested.discard(frame_number)
+                    self._free_slots[worker].append(slot)
+                    if not self._closed:
+                        self._dispatch(worker)
+                    self._condition.notify_all()
+
+    def _evict(self):
+        # Drop the least recently used frames, except the ones being read. Called with the condition held
+        for frame_number in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if frame_number not in self._pinned:
+                del self._cache[frame_number]
+
+    def __contains__(self, frame_number):
+        """
+        :return: whether the frame is decoded and waiting in the cache
+        """
+        with self._condition:
+            return frame_number in self._cache
+
+    def prefetch(self, frame_numbers):
+        """
+        Start decoding frames in the background, e.g. the next frames with bad tracking
+        :param frame_numbers: the frame numbers
+        """
+        with self._condition:
+            for frame_number in frame_numbers:
+                if 0 <= frame_number < self.length:
+                    self._request(int(frame_number))
+
+    def read(self, frame_number, timeout=10):
+        """
+        Read a frame, from the cache if it was prefetched
+        :param frame_number: the frame number
+        :param timeout: the most seconds to wait for it
+        :return: the frame (not a copy, do not draw on it)
+        """
+        return self.read_many([frame_number], timeout)[0]
+
+    def read_many(self, frame_numbers, timeout=10):
+        """
+        Read frames in parallel across the workers
+        :param frame_numbers: the frame numbers
+        :param timeout: the most seconds to wait for them
+        :return: list of the frames, in the order of the frame numbers
+        """
+        frame_numbers = [int(frame_number) for frame_number in frame_numbers]
+        with self._condition:
+            # The frames are kept in the cache until they are all read
+            for frame_number in frame_numbers:
+                self._pinned[frame_number] = self._pinned.get(frame_number, 0) + 1
+            try:
+                for frame_number in frame_numbers:
+                    self._request(frame_number)
+                for frame_number in frame_numbers:
+                    if not self._condition.wait_for(lambda: frame_number not in self._requested, timeout):
+                        raise TimeoutError(f'Decoding frame {frame_number} took more than {timeout} s')
+                    if frame_number in self._failed or frame_number not in self._cache:
+                        raise IndexError(f'Unable to read frame {frame_number}')
+                    self._cache.move_to_end(frame_number)
+                return [self._cache[frame_number] for frame_number in frame_numbers]
+            finally:
+                for frame_number in frame_numbers:
+                    self._pinned[frame_number] -= 1
+                    if not self._pinned[frame_number]:
+                        del self._pinned[frame_number]
+                self._evict()
+
+    def close(self):
+        if self._closed:
+            return
+        atexit.unregister(self.close)
+        with self._condition:
+            self._closed = True
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        # The collector stops once the pipes of all the workers are closed
+        self._collector.join(timeout=2)
+        for conn in self._conns:
+            conn.close()
+        self._slots = []
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+
+from saveFrames import save_frame
+
+
+def read_frames_sequentially(video_file, frame_numbers, max_gap=30):
+    """
+    Read the frames in a single forward pass through the video. Small gaps between the frames are read through
+    (grabbing the frames in between without decoding them), which is faster than seeking from a keyframe
+    :param video_file: the filepath for the video
+    :param frame_numbers: the frame numbers to read. They are sorted and duplicates are removed
+    :param max_gap: seek instead of reading through when the next frame is more than this many frames ahead
+    :return: generator with the frame number and the frame
+    """
+    frame_numbers = np.unique(np.asarray(frame_numbers, dtype=int))
+    cap = cv2.VideoCapture(str(video_file))
+    position = 0
+    try:
+        for frame_number in frame_numbers:
+            gap = frame_number - position
+            if gap < 0 or gap > max_gap:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            else:
+                for _ in range(gap):
+                    cap.grab()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position = frame_number + 1
+            yield frame_number, frame
+    finally:
+        cap.release()
+
+
+def export_frames(video_file, frame_numbers, output_path, indexlength=None, max_gap=30, processes=None):
+    """
+    Save many frames of the video as png images. The frames are decoded in a single forward pass and the png images
+    are encoded and written in a process pool
+    :param video_file: the filepath for the video
+    :param frame_numbers: the frame numbers to save
+    :param output_path: the folder to save the images in
+    :param indexlength: the number of digits of the frame number in the image names
+    :param max_gap: seek instead of reading through when the next frame is more than this many frames ahead
+    :param processes: the number of processes to encode the png images with. Uses all cores by default
+    :return: the frame numbers that were saved
+    """
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+    if indexlength is None:
+        cap = cv2.VideoCapture(str(video_file))
+        indexlength = int(np.ceil(np.log10(max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) - 1, 2))))
+        cap.release()
+
+    processes = processes or os.cpu_count()
+    saved = []
+    pending = set()
+    with ProcessPoolExecutor(processes) as pool:
+        for frame_number, frame in read_frames_sequentially(video_file, frame_numbers, max_gap):
+            # Limit the frames waiting to be encoded so the decoded frames do not fill up the memory
+            if len(pending) >= 4 * processes:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(pool.submit(save_frame, frame, frame_number, indexlength, output_path))
+            saved.append(frame_number)
+        for future in pending:
+            future.result()
+
+    return saved
+
+
+def export_labeled_data(h5, frame_numbers, output_path, indexlength, scorer=None):
+    """
+    Save the tracked points of the saved frames in the DLC labeled-data layout (CollectedData_<scorer>.h5 and .csv
+    next to the images), so the frames can be used as training data
+    :param h5: the h5 data (not file) with the tracked points
+    :param frame_numbers: the frame numbers that were saved as images
+    :param output_path: the folder with the images i.e. labeled-data/<video name>
+    :param indexlength: the number of digits of the frame number in the image names
+    :param scorer: the scorer for the labeled data. Uses the scorer of the h5 data by default
+    :return: the filepath for the h5 file with the labeled data
+    """
+    frame_numbers = np.unique(np.asarray(frame_numbers, dtype=int))
+    output_path = Path(output_path)
+    scorer = scorer or h5.columns.get_level_values('scorer').unique().item()
+
+    data = h5.iloc[frame_numbers]
+    data = data.loc[:, data.columns.get_level_values('coords').isin(['x', 'y'])]
+    data.columns = data.columns.set_levels([scorer], level='scorer')
+    data.index = pd.MultiIndex.from_tuples([(output_path.parent.name, output_path.name,
+                                             f'img{str(frame_number).zfill(indexlength)}.png')
+                                            for frame_number in frame_numbers])
+
+    destination_file = output_path / f'CollectedData_{scorer}.h5'
+    data.to_hdf(destination_file, key='df_with_missing', mode='w')
+    data.to_csv(destination_file.with_suffix('.csv'))
+
+    return str(destination_file)
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+import cv2
+
+from plotTrackedPoints import plot_points
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _put(to_queue, item, stop):
+    # Block until there is space in the queue, unless the export was stopped
+    while not stop.is_set():
+        try:
+            to_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(from_queue, stop):
+    while not stop.is_set():
+        try:
+            return from_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def export_overlay_video(video_file, data, bpt_indices, output_file, start=0, end=None, codec='mp4v', fps=None,
+                         dot_size=4, queue_size=32, render_threads=2, progress=None, uncertain=None):
+    """
+    Save a video with the tracked points plotted on every frame. Decoding, plotting and encoding run as separate
+    pipeline stages on different threads connected by bounded queues, so the export runs close to the decode speed
+    :param video_file: the filepath for the video
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+    :param output_file: the filepath for the exported video
+    :param start: the first frame number to export
+    :param end: the last frame number to export. Exports to the end of the video by default
+    :param codec: the fourcc code for the video codec
+    :param fps: the frame rate of the exported video. Uses the frame rate of the video by default
+    :param dot_size: the size for the tracked points to plot
+    :param queue_size: the number of frames each queue can hold
+    :param render_threads: the number of threads plotting the tracked points
+    :param progress: function called with the number of frames written and the total. Return False to cancel
+    :param uncertain: boolean array with shape (frames, individuals, body parts) of the body points to plot dimmed
+    :return: the number of frames written, the time it took in seconds and the frames per second
+    """
+    cap = cv2.VideoCapture(str(video_file))
+    n_frames = min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), len(data))
+    end = n_frames - 1 if end is None else min(end, n_frames - 1)
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    total = end - start + 1
+
+    decoded = queue.Queue(maxsize=queue_size)
+    rendered = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def decode():
+        try:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            for frame_number in range(start, end + 1):
+                ret, frame = cap.read()
+                if not ret or not _put(decoded, (frame_number, frame), stop):
+                    break
+        except Exception as error:
+            errors.append(error)
+        finally:
+            cap.release()
+            for _ in range(render_threads):
+                _put(decoded, None, stop)
+
+    def render():
+        try:
+            while True:
+                item = _get(decoded, stop)
+                if item is None:
+                    break
+                frame_number, frame = item
+                frame = plot_points(frame, data[frame_number], bpt_indices, dot_size,
+                                    None if uncertain is None else uncertain[frame_number])
+                if not _put(rendered, (frame_number, frame), stop):
+                    break
+        except Exception as error:
+            errors.append(error)
+        finally:
+            _put(rendered, None, stop)
+
+    threads = [threading.Thread(target=decode, daemon=True)]
+    threads += [threading.Thread(target=render, daemon=True) for _ in range(render_threads)]
+
+    writer = cv2.VideoWriter(str(output_file), cv2.VideoWriter_fourcc(*codec), fps, size)
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Encode in this thread. The render threads can finish out of order, so frames are buffered until it is their turn
+    written = 0
+    finished = 0
+    waiting = {}
+    try:
+        while finished < render_threads:
+            item = _get(rendered, stop)
+            if item is None:
+                finished += 1
+                continue
+            waiting[item[0]] = item[1]
+            while start + written in waiting:
+                writer.write(waiting.pop(start + written))
+                written += 1
+                if progress is not None and progress(written, total) is False:
+                    raise ExportCancelled()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        writer.release()
+    if errors:
+        raise errors[0]
+
+    seconds = time.perf_counter() - started
+    return written, seconds, written / seconds if seconds > 0 else 0.0
@@ -1,7 +1,11 @@
+import warnings
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from rollingStats import rolling_median, rolling_mad
+from plotTrackedPoints import create_body_indices
+
 
 def cal_animal_area(h5_data=None, scorer="Stacked_Autoencoder", individual='ind1'):
     """
@@ -59,44 +63,277 @@ def cal_bodyparts_dist(h5_data=None, body_part1='Nose', body_part2='betweenEars'
     return bpts_df
 
 
-# noinspection PyTypeChecker
-def find_bad_tracking(file):
+def sidecar_filename(h5_path, name):
+    """
+    The filepath for a file saved next to the h5 file, named after the video
+    :param h5_path: path to the h5 file
+    :param name: the end of the file name e.g. bad_tracking.npy
+    """
+    destination_name = Path(h5_path).stem
+    # The video name is the part before 'CNN'. The whole name is kept if it is not there
+    if 'CNN' in destination_name:
+        destination_name = destination_name[:destination_name.find('CNN')]
+    destination_name += name
+    return f'{str(Path(h5_path).parent)}/{destination_name}'
+
+
+def bad_tracking_filename(h5_path):
+    """
+    The filepath for the frame numbers with bad tracking. It is saved next to the h5 file
+    :param h5_path: path to the h5 file
+    """
+    return sidecar_filename(h5_path, 'bad_tracking.npy')
+
+
+# The pairs of body parts whose distances find bad tracking
+BAD_TRACKING_PAIRS = [['Nose', 'betweenEars'], ['tailStart', 'midHip']]
+
+
+def tracking_features(data, bodyparts):
+    """
+    Calculate the area of the animals (see cal_animal_area) and the distances between the BAD_TRACKING_PAIRS of body
+    parts (see cal_bodyparts_dist) for all the individuals and frames at once
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param bodyparts: the names of the body parts
+    :return: the areas with shape (frames, individuals) and the distances with shape (frames, individuals, pairs)
+    """
+    index = {bodypart: i for i, bodypart in enumerate(bodyparts)}
+    nose, left_mid = data[:, :, index['Nose']], data[:, :, index['leftMidWaist']]
+    center = (left_mid + data[:, :, index['rightMidWaist']]) / 2
+    area = np.pi * np.linalg.norm(nose - center, axis=-1) * np.linalg.norm(center - left_mid, axis=-1)
+    distances = [np.linalg.norm(data[:, :, index[first]] - data[:, :, index[second]], axis=-1)
+                 for first, second in BAD_TRACKING_PAIRS]
+    return area.astype(np.float32), np.stack(distances, axis=-1).astype(np.float32)
+
+
+def tracking_baseline(area, distances, window=None):
+    """
+    The thresholds of detect_bad_tracking: the median of the areas, and the median and MAD of the distances
+    :param area: the areas with shape (frames, individuals)
+    :param distances: the distances with shape (frames, individuals, pairs)
+    :param window: the number of frames for rolling medians (see detect_bad_tracking). Over the whole file if None or
+    at least as long as the file
+    :return: the area median, the distance median and the distance MAD, with the shape of a single frame, or of the
+    features with a window
+    """
+    if window is not None and window < len(area):
+        distance_median = rolling_median(distances, window)
+        return rolling_median(area, window), distance_median, rolling_mad(distances, window, distance_median)
+    # One contiguous row for each column, so the sums of the means are as precise as for a single column
+    columns = np.ascontiguousarray(distances.reshape((len(distances), -1)).T)
+    with warnings.catch_warnings():
+        # Individuals that are never tracked give NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        area_median = np.nanmedian(area, axis=0)
+        distance_median = np.nanmedian(columns, axis=1)
+        # Over the whole file the deviation is from the mean
+        distance_mad = np.nanmedian(np.abs(columns - np.nanmean(columns, axis=1)[:, None]), axis=1)
+    return area_median, distance_median.reshape(distances.shape[1:]), distance_mad.reshape(distances.shape[1:])
+
+
+def bad_tracking_mask(area, distances, baseline):
+    """
+    Find the frames whose areas are more than half of the median away from it, or whose distances are more than 2.75
+    MADs away from their median
+    :param area: the areas with shape (frames, individuals)
+    :param distances: the distances with shape (frames, individuals, pairs)
+    :param baseline: the thresholds from tracking_baseline
+    :return: boolean array with the frames with bad tracking
+    """
     mad_multiplier = 2.75
+    area_median, distance_median, distance_mad = baseline
+    area_thresh = area_median * 0.5
+    bad_area = (area < area_median - area_thresh) | (area > area_median + area_thresh)
+    distance_thresh = mad_multiplier * distance_mad
+    bad_distance = ((distances < distance_median - distance_thresh) | (distances > distance_median + distance_thresh))
+    return bad_area.any(axis=1) | bad_distance.any(axis=(1, 2))
+
+
+def detect_bad_tracking(h5, window=None):
+    """
+    Find the frames with bad tracking from the area of the animals and the distances between body parts
+    :param h5: the h5 data (not file) with the tracked points
+    :param window: the number of frames around each frame the medians are taken over, so the thresholds follow the
+    animals as they rear, huddle or grow over long sessions. Over the whole file if None
+    :return: the frame numbers with bad tracking
+    """
+    data, bodyparts = tracked_points(h5)
+    area, distances = tracking_features(data, bodyparts)
+    return np.flatnonzero(bad_tracking_mask(area, distances, tracking_baseline(area, distances, window)))
+
+
+def tracked_points(h5):
+    """
+    The tracked points of h5 data as an array, laid out like CorrectionEngine.data
+    :param h5: the h5 data (not file) with the tracked points
+    :return: the tracked points with shape (frames, individuals, body parts, coords) and the names of the body parts
+    """
+    levels = [h5.columns.get_level_values(level).unique().to_list()
+              for level in ('scorer', 'individuals', 'bodyparts', 'coords')]
+    columns = pd.MultiIndex.from_product(levels, names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    data = h5.reindex(columns=columns).to_numpy(dtype=float).reshape((len(h5),) + tuple(map(len, levels[1:])))
+    return data, levels[2]
+
+
+def skeleton_edge_lengths(data, bpt_indices):
+    """
+    Calculate the length of every edge of the skeleton for all the individuals and frames at once
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+    :return: array with shape (frames, individuals, edges). NaN where a body point is missing
+    """
+    first, second = np.asarray(bpt_indices, dtype=int).reshape((-1, 2)).T
+    # Each coordinate as a contiguous float32 array, which is much faster than indexing the edges of the coords
+    x, y = data[..., 0].astype(np.float32), data[..., 1].astype(np.float32)
+    dx, dy = x[:, :, first], y[:, :, first]
+    dx -= x[:, :, second]
+    dy -= y[:, :, second]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    return np.sqrt(dx, out=dx)
+
+
+def robust_baseline(values, window=None):
+    """
+    The median and the median absolute deviation (MAD) of each column over the frames, ignoring missing values.
+    Where more than half of the values are the same the MAD is 0, so the mean absolute deviation (scaled to match the
+    MAD) is used instead
+    :param values: array with the frames along the first axis
+    :param window: the number of frames around each frame to take the rolling median and MAD over (see
+    rollingStats.rolling_median). Over the whole file if None
+    :return: the median and the MAD, with the shape of a single frame, or of the values with a window
+    """
+    if window is not None and window < len(values):
+        median = rolling_median(values, window)
+        mad = rolling_mad(values, window, median)
+        # Where the window is too still for a MAD, fall back to the MAD of the whole file
+        return median, np.where(mad > 0, mad, robust_baseline(values)[1])
+    # One contiguous row for each column, so the medians sort whole rows
+    columns = np.ascontiguousarray(values.reshape((len(values), -1)).T)
+    with warnings.catch_warnings():
+        # Body points that are never tracked give NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(columns, axis=1)
+        deviation = np.abs(columns - median[:, None])
+        mad = np.nanmedian(deviation, axis=1)
+        mean_ad = np.nanmean(deviation, axis=1) * 1.2533 / 1.4826
+    return median.reshape(values.shape[1:]), np.where(mad > 0, mad, mean_ad).reshape(values.shape[1:])
+
+
+def robust_z_scores(values, median, mad):
+    """
+    The modified z-scores (0.6745 * (value - median) / MAD) of the values. 0 where the MAD is 0 and NaN where a value
+    is missing
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mad > 0, 0.6745 * (values - median) / mad, 0).astype(np.float32)
+
+
+def skeleton_edge_outliers(data, bpt_indices, threshold=3.5, baseline=None, window=None):
+    """
+    Find the skeleton edges that are much longer or shorter than usual, e.g. when a body point is placed on the other
+    animal or a limb is folded onto itself. Every edge of every individual is scored with the robust z-score of its
+    length, so the edges that flagged a frame are known
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+    :param threshold: the robust z-score above which an edge is an outlier
+    :param baseline: the median and MAD of the edge lengths to score against. Worked out from the data by default
+    :param window: the number of frames for rolling medians and MADs (see robust_baseline). Over the whole file if None
+    :return: boolean array with shape (frames, individuals, edges) of the outliers, and the baseline
+    """
+    lengths = skeleton_edge_lengths(data, bpt_indices)
+    if baseline is None:
+        baseline = robust_baseline(lengths, window)
+    z_scores = robust_z_scores(lengths, *baseline)
+    return np.abs(np.nan_to_num(z_scores)) > threshold, baseline
+
+
+def keypoint_displacements(data):
+    """
+    Calculate how far every body point of every individual moved from the frame before
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :return: array with shape (frames - 1, individuals, body parts) of the distance moved into frames 1 to the end. NaN
+    where a body point is missing
+    """
+    x, y = data[..., 0].astype(np.float32), data[..., 1].astype(np.float32)
+    dx, dy = np.diff(x, axis=0), np.diff(y, axis=0)
+    dx *= dx
+    dy *= dy
+    dx += dy
+    return np.sqrt(dx, out=dx)
+
+
+def keypoint_jumps(data, threshold=3.5, max_length=15, min_jump=10, baseline=None, window=None):
+    """
+    Find the body points that jump away for a few frames, e.g. a nose placed on the other side of the arena. A jump is a
+    displacement from the frame before with a robust z-score above the threshold. It is matched with the next jump of
+    the same body point when that jump lands back closer to where the body point was than half the first jump, and
+    the frames in between are flagged. A jump that is not matched flags its frame only
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param threshold: the robust z-score of the displacement above which a body point jumped
+    :param max_length: the most frames a body point stays away before the return jump
+    :param min_jump: the displacement in pixels a body point has to move at least to jump, so small movements of body
+    points that hardly move are not jumps
+    :param baseline: the median and MAD of the displacements to score against. Worked out from the data by default
+    :param window: the number of frames for rolling medians and MADs (see robust_baseline). Over the whole file if None
+    :return: boolean array with shape (frames, individuals, body parts) of the body points that jumped away, and the
+    baseline
+    """
+    n_frames, n_individuals, n_bodyparts = data.shape[:3]
+    flags = np.zeros((n_individuals, n_bodyparts, n_frames), dtype=bool)
+    displacements = keypoint_displacements(data)
+    if baseline is None:
+        baseline = robust_baseline(displacements, window)
+    jumped = (np.nan_to_num(robust_z_scores(displacements, *baseline)) > threshold) & (displacements >= min_jump)
+    # The jumps sorted by body point and then frame, with the frame they land on
+    individuals, bodyparts, frames = np.nonzero(jumped.transpose(1, 2, 0))
+    frames += 1
+    if not len(frames):
+        return flags.transpose(2, 0, 1), baseline
+
+    # A jump and the next jump of the same body point are a pair when the second one returns
+    x, y = data[frames - 1, individuals, bodyparts, 0], data[frames - 1, individuals, bodyparts, 1]
+    jump = np.hypot(data[frames, individuals, bodyparts, 0] - x, data[frames, individuals, bodyparts, 1] - y)
+    returned = np.hypot(data[frames[1:], individuals[1:], bodyparts[1:], 0] - x[:-1],
+                        data[frames[1:], individuals[1:], bodyparts[1:], 1] - y[:-1])
+    pairs = ((individuals[1:] == individuals[:-1]) & (bodyparts[1:] == bodyparts[:-1])
+             & (frames[1:] - frames[:-1] <= max_length) & (returned < jump[:-1] / 2))
+    pairs = np.append(pairs, False)
+    # A point flickering between two places gives a run of pairs, and every other one of them is a return jump
+    index = np.arange(len(pairs))
+    run_start = np.maximum.accumulate(np.where(pairs, -1, index)) + 1
+    starts = pairs & ((index - run_start) % 2 == 0)
+    returns = np.append(False, starts[:-1])
+
+    # The flagged frames are marked +1 at the start and -1 after the end of each range, then summed along the frames
+    ends = np.where(starts, np.append(frames[1:], 0), frames + 1)
+    marks = np.zeros((n_individuals, n_bodyparts, n_frames + 1), dtype=np.int32)
+    np.add.at(marks, (individuals[~returns], bodyparts[~returns], frames[~returns]), 1)
+    np.add.at(marks, (individuals[~returns], bodyparts[~returns], ends[~returns]), -1)
+    flags = np.cumsum(marks, axis=2)[..., :n_frames] > 0
+    return flags.transpose(2, 0, 1), baseline
+
+
+def find_bad_tracking(file, window=None, skeleton=None, edge_threshold=3.5):
+    """
+    Find the frames with bad tracking and save them next to the h5 file: the same frames as
+    CorrectionEngine.find_bad_tracking, i.e. the frames found by detect_bad_tracking, the frames with skeleton edges of
+    outlier lengths and the frames with body points that jumped away. Their features are saved too (see
+    trackingFeatures), so the GUI only works out the frames edited since
+    :param file: path to the h5 file
+    :param window: the number of frames for rolling medians (see detect_bad_tracking). Over the whole file if None or
+    at least as long as the file
+    :param skeleton: the defined skeleton for the tracked points. No skeleton edges are scored without it
+    :param edge_threshold: the robust z-score of its length above which a skeleton edge is an outlier
+    :return: the sorted frame numbers with bad tracking
+    """
+    # Imported here, as trackingFeatures imports this module
+    from trackingFeatures import TrackingFeatures
 
-    h5 = pd.read_hdf(file)
-    scorer = h5.columns.get_level_values('scorer').unique().item()
-    individuals = h5.columns.get_level_values('individuals').unique().to_list()
-
-    body_parts_list = [['Nose', 'betweenEars'], ['tailStart', 'midHip']]
-
-    bad_tracking_list = []
-    for ind in individuals:
-
-        area = cal_animal_area(h5, scorer=scorer, individual=ind)
-        area_thresh = (area.median() * 0.5).item()
-        bad_area1 = np.where(area.values < area.median().item() - area_thresh)[0]
-        bad_area2 = np.where(area.values > area.median().item() + area_thresh)[0]
-        bad_area = np.concatenate((bad_area1, bad_area2))
-        bad_area = np.unique(bad_area)
-
-        bad_tracking_list.extend(bad_area.tolist())
-        for bpts in body_parts_list:
-            bpts_dist = cal_bodyparts_dist(h5, body_part1=bpts[0], body_part2=bpts[1],
-                                           scorer=scorer, individual=ind)
-            mad = (bpts_dist - bpts_dist.mean()).abs().median()
-            bpts_dist_thresh = (mad_multiplier * mad).item()
-            bad_bpts_dist1 = np.where(bpts_dist.values < bpts_dist.median().item() - bpts_dist_thresh)[0]
-            bad_bpts_dist2 = np.where(bpts_dist.values > bpts_dist.median().item() + bpts_dist_thresh)[0]
-            bad_bpts_dist = np.concatenate((bad_bpts_dist1, bad_bpts_dist2))
-            bad_bpts_dist = np.unique(bad_bpts_dist)
-
-            bad_tracking_list.extend(bad_bpts_dist.tolist())
-    bad_tracking_list = np.array(bad_tracking_list)
-
-    destination_name = Path(file).stem
-    destination_name = destination_name[:destination_name.find('CNN')]
-    destination_name += 'bad_tracking.npy'
-    destination_file = f'{str(Path(file).parent)}/{destination_name}'
-    np.save(destination_file, bad_tracking_list)
-
-    return
+    data, bodyparts = tracked_points(pd.read_hdf(file))
+    features = TrackingFeatures(sidecar_filename(file, 'tracking_features'), bodyparts,
+                                create_body_indices(bodyparts, skeleton or []), window, edge_threshold)
+    bad_tracking_list = features.compute(data)
+    np.save(bad_tracking_filename(file), bad_tracking_list)
+    return bad_tracking_list
@@ -0,0 +1,370 @@
+import math
+
+from PySide6 import QtGui, QtWidgets
+from PySide6.QtCore import QPointF, QRectF, Qt, Signal
+
+from lazyImport import lazy_import
+from qImageProcess import qt_image_process
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+
+# Colours of the individuals, matching plotTrackedPoints.plot_points: red for individual 1 and blue for 2
+_individual_colours = [(255, 0, 0), (0, 0, 255)]
+_highlight_colour = (255, 255, 0)
+
+
+class RelabelPoint(QtWidgets.QGraphicsEllipseItem):
+    """
+    A body point clicked while relabeling. It can be dragged to adjust it, and deleted when selected. It keeps the same
+    size on the screen at any zoom
+    """
+
+    def __init__(self, animal, bodypart, colour):
+        super().__init__(QRectF(-4, -4, 8, 8))
+        self.animal = animal
+        self.bodypart = bodypart
+        self.setBrush(QtGui.QColor(colour))
+        self.setPen(QtGui.QPen(Qt.white, 0))
+        self.setFlags(QtWidgets.QGraphicsItem.ItemIsMovable | QtWidgets.QGraphicsItem.ItemIsSelectable
+                      | QtWidgets.QGraphicsItem.ItemIgnoresTransformations)
+        self.setCursor(Qt.OpenHandCursor)
+        self.setToolTip(f'{animal} {bodypart}\nDrag to move, press Delete to remove')
+        self.setZValue(3)
+
+
+class FramePyramid:
+    """
+    The current frame at full, half, quarter, ... resolution (cv2.pyrDown). A level and its pixmap are only made when
+    the zoom first needs them, and are kept until the next frame, so zooming does not resize the full frame again
+    """
+
+    def __init__(self, image, min_size=64):
+        """
+        :param image: the frame at full resolution (BGR)
+        :param min_size: the smallest height or width of a level
+        """
+        self.levels = [image]
+        self.min_size = min_size
+        self._pixmaps = {}
+
+    def level_for(self, scale):
+        """
+        The smallest level with at least one pixel for each pixel on the screen
+        :param scale: the pixels on the screen for each pixel of the frame
+        """
+        level = max(int(math.floor(math.log2(1 / scale))), 0) if 0 < scale < 1 else 0
+        while len(self.levels) <= level and min(self.levels[-1].shape[:2]) >= 2 * self.min_size:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+        return min(level, len(self.levels) - 1)
+
+    def pixmap(self, level):
+        if level not in self._pixmaps:
+            self._pixmaps[level] = qt_image_process(self.levels[level])
+        return self._pixmaps[level]
+
+
+class FrameView(QtWidgets.QGraphicsView):
+    """
+    Shows the video frame with the tracked points of the current frame. The frame is a single pixmap item, and the body
+    points and the skeleton edges are items that are moved to the points of each frame, so going to another frame only
+    swaps the pixmap and moves a few dozen items. The scene is in the pixel coordinates of the video, so clicks map back
+    to video pixels at any zoom. Scroll to zoom in around the mouse and drag to pan. The frame is shown from the level of
+    its FramePyramid that matches the zoom
+    """
+    # The position in video pixels and the mouse button of a click on the frame (not on a relabel point)
+    point_clicked = Signal(QPointF, Qt.MouseButton)
+
+    def __init__(self, scale_factor=1.0, max_zoom=16, parent=None):
+        """
+        :param scale_factor: the fraction the frames are resized by to show them when not zoomed in
+        :param max_zoom: the most the frames can be zoomed in from the scale factor
+        """
+        super().__init__(parent)
+        self.scale_factor = scale_factor
+        self.max_zoom = max_zoom
+        self.zoom = 1.0
+        self.pyramid = None
+        self._level = None
+        self._press = None
+        self._panning = False
+        self.setScene(QtWidgets.QGraphicsScene(self))
+        self.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        # Keyboard shortcuts of the main window, like the arrow keys, are not taken by the view
+        self.setFocusPolicy(Qt.NoFocus)
+        self.scale(scale_factor, scale_factor)
+
+        self.frame_item = QtWidgets.QGraphicsPixmapItem()
+        self.frame_item.setTransformationMode(Qt.SmoothTransformation)
+        self.scene().addItem(self.frame_item)
+        self.overlay = QtWidgets.QGraphicsItemGroup()
+        self.overlay.setZValue(1)
+        self.scene().addItem(self.overlay)
+        self._dots = []
+        self._edges = []
+        self._bpt_indices = None
+        # The tracked points of a second h5 file to compare with, as rings and dashed edges under the points
+        self.comparison = QtWidgets.QGraphicsItemGroup()
+        self.comparison.setZValue(0.5)
+        self.comparison.hide()
+        self.scene().addItem(self.comparison)
+        self._comparison_dots = []
+        self._comparison_edges = []
+        self._comparison_bpt_indices = None
+        self._pens = {}
+        self._frame_rect = QRectF()
+
+        delete = QtGui.QShortcut(QtGui.QKeySequence.Delete, self, context=Qt.WindowShortcut)
+        delete.activated.connect(self.remove_selected_points)
+        backspace = QtGui.QShortcut(QtGui.QKeySequence(Qt.Key_Backspace), self, context=Qt.WindowShortcut)
+        backspace.activated.connect(self.remove_selected_points)
+
+    def set_frame(self, image):
+        """
+        :param image: the frame at full resolution (BGR)
+        """
+        self.pyramid = FramePyramid(image)
+        self._level = None
+        self._show_level()
+        rect = QRectF(0, 0, image.shape[1], image.shape[0])
+        if rect != self._frame_rect:
+            # Points outside of the frame do not make the scene bigger
+            self._frame_rect = rect
+            self.setSceneRect(rect)
+            self.setMinimumSize(int(rect.width() * self.scale_factor), int(rect.height() * self.scale_factor))
+
+    def _show_level(self):
+        # Show the level of the pyramid for the zoom, stretched to the size of the full frame
+        level = self.pyramid.level_for(self.scale_factor * self.zoom)
+        if level == self._level:
+            return
+        self._level = level
+        full, shown = self.pyramid.levels[0].shape, self.pyramid.levels[level].shape
+        self.frame_item.setPixmap(self.pyramid.pixmap(level))
+        self.frame_item.setTransform(QtGui.QTransform.fromScale(full[1] / shown[1], full[0] / shown[0]))
+
+    def set_zoom(self, zoom):
+        """
+        :param zoom: how much to zoom in from the scale factor, from 1 (the whole frame) to max_zoom
+        """
+        zoom = min(max(zoom, 1.0), self.max_zoom)
+        self.scale(zoom / self.zoom, zoom / self.zoom)
+        self.zoom = zoom
+        if self.pyramid is not None:
+            self._show_level()
+
+    def reset_zoom(self):
+        self.set_zoom(1.0)
+
+    def _pen(self, colour, width=0, style=Qt.SolidLine):
+        # Cosmetic pens are as wide on the screen at any zoom. The pens are kept, so the edges keep the same pen objects
+        key = (colour, width, style)
+        if key not in self._pens:
+            pen = QtGui.QPen(QtGui.QColor(*colour), width, style)
+            pen.setCosmetic(True)
+            self._pens[key] = pen
+        return self._pens[key]
+
+    def _make_items(self, group, dots, edges, n_individuals, n_bodyparts, bpt_indices):
+        # Replace the items of a group with a dot for each body point and a line for each skeleton edge
+        for item in dots + edges:
+            self.scene().removeItem(item)
+        dots[:], edges[:] = [], []
+        for _ in range(n_individuals):
+            for _ in range(n_bodyparts):
+                dot = QtWidgets.QGraphicsEllipseItem(group)
+                dot.setPen(QtGui.QPen(Qt.NoPen))
+                dot.setZValue(1)
+                dots.append(dot)
+            for _ in bpt_indices:
+                edges.append(QtWidgets.QGraphicsLineItem(group))
+        return [tuple(edge) for edge in bpt_indices]
+
+    def set_points(self, points, bpt_indices, uncertain=None, highlight=None, dot_size=4):
+        """
+        Move the body points and the skeleton to the tracked points of a frame, plotted like
+        plotTrackedPoints.plot_points. Missing body points are hidden
+        :param points: the tracked points with shape (individuals, body parts, coords). None to hide them
+        :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+        :param uncertain: boolean array with shape (individuals, body parts) of the body points with a low likelihood.
+        They are plotted dimmed and smaller, and so are the lines of the skeleton to them
+        :param highlight: boolean array with shape (individuals, edges) of the skeleton edges to plot thicker in yellow
+        :param dot_size: the radius of the body points in video pixels
+        """
+        if points is None:
+            self.overlay.hide()
+            return
+        n_individuals, n_bodyparts = points.shape[:2]
+        if (len(self._dots) != n_individuals * n_bodyparts
+                or self._bpt_indices != [tuple(edge) for edge in bpt_indices]):
+            self._bpt_indices = self._make_items(self.overlay, self._dots, self._edges, n_individuals, n_bodyparts,
+                                                 bpt_indices)
+        missing = np.isnan(points[..., :2]).any(axis=-1)
+        large = QRectF(-dot_size, -dot_size, 2 * dot_size, 2 * dot_size)
+        small = large.adjusted(1, 1, -1, -1)
+        n_edges = len(self._bpt_indices)
+        for j in range(n_individuals):
+            red, green, blue = _individual_colours[j % len(_individual_colours)]
+            for i in range(n_bodyparts):
+                dot = self._dots[j * n_bodyparts + i]
+                if missing[j, i]:
+                    dot.hide()
+                    continue
+                dimmed = uncertain is not None and uncertain[j, i]
+                if dimmed:
+                    dot.setRect(small)
+                    dot.setBrush(QtGui.QColor(red * 110 // 255 + 40, green * 110 // 255 + 40, blue * 110 // 255 + 40))
+                else:
+                    dot.setRect(large)
+                    dot.setBrush(QtGui.QColor(red, green, blue))
+                dot.setPos(points[j, i, 0], points[j, i, 1])
+                dot.show()
+            for e, (bp1, bp2) in enumerate(self._bpt_indices):
+                edge = self._edges[j * n_edges + e]
+                if missing[j, bp1] or missing[j, bp2]:
+                    edge.hide()
+                    continue
+                if highlight is not None and highlight[j, e]:
+                    edge.setPen(self._pen(_highlight_colour, 3))
+                elif uncertain is not None and (uncertain[j, bp1] or uncertain[j, bp2]):
+                    edge.setPen(self._pen((110, 110, 110)))
+                else:
+                    edge.setPen(self._pen((255, 255, 255)))
+                edge.setLine(points[j, bp1, 0], points[j, bp1, 1], points[j, bp2, 0], points[j, bp2, 1])
+                edge.show()
+        self.overlay.show()
+
+    def set_comparison_points(self, points, bpt_indices, dot_size=4):
+        """
+        Move the body points and the skeleton of the comparison to its tracked points of a frame. The body points are
+        rings in the colour of the individual they are matched to and the skeleton is dashed, so they can be told apart
+        from the tracked points being corrected. Missing body points are hidden
+        :param points: the x and y with shape (individuals, body parts, 2). None to hide them
+        :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+        :param dot_size: the radius of the body points in video pixels
+        """
+        if points is None:
+            self.comparison.hide()
+            return
+        n_individuals, n_bodyparts = points.shape[:2]
+        if (len(self._comparison_dots) != n_individuals * n_bodyparts
+                or self._comparison_bpt_indices != [tuple(edge) for edge in bpt_indices]):
+            self._comparison_bpt_indices = self._make_items(self.comparison, self._comparison_dots,
+                                                            self._comparison_edges, n_individuals, n_bodyparts,
+                                                            bpt_indices)
+            for dot in self._comparison_dots:
+                dot.setBrush(QtGui.QBrush(Qt.NoBrush))
+                dot.setRect(QRectF(-dot_size - 1, -dot_size - 1, 2 * dot_size + 2, 2 * dot_size + 2))
+        missing = np.isnan(points).any(axis=-1)
+        n_edges = len(self._comparison_bpt_indices)
+        for j in range(n_individuals):
+            colour = _individual_colours[j % len(_individual_colours)]
+            for i in range(n_bodyparts):
+                dot = self._comparison_dots[j * n_bodyparts + i]
+                if missing[j, i]:
+                    dot.hide()
+                    continue
+                dot.setPen(self._pen(colour, 2))
+                dot.setPos(points[j, i, 0], points[j, i, 1])
+                dot.show()
+            for e, (bp1, bp2) in enumerate(self._comparison_bpt_indices):
+                edge = self._comparison_edges[j * n_edges + e]
+                if missing[j, bp1] or missing[j, bp2]:
+                    edge.hide()
+                    continue
+                edge.setPen(self._pen(colour, 1, Qt.DashLine))
+                edge.setLine(points[j, bp1, 0], points[j, bp1, 1], points[j, bp2, 0], points[j, bp2, 1])
+                edge.show()
+        self.comparison.setVisible(self.overlay.isVisible())
+
+    def set_overlay_visible(self, visible):
+        self.overlay.setVisible(visible)
+        if not visible:
+            self.comparison.hide()
+
+    def add_relabel_point(self, animal, bodypart, position, colour):
+        """
+        Add a relabel point. It replaces the point of the same animal and body part
+        :param animal: the animal identity
+        :param bodypart: the body part
+        :param position: the position in video pixels
+        :param colour: the colour of the point
+        """
+        for item in self.relabel_items():
+            if item.animal == animal and item.bodypart == bodypart:
+                self.scene().removeItem(item)
+        item = RelabelPoint(animal, bodypart, colour)
+        item.setPos(position)
+        self.scene().addItem(item)
+
+    def relabel_items(self):
+        return [item for item in self.scene().items() if isinstance(item, RelabelPoint)]
+
+    def relabel_points(self):
+        """
+        The relabel points where they are now
+        :return: dictionary of the animals with a dictionary of the body parts and their (x, y) in video pixels
+        """
+        animal_bodypoints = {}
+        for item in self.relabel_items():
+            animal_bodypoints.setdefault(item.animal, {})[item.bodypart] = (item.pos().x(), item.pos().y())
+        return animal_bodypoints
+
+    def clear_relabel_points(self):
+        for item in self.relabel_items():
+            self.scene().removeItem(item)
+
+    def remove_selected_points(self):
+        for item in self.scene().selectedItems():
+            if isinstance(item, RelabelPoint):
+                self.scene().removeItem(item)
+
+    def wheelEvent(self, event):
+        # Keep the point of the frame under the mouse where it is
+        position = event.position().toPoint()
+        anchor = self.mapToScene(position)
+        self.set_zoom(self.zoom * 1.25 ** (event.angleDelta().y() / 120))
+        shift = self.mapFromScene(anchor) - position
+        self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() + shift.x())
+        self.verticalScrollBar().setValue(self.verticalScrollBar().value() + shift.y())
+
+    def mousePressEvent(self, event):
+        if isinstance(self.itemAt(event.position().toPoint()), RelabelPoint):
+            # Drag or select the relabel point
+            super().mousePressEvent(event)
+            return
+        self.scene().clearSelection()
+        self._press = (event.position(), event.button(), self.horizontalScrollBar().value(),
+                       self.verticalScrollBar().value())
+        self._panning = False
+
+    def mouseMoveEvent(self, event):
+        if self._press is None:
+            super().mouseMoveEvent(event)
+            return
+        start, _, horizontal, vertical = self._press
+        delta = event.position() - start
+        if not self._panning and delta.manhattanLength() >= QtWidgets.QApplication.startDragDistance():
+            self._panning = True
+            self.viewport().setCursor(Qt.ClosedHandCursor)
+        if self._panning:
+            self.horizontalScrollBar().setValue(int(horizontal - delta.x()))
+            self.verticalScrollBar().setValue(int(vertical - delta.y()))
+
+    def mouseReleaseEvent(self, event):
+        if self._press is None:
+            super().mouseReleaseEvent(event)
+            return
+        start, button, _, _ = self._press
+        self._press = None
+        if self._panning:
+            self._panning = False
+            self.viewport().unsetCursor()
+            return
+        # A click that did not pan
+        position = self.mapToScene(start.toPoint())
+        if self._frame_rect.contains(position):
+            self.point_clicked.emit(position, button)
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def interpolate_points(data, mask=None, max_gap=None):
+    """
+    Fill the missing body points by linear interpolation between the closest tracked frames before and after them.
+    All the body points of all the individuals are filled at once, without a loop over the frames or the body points
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param mask: boolean array with shape (frames, individuals, body parts) of more body points to replace e.g. the
+    flags of findBadTracking.keypoint_jumps. The ones that cannot be filled are set to missing
+    :param max_gap: the longest run of missing frames to fill. Longer runs stay missing. All of them are filled by
+    default
+    :return: the x and y of the body points with shape (frames, individuals, body parts, 2), and the boolean array with
+    shape (frames, individuals, body parts) of the body points that were filled
+    """
+    n_frames = len(data)
+    points = data[..., :2].astype(float)
+    missing = np.isnan(points).any(axis=-1)
+    if mask is not None:
+        missing |= mask
+    # The closest tracked frame at or before and at or after each frame, for every body point
+    frames = np.arange(n_frames).reshape((-1, 1, 1))
+    before = np.maximum.accumulate(np.where(missing, -1, frames), axis=0)
+    after = np.minimum.accumulate(np.where(missing, n_frames, frames)[::-1], axis=0)[::-1]
+    filled = missing & (before >= 0) & (after < n_frames)
+    if max_gap is not None:
+        filled &= after - before - 1 <= max_gap
+
+    # Only the filled body points are worked out
+    frame, individual, bodypart = np.nonzero(filled)
+    first, last = before[frame, individual, bodypart], after[frame, individual, bodypart]
+    start, end = points[first, individual, bodypart], points[last, individual, bodypart]
+    weight = ((frame - first) / (last - first))[:, None]
+    points[missing] = np.nan
+    points[frame, individual, bodypart] = start + weight * (end - start)
+    return points, filled
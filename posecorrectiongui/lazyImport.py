@@ -0,0 +1,57 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported the first time one of its attributes is used
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_name = name
+
+    def _load(self):
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+
+def lazy_import(name):
+    """
+    Import a module the first time it is used, to keep the start up fast
+    :param name: the name of the module
+    :return: the module if it has already been imported, otherwise a stand-in for it
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def preload_modules(names, timer=None):
+    """
+    Import modules in a background thread, so they are ready by the time they are used. Using a module while it is
+    still being imported waits for the import to finish
+    :param names: the names of the modules
+    :param timer: the StageTimer to record how long each import took
+    :return: the thread
+    """
+    def preload():
+        for name in names:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                continue
+            if timer is not None:
+                timer.record(f'import {name}', (time.perf_counter() - start) * 1000)
+
+    thread = threading.Thread(target=preload, name='preload-modules', daemon=True)
+    thread.start()
+    return thread
@@ -1,35 +1,50 @@
-import os.path
 import sys
+import time
 from pathlib import Path
-import yaml
-import cv2
-import pandas as pd
-import numpy as np
+import_start = time.perf_counter()
 
 from PySide6 import QtWidgets, QtGui
-from PySide6.QtCore import Qt, QPoint
-from PySide6.QtGui import QAction, QIcon, QKeySequence, QScreen, QPainter
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QAction, QIcon, QKeySequence, QScreen
 from PySide6.QtWidgets import (QApplication, QFileDialog,
                                QMainWindow, QToolBar)
+qt_import_time = time.perf_counter() - import_start
 
 from setRunParameters import set_run_parameters
-from processFrame import process_frame
-from qImageProcess import qt_image_process
-from saveLastFrameNumber import save_last_frame_number
-from plotTrackedPoints import plot_tracked_points
-from swapLabels import swap_labels, swap_label_sequences
-from propagateFrame import propagate_frame
-from relabelPoints import relabel_points
-from updateH5file import update_h5file
-from saveFrames import save_frame
-from findBadTracking import find_bad_tracking
-from moveToIndex import move_to_index
+from stageTimer import StageTimer
+from playbackClock import PlaybackClock
+from qualityStrip import QualityStrip
+from trajectoryPanel import TrajectoryPanel, WINDOWS
+from frameView import FrameView
+from cameraPanel import CameraPanel
+from lazyImport import lazy_import, preload_modules
+
+# These modules import cv2, pandas, numpy, scikit-image, PyTables or PyYAML, which take seconds to load. They are
+# imported when first used, or in the background once the window is shown
+yaml = lazy_import('yaml')
+saveLastFrameNumber = lazy_import('saveLastFrameNumber')
+sessionStore = lazy_import('sessionStore')
+relabelPoints = lazy_import('relabelPoints')
+correctionEngine = lazy_import('correctionEngine')
+exportVideo = lazy_import('exportVideo')
+reviewProgress = lazy_import('reviewProgress')
+projectQueue = lazy_import('projectQueue')
+findBadTracking = lazy_import('findBadTracking')
+multiCamera = lazy_import('multiCamera')
+actionRecorder = lazy_import('actionRecorder')
+smoothDialog = lazy_import('smoothDialog')
+preloaded_modules = ['yaml', 'sessionStore', 'numpy', 'cv2', 'pandas', 'tables', 'skimage.draw', 'relabelPoints',
+                     'saveLastFrameNumber', 'correctionEngine', 'exportVideo', 'reviewProgress', 'projectQueue']
 
 
 class MainGUI(QMainWindow):
 
-    def __init__(self, video_name=None, h5_name=None):
+    def __init__(self, video_name=None, h5_name=None, defer_loading=False, record_file=None, config_overrides=None):
         super().__init__()
+        # Settings that replace the ones of config.yaml, e.g. a temporary sessions_db for the benchmarks, so they do
+        # not touch the sessions of the annotator
+        self.config_overrides = config_overrides or {}
+        self.startup_timer = StageTimer()
         self.parameters = set_run_parameters()
         self.filters = "Any File (*)"
         self.scale_factor = self.parameters.scale_factor
@@ -38,18 +53,70 @@ class MainGUI(QMainWindow):
         self.h5_name = h5_name
         self.click_label_button = Qt.RightButton
         self.event_use_wasd_keys(use_wasd=False)
+        self.timer = StageTimer()
+        self._engine = None
+        self.session_store = None
+        self.project_queue = None
+        # The other cameras of the session, shown in the Cameras dock
+        self.camera_rig = None
+
+        # Filled in from the configuration file by load_config
+        self.videos_main_path = ''
+        self.h5files_main_path = ''
+        self.body_parts = []
+        self.skeleton = []
+        self.animals_list = []
+        self.animals_identity = ['both']
+        self.save_frame_path = ['']
+        self.pcutoff = 0.6
+        self.bad_tracking_window = None
+        self.decoder_workers = 0
+        self.body_parts_keys = {}
 
-        # Using Configuration Files ############################################################################
-        config_path = Path('.') / 'config.yaml'
+        self.index = 0
+        self.frame_number = 0
+        # The frame last gone to by divergence from the comparison h5 file
+        self.divergent_frame_number = None
+
+        # The actions are wrapped to record them before the widgets are connected to them
+        self.recorder = None
+        if record_file:
+            self.recorder = actionRecorder.ActionRecorder(self, record_file)
+
+        with self.startup_timer.stage('create window'):
+            self.create_ui()
+            self.frame_view = FrameView(self.scale_factor)
+            self.frame_view.point_clicked.connect(self.event_label_point)
+
+            self.setCentralWidget(self.frame_view)
+
+            self.timings_overlay = QtWidgets.QLabel(self.frame_view)
+            self.timings_overlay.setStyleSheet('background-color: rgba(0, 0, 0, 160); color: white; padding: 4px;')
+            self.timings_overlay.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+            self.timings_overlay.move(5, 5)
+            self.timings_overlay.hide()
+
+        # Reading the configuration files can be slow on network home directories, so the GUI can show the window
+        # first and read them once the event loop runs
+        if defer_loading:
+            QTimer.singleShot(0, self.load_config)
+        else:
+            self.load_config()
+        if self.recorder is not None:
+            self.recorder.start()
 
-        with open(config_path, 'r') as fr:
-            config = yaml.load(fr, Loader=yaml.FullLoader)
+    # Using Configuration Files ############################################################################
+    def load_config(self) -> None:
+        with self.startup_timer.stage('read config'):
+            config_path = Path('.') / 'config.yaml'
 
-        self.last_frame_path = Path('.') / 'last_video_frame.yaml'
+            with open(config_path, 'r') as fr:
+                config = yaml.load(fr, Loader=yaml.FullLoader)
+            config.update(self.config_overrides)
 
-        if self.last_frame_path.exists():
-            with open(self.last_frame_path, 'r') as fr:
-                self.last_frame_data = yaml.load(fr, Loader=yaml.FullLoader)
+        with self.startup_timer.stage('open session store'):
+            self.session_store = sessionStore.SessionStore(config.get('sessions_db'))
+            self.session_store.import_yaml(Path('.') / 'last_video_frame.yaml')
 
         self.videos_main_path = str(config['videos_main_path'][0])
         self.h5files_main_path = str(config['h5files_path'][0])
@@ -60,21 +127,42 @@ class MainGUI(QMainWindow):
         self.animals_identity = self.animals_list.copy()
         self.animals_identity.append('both')
         self.save_frame_path = config['frames_path']
+        self.pcutoff = config.get('pcutoff') or 0.6
+        self.bad_tracking_window = config.get('bad_tracking_window') or None
+        self.decoder_workers = config.get('decoder_workers') or 0
+        if self._engine is not None:
+            # The engine can be made by the widgets before the config is loaded
+            self._engine.skeleton = self.skeleton
+            self._engine.pcutoff = self.pcutoff
+            self._engine.baseline_window = self.bad_tracking_window
+            self._engine.decoder_workers = self.decoder_workers
 
         self.body_parts_keys = {}
         for i, v in enumerate(self.body_parts):
             self.body_parts_keys[v] = i
 
-        self.animal_bodypoints = {}
-        self.bodypoints1 = {}
-        self.bodypoints2 = {}
-        self.index = 0
-        self.frame_number = 0
-
-        self.create_ui()
-        self.imageLabel = QtWidgets.QLabel()
-
-        self.setCentralWidget(self.imageLabel)
+        # Add animals to propagate list
+        self.prop_animal.clear()
+        self.prop_animal.addItems(self.animals_identity)
+        self.prop_animal.setCurrentText(self.animals_identity[-1])
+        # Add animals to label list
+        self.label_animal.clear()
+        self.label_animal.addItems(self.animals_list)
+        # Add body parts to widgets
+        self.body_parts_list.clear()
+        self.body_parts_list.addItems(self.body_parts)
+        self.body_parts_list.setCurrentRow(0)
+        self.startup_timer.record('time to ready', (time.perf_counter() - import_start) * 1000)
+
+    # The engine imports cv2 and pandas, so it is only created when it is first needed
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = correctionEngine.CorrectionEngine(skeleton=self.skeleton, autosave=True, timer=self.timer,
+                                                             pcutoff=self.pcutoff,
+                                                             baseline_window=self.bad_tracking_window,
+                                                             decoder_workers=self.decoder_workers)
+        return self._engine
 
     def create_ui(self) -> None:
         self.create_action()
@@ -94,6 +182,18 @@ class MainGUI(QMainWindow):
         self.file_menu = self.menuBar().addMenu("&File")
         self.file_menu.addAction(self.open_video_action)
         self.file_menu.addAction(self.open_h5_action)
+        self.file_menu.addSeparator()
+        self.file_menu.addAction(self.open_comparison_action)
+        self.file_menu.addAction(self.close_comparison_action)
+        self.file_menu.addAction(self.next_divergent_action)
+        self.file_menu.addAction(self.previous_divergent_action)
+        self.file_menu.addSeparator()
+        self.file_menu.addAction(self.add_camera_action)
+        self.file_menu.addAction(self.remove_cameras_action)
+        self.file_menu.addSeparator()
+        self.file_menu.addAction(self.open_project_action)
+        self.file_menu.addAction(self.next_session_action)
+        self.file_menu.addAction(self.previous_session_action)
 
         # self.edit_menu = self.menuBar().addMenu("&Edit Video")
         # self.edit_menu.addAction(self.next_frame_action)
@@ -103,8 +203,25 @@ class MainGUI(QMainWindow):
         # self.edit_menu.addAction(self.mark_start_action)
         # self.edit_menu.addAction(self.mark_end_action)
 
+        self.tools_menu = self.menuBar().addMenu("&Tools")
+        self.tools_menu.addAction(self.show_timings_action)
+        self.tools_menu.addAction(self.export_timings_action)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.export_flagged_frames_action)
+        self.tools_menu.addAction(self.export_video_action)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.review_summary_action)
+        self.tools_menu.addAction(self.fix_jumps_action)
+        self.tools_menu.addAction(self.smooth_action)
+        self.tools_menu.addAction(self.replay_corrections_action)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.trajectory_dock.toggleViewAction())
+        self.tools_menu.addAction(self.camera_dock.toggleViewAction())
+        self.tools_menu.addAction(self.reset_zoom_action)
+
         self.help_menu = self.menuBar().addMenu("&Help")
         self.help_menu.addAction(self.help_action)
+        self.help_menu.addAction(self.startup_report_action)
 
     def create_toolbar(self) -> None:
         self.top_toolbar = QToolBar('Load Video and H5file Toolbar')
@@ -113,6 +230,10 @@ class MainGUI(QMainWindow):
         self.top_toolbar.addAction(self.open_h5_action)
         self.top_toolbar.addSeparator()
         self.top_toolbar.addWidget(self.frame_number_widget)
+        self.top_toolbar.addSeparator()
+        self.top_toolbar.addAction(self.previous_session_action)
+        self.top_toolbar.addWidget(self.session_status)
+        self.top_toolbar.addAction(self.next_session_action)
 
         self.left_side_toolbar = QToolBar('Frame Toolbar')
         self.addToolBar(Qt.LeftToolBarArea, self.left_side_toolbar)
@@ -126,6 +247,12 @@ class MainGUI(QMainWindow):
         self.left_side_toolbar.addAction(self.jump_forward_action)
         self.left_side_toolbar.addWidget(self.jump_number)
         self.left_side_toolbar.addAction(self.jump_backward_action)
+        self.left_side_toolbar.addSeparator()
+        self.left_side_toolbar.addAction(self.play_action)
+        self.left_side_toolbar.addWidget(self.playback_speed)
+        self.left_side_toolbar.addWidget(self.playback_fps)
+        self.left_side_toolbar.addWidget(self.playback_status)
+        self.left_side_toolbar.addSeparator()
         self.left_side_toolbar.addWidget(self.swap_labels)
         self.left_side_toolbar.addSeparator()
         self.left_side_toolbar.addWidget(self.save_frame_widget)
@@ -133,6 +260,10 @@ class MainGUI(QMainWindow):
         self.left_side_toolbar.addWidget(self.find_bad_tracking_button)
         self.left_side_toolbar.addWidget(self.next_index_button)
         self.left_side_toolbar.addWidget(self.behavior_index_completion)
+        self.left_side_toolbar.addWidget(self.next_low_confidence_button)
+        self.left_side_toolbar.addWidget(self.low_confidence_status)
+        self.left_side_toolbar.addWidget(self.edge_outlier_status)
+        self.left_side_toolbar.addWidget(self.divergence_status)
 
         self.right_side_toolbar = QToolBar('Sequence Toolbar')
         self.addToolBar(Qt.RightToolBarArea, self.right_side_toolbar)
@@ -158,7 +289,13 @@ class MainGUI(QMainWindow):
 
         self.slider_toolbar = QToolBar('Slider Dock')
         self.addToolBar(Qt.BottomToolBarArea, self.slider_toolbar)
-        self.slider_toolbar.addWidget(self.frame_slider_widget)
+        slider_widget = QtWidgets.QWidget()
+        slider_layout = QtWidgets.QVBoxLayout(slider_widget)
+        slider_layout.setContentsMargins(0, 0, 0, 0)
+        slider_layout.setSpacing(2)
+        slider_layout.addWidget(self.quality_strip)
+        slider_layout.addWidget(self.frame_slider_widget)
+        self.slider_toolbar.addWidget(slider_widget)
 
     def create_action(self) -> None:
         icon = QIcon.fromTheme("document-open")
@@ -172,10 +309,102 @@ class MainGUI(QMainWindow):
                                       statusTip="Open H5 file",
                                       triggered=self.open_h5_file)
 
+        self.open_comparison_action = QAction(QIcon(), 'Open &Comparison H5...', self,
+                                              statusTip="Load a second h5 file of the video, e.g. of another model, "
+                                                        "and show its tracked points as rings",
+                                              triggered=self.event_open_comparison)
+
+        self.close_comparison_action = QAction(QIcon(), 'Close Comparison', self,
+                                               statusTip="Stop comparing with the second h5 file",
+                                               triggered=self.event_close_comparison)
+
+        self.next_divergent_action = QAction(QIcon(), 'Next &Divergent Frame', self,
+                                             shortcut=QKeySequence("Ctrl+d"),
+                                             statusTip="Go to the frame where the two h5 files are next furthest "
+                                                       "apart",
+                                             triggered=lambda: self.event_next_divergent(1))
+
+        self.previous_divergent_action = QAction(QIcon(), 'Previous Divergent Frame', self,
+                                                 shortcut=QKeySequence("Ctrl+Shift+d"),
+                                                 statusTip="Go back to the frame where the two h5 files are further "
+                                                           "apart",
+                                                 triggered=lambda: self.event_next_divergent(-1))
+
+        self.add_camera_action = QAction(QIcon(), 'Add Ca&mera...', self,
+                                         statusTip="Show the video and h5 file of another camera of the session next "
+                                                   "to the main video, at the same frame",
+                                         triggered=self.event_add_camera)
+
+        self.remove_cameras_action = QAction(QIcon(), 'Remove Cameras', self,
+                                             statusTip="Stop showing the other cameras",
+                                             triggered=self.event_remove_cameras)
+
+        self.open_project_action = QAction(QIcon(), 'Open &Project', self,
+                                           shortcut=QKeySequence("Ctrl+Shift+o"),
+                                           statusTip="Work through the videos with h5 files in the folders of "
+                                                     "config.yaml one after the other",
+                                           triggered=self.open_project)
+
+        self.next_session_action = QAction(QIcon(), 'Next Session', self,
+                                           shortcut=QKeySequence("Ctrl+Shift+Right"),
+                                           toolTip="Open the next video and h5 file of the project",
+                                           triggered=self.event_next_session)
+
+        self.previous_session_action = QAction(QIcon(), 'Previous Session', self,
+                                               shortcut=QKeySequence("Ctrl+Shift+Left"),
+                                               toolTip="Open the previous video and h5 file of the project",
+                                               triggered=self.event_previous_session)
+
         self.help_action = QAction(QIcon(), '&Show Shortcuts',
                                    self, shortcut=QKeySequence("Ctrl+p"),
                                    triggered=self.show_shortcuts)
 
+        self.startup_report_action = QAction(QIcon(), 'Start Up &Report', self,
+                                             statusTip="Show how long each step of starting the GUI took",
+                                             triggered=self.show_startup_report)
+
+        self.show_timings_action = QAction(QIcon(), 'Show &Timings', self, checkable=True,
+                                           shortcut=QKeySequence("Ctrl+t"),
+                                           statusTip="Show the rolling p50/p95 time of each stage",
+                                           toggled=self.event_show_timings)
+
+        self.export_timings_action = QAction(QIcon(), '&Export Timings',
+                                             self, statusTip="Save the timings of the session as CSV",
+                                             triggered=self.event_export_timings)
+
+        self.export_flagged_frames_action = QAction(QIcon(), 'Export &Flagged Frames', self,
+                                                    statusTip="Save all the frames with bad tracking as png images",
+                                                    triggered=self.event_export_flagged_frames)
+
+        self.export_video_action = QAction(QIcon(), 'Export &Overlay Video', self,
+                                           statusTip="Save the video with the corrected tracked points plotted",
+                                           triggered=self.event_export_video)
+
+        self.review_summary_action = QAction(QIcon(), '&Review Progress', self,
+                                             statusTip="Show the frames reviewed and edited in each part of the video",
+                                             triggered=self.event_review_summary)
+
+        self.reset_zoom_action = QAction(QIcon(), 'Reset &Zoom', self,
+                                         statusTip="Show the whole frame again. Scroll on the frame to zoom in and "
+                                                   "drag to pan",
+                                         shortcut=QKeySequence("Ctrl+0"),
+                                         triggered=lambda: self.frame_view.reset_zoom())
+
+        self.fix_jumps_action = QAction(QIcon(), 'Fix &Jumping Points', self,
+                                        statusTip="Replace the body points that jump away for a few frames by "
+                                                  "interpolation",
+                                        triggered=self.event_fix_jumps)
+
+        self.smooth_action = QAction(QIcon(), '&Smooth Trajectories...', self,
+                                     statusTip="Filter the trajectories of the body points and repair their outliers "
+                                               "and gaps",
+                                     triggered=self.event_smooth)
+
+        self.replay_corrections_action = QAction(QIcon(), 'Replay &Corrections...', self,
+                                                 statusTip="Apply the corrections of an earlier tracking run of the "
+                                                           "video to the h5 file",
+                                                 triggered=self.event_replay_corrections)
+
     def create_frame_action(self) -> None:
         self.next_frame_action = QAction(QIcon(), '&Next Frame', self,
                                          toolTip="Go to the next Frame",
@@ -201,6 +430,12 @@ class MainGUI(QMainWindow):
                                             shortcut=QKeySequence(self.jump_backward_key)
                                             )
 
+        self.play_action = QAction(QIcon(), 'Play', self, checkable=True,
+                                   toolTip="Play/Pause the video",
+                                   toggled=self.event_play_pause,
+                                   shortcut=QKeySequence("space")
+                                   )
+
         self.mark_start_action = QAction(QIcon(), 'Mark Start',
                                          toolTip="Mark Start to Swap Sequence",
                                          triggered=self.event_mark_start,
@@ -215,6 +450,7 @@ class MainGUI(QMainWindow):
 
     def create_widgets(self) -> None:
         self.frame_number_widget = QtWidgets.QLabel()
+        self.session_status = QtWidgets.QLabel()
         font = self.frame_number_widget.font()
         font.setPointSize(15)
         self.frame_number_widget.setFont(font)
@@ -255,10 +491,7 @@ class MainGUI(QMainWindow):
         self.swap_sequence_button.setShortcut(QKeySequence("Ctrl+/"))
 
         self.prop_animal = QtWidgets.QComboBox()
-        # Add animals to propagate list
-        self.prop_animal.addItems(self.animals_identity)
         self.prop_animal.setFixedWidth(100)
-        self.prop_animal.setCurrentText(self.animals_identity[-1])
 
         self.prop_forward = QtWidgets.QPushButton('Propagate Forward')
         self.prop_forward.setFont(font)
@@ -285,16 +518,11 @@ class MainGUI(QMainWindow):
         self.relabel_button.setShortcut(QKeySequence("Ctrl+l"))
 
         self.label_animal = QtWidgets.QComboBox()
-        # Add animals to label list
-        self.label_animal.addItems(self.animals_list)
         self.label_animal.setFont(font)
         self.label_animal.setFixedWidth(100)
         self.label_animal.currentTextChanged.connect(self.event_update_selection)
 
         self.body_parts_list = QtWidgets.QListWidget()
-        # Add body parts to widgets
-        self.body_parts_list.addItems(self.body_parts)
-        self.body_parts_list.setCurrentRow(0)
         self.scrollArea = QtWidgets.QScrollArea()
         self.scrollArea.setWidget(self.body_parts_list)
         self.scrollArea.setFixedWidth(120)
@@ -316,6 +544,40 @@ class MainGUI(QMainWindow):
         self.frame_slider_widget.setSingleStep(1)
         self.frame_slider_widget.valueChanged[int].connect(self.event_frame_slider)
 
+        self.quality_strip = QualityStrip()
+        self.quality_strip.frame_clicked.connect(self.event_quality_strip)
+
+        self.trajectory_panel = TrajectoryPanel()
+        self.trajectory_panel.frame_clicked.connect(self.event_quality_strip)
+        self.trajectory_window = QtWidgets.QComboBox()
+        self.trajectory_window.addItems([name for name, _ in WINDOWS])
+        self.trajectory_window.currentIndexChanged[int].connect(self.event_trajectory_window)
+        self.trajectory_bodypart = QtWidgets.QComboBox()
+        self.trajectory_bodypart.addItem('All Body Parts')
+        self.trajectory_bodypart.currentIndexChanged[int].connect(self.event_trajectory_bodypart)
+        trajectory_controls = QtWidgets.QHBoxLayout()
+        trajectory_controls.addWidget(self.trajectory_window)
+        trajectory_controls.addWidget(self.trajectory_bodypart)
+        trajectory_controls.addStretch()
+        trajectory_widget = QtWidgets.QWidget()
+        trajectory_layout = QtWidgets.QVBoxLayout(trajectory_widget)
+        trajectory_layout.setContentsMargins(2, 2, 2, 2)
+        trajectory_layout.addLayout(trajectory_controls)
+        trajectory_layout.addWidget(self.trajectory_panel)
+        self.trajectory_dock = QtWidgets.QDockWidget('Trajectories', self)
+        self.trajectory_dock.setWidget(trajectory_widget)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.trajectory_dock)
+        self.trajectory_dock.hide()
+        self.trajectory_dock.toggleViewAction().setShortcut(QKeySequence("Ctrl+j"))
+
+        self.camera_panel = CameraPanel(self.scale_factor / 2)
+        self.camera_panel.offset_changed.connect(self.event_camera_offset)
+        self.camera_panel.remove_clicked.connect(self.event_remove_camera)
+        self.camera_dock = QtWidgets.QDockWidget('Cameras', self)
+        self.camera_dock.setWidget(self.camera_panel)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.camera_dock)
+        self.camera_dock.hide()
+
         self.save_frame_widget = QtWidgets.QPushButton('Save Frame')
         font = self.save_frame_widget.font()
         font.setPointSize(10)
@@ -335,6 +597,24 @@ class MainGUI(QMainWindow):
         self.next_index_button.clicked.connect(self.event_move_to_index)
         self.next_index_button.setShortcut(QKeySequence("Ctrl+n"))
 
+        self.next_low_confidence_button = QtWidgets.QPushButton('Next Low Confidence')
+        self.next_low_confidence_button.setFont(font)
+        self.next_low_confidence_button.setFixedWidth(120)
+        self.next_low_confidence_button.setToolTip('Go to the next frame with body points with a likelihood below '
+                                                   'pcutoff')
+        self.next_low_confidence_button.clicked.connect(self.event_next_low_confidence)
+        self.next_low_confidence_button.setShortcut(QKeySequence("Ctrl+Shift+n"))
+
+        self.low_confidence_status = QtWidgets.QLabel()
+
+        self.edge_outlier_status = QtWidgets.QLabel()
+        self.edge_outlier_status.setToolTip('Skeleton edges much longer or shorter than usual in this frame. They are '
+                                            'plotted in yellow')
+
+        self.divergence_status = QtWidgets.QLabel()
+        self.divergence_status.setToolTip('How far the tracked points are from the comparison h5 file in this frame, '
+                                          'and the rank of the frame from the furthest apart')
+
         self.done_fixing_button = QtWidgets.QPushButton('Done Fixing Tracking')
         self.done_fixing_button.setFont(font)
         self.done_fixing_button.setFixedWidth(120)
@@ -345,24 +625,42 @@ class MainGUI(QMainWindow):
         font.setPointSize(8)
         self.behavior_index_completion.setFont(font)
 
+        self.playback_speed = QtWidgets.QComboBox()
+        self.playback_speed.addItems(['0.25x', '0.5x', '1x', '1.5x', '2x', '4x'])
+        self.playback_speed.setCurrentText('1x')
+        self.playback_speed.setFixedWidth(100)
+        self.playback_speed.currentTextChanged.connect(self.event_playback_rate)
+
+        self.playback_fps = QtWidgets.QLineEdit()
+        self.playback_fps.setPlaceholderText('Video fps')
+        self.playback_fps.setFixedWidth(100)
+        self.playback_fps.returnPressed.connect(self.event_playback_rate)
+        self.playback_fps.returnPressed.connect(self.event_disable_lineedit)
+
+        self.playback_status = QtWidgets.QLabel()
+        self.playback_status.setFont(font)
+
+        self.playback_clock = PlaybackClock()
+        self.playback_timer = QTimer(self)
+        self.playback_timer.setTimerType(Qt.PreciseTimer)
+        self.playback_timer.timeout.connect(self.event_playback_tick)
+
     # Load the video file
     def open_vid_file(self) -> None:
+        self.save_session()
         try:
             self.video_name, self.filter_name = QFileDialog.getOpenFileName(self,
                                                                             caption="Open file",
                                                                             filter=self.filters,
                                                                             dir=self.videos_main_path)
-            self.cap = cv2.VideoCapture(self.video_name)
-            self.length = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) - 1
-            self.indexlength = int(np.ceil(np.log10(self.length)))
+            self.length = self.engine.load_video(self.video_name)
+            self.frame_number = self.engine.clamp(self.frame_number)
             self.frame_slider_widget.setRange(0, self.length)
-            ret, self.image = self.cap.read()
-            self.image = process_frame(self.image, scale_factor=self.parameters.scale_factor)
-            self.imageLabel.setPixmap(qt_image_process(self.image))
-            self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-            if self.last_frame_path.exists():
-                if self.video_name in self.last_frame_data.keys():
-                    self.move_to_last_labeled_frame()
+            self.display_frame()
+            self.restore_settings()
+            last_frame = self.session_store.last_frame(self.video_name)
+            if last_frame is not None:
+                self.move_to_last_labeled_frame(last_frame)
 
             # Fix the size of the GUI
             # self.setFixedWidth(self.width())
@@ -374,20 +672,16 @@ class MainGUI(QMainWindow):
             QtWidgets.QMessageBox.warning(self, 'Error', 'File  does not exist \n'
                                                          'You might need to restart the GUI')
 
-    def move_to_last_labeled_frame(self) -> None:
+    def move_to_last_labeled_frame(self, last_frame: int) -> None:
         last_frame_output = QtWidgets.QMessageBox.question(self, 'Last Frame',
                                                            'Do you want to go to the last labeled frame',
                                                            buttons=(QtWidgets.QMessageBox.StandardButton.Yes |
                                                                     QtWidgets.QMessageBox.StandardButton.No),
                                                            defaultButton=QtWidgets.QMessageBox.StandardButton.Yes)
         if last_frame_output == QtWidgets.QMessageBox.StandardButton.Yes:
-            self.frame_number = self.last_frame_data[self.video_name]
-            self.cap.set(1, self.frame_number)
-            ret, self.image = self.cap.read()
-            self.image = process_frame(self.image, scale_factor=self.parameters.scale_factor)
-            self.frame_slider_widget.setValue(self.frame_number)
-            self.imageLabel.setPixmap(qt_image_process(self.image))
-            self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+            self.frame_number = self.engine.clamp(last_frame)
+            self.update_frame_widgets()
+            self.display_frame()
 
     # Load the H5 file and plot it
     def open_h5_file(self) -> None:
@@ -396,14 +690,165 @@ class MainGUI(QMainWindow):
                                                                          caption="Open file",
                                                                          filter="*.h5",
                                                                          dir=self.h5files_main_path)
-            self.h5 = pd.read_hdf(self.h5_name)
-            self.image = process_frame(self.image, scale_factor=1 / self.scale_factor)
-            self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-            self.image = process_frame(self.image, scale_factor=self.scale_factor)
-            self.imageLabel.setPixmap(qt_image_process(self.image))
+            if self.h5_name:
+                self.engine.load_h5(self.h5_name)
+                self.quality_strip.set_pyramid(self.engine.quality)
+                self.update_trajectory_data()
+                self.display_frame()
+                if self.video_name:
+                    self.session_store.save_h5_path(self.video_name, self.h5_name)
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
+    # Load a second h5 file of the video to compare with
+    def event_open_comparison(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        comparison_name, _ = QFileDialog.getOpenFileName(self, caption="Open Comparison H5", filter="*.h5",
+                                                         dir=str(Path(self.h5_name).parent))
+        if not comparison_name:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.engine.load_comparison(comparison_name)
+        except (OSError, KeyError, ValueError) as error:
+            QtWidgets.QMessageBox.warning(self, 'Error', f'Unable to compare with {Path(comparison_name).name}: '
+                                                         f'{error}')
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.display_frame()
+
+    def event_close_comparison(self) -> None:
+        self.engine.close_comparison()
+        self.display_frame()
+
+    # Go to the frame ranked next by how far the two h5 files are apart
+    def event_next_divergent(self, step: int) -> None:
+        if self.engine.comparison is None:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Open a comparison h5 file first')
+            return
+        # Going through the ranking goes on from the frame it was at, otherwise it starts from the most divergent frame
+        from_frame = self.frame_number if self.frame_number == self.divergent_frame_number else None
+        next_index = self.engine.next_divergent_frame(from_frame, step)
+        if next_index is None:
+            QtWidgets.QMessageBox.information(self, 'Divergence', 'No more frames to compare')
+            return
+        self.frame_number = self.divergent_frame_number = self.engine.clamp(next_index[0])
+        self.update_frame_widgets()
+        self.display_frame()
+
+    # Other cameras ####################################################################################################
+    def event_add_camera(self) -> None:
+        if not self.video_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
+            return
+        video_name, _ = QFileDialog.getOpenFileName(self, caption="Open Video of Another Camera", filter=self.filters,
+                                                    dir=self.videos_main_path)
+        if not video_name:
+            return
+        # Without a h5 file only the frames are shown
+        h5_name, _ = QFileDialog.getOpenFileName(self, caption="Open H5 File of the Camera (optional)",
+                                                 filter="*.h5", dir=self.h5files_main_path)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            camera = multiCamera.Camera(video_name, h5_name or None, self.skeleton, pcutoff=self.pcutoff)
+        except (FileNotFoundError, OSError, KeyError, ValueError) as error:
+            QtWidgets.QMessageBox.warning(self, 'Error', f'Unable to load {Path(video_name).name}: {error}')
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        if self.camera_rig is None:
+            self.camera_rig = multiCamera.CameraRig()
+        self.camera_rig.add(camera)
+        self.camera_panel.set_cameras(self.camera_rig.cameras)
+        self.camera_dock.show()
+        self.update_cameras()
+
+    def event_remove_camera(self, index: int) -> None:
+        self.camera_rig.remove(index)
+        self.camera_panel.set_cameras(self.camera_rig.cameras)
+        if not self.camera_rig:
+            self.camera_dock.hide()
+        self.update_cameras()
+
+    def event_remove_cameras(self) -> None:
+        if self.camera_rig is not None:
+            self.camera_rig.close()
+        self.camera_panel.set_cameras([])
+        self.camera_dock.hide()
+
+    def event_camera_offset(self, index: int, offset: int) -> None:
+        self.camera_rig.cameras[index].offset = offset
+        self.update_cameras()
+
+    # Project queue ####################################################################################################
+    def open_project(self) -> None:
+        try:
+            pairs = projectQueue.find_session_pairs(self.videos_main_path, self.h5files_main_path)
+        except FileNotFoundError:
+            pairs = []
+        if not pairs:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'No videos with h5 files found \n'
+                                                         'Check videos_main_path and h5files_path in config.yaml')
+            return
+        if self.project_queue is not None:
+            self.project_queue.close()
+        self.project_queue = projectQueue.ProjectQueue(pairs, window=self.bad_tracking_window, skeleton=self.skeleton,
+                                                       edge_threshold=self.engine.edge_threshold)
+        self.open_session(0)
+
+    # Open a session of the project queue. It opens at the last frame of the video without asking, and the next
+    # session starts loading in the background
+    def open_session(self, index: int) -> None:
+        if self.project_queue is None or not 0 <= index < len(self.project_queue):
+            return
+        self.play_action.setChecked(False)
+        self.save_session()
+        video_name, h5_name = self.project_queue.pairs[index]
+        try:
+            session = self.project_queue.take(index, self.session_store.last_frame(video_name) or 0)
+        except (FileNotFoundError, OSError, KeyError):
+            QtWidgets.QMessageBox.warning(self, 'Error', f'Unable to load {Path(video_name).name} and '
+                                                         f'{Path(h5_name).name}')
+            return
+        # The other cameras were of the session before
+        self.event_remove_cameras()
+        self.video_name, self.h5_name = session.video_name, session.h5_name
+        self.length = self.engine.load_session(session)
+        self.frame_number = session.frame_number
+        self.frame_slider_widget.setRange(0, self.length)
+        self.update_frame_widgets()
+        self.quality_strip.set_pyramid(self.engine.quality)
+        self.update_trajectory_data()
+        self.display_frame()
+        self.restore_settings()
+        self.session_store.save_h5_path(self.video_name, self.h5_name)
+        percentage = self.engine.progress.percentage(reviewProgress.REVIEWED, self.engine.flagged)
+        self.behavior_index_completion.setText(f'Reviewed: {percentage}%')
+        self.session_status.setText(f'Session: {index + 1} / {len(self.project_queue)}')
+        self.setWindowTitle(f'Pose Correction GUI - {Path(self.video_name).name}')
+
+        if index + 1 < len(self.project_queue):
+            next_video, _ = self.project_queue.pairs[index + 1]
+            self.project_queue.prefetch(index + 1, self.session_store.last_frame(next_video) or 0)
+
+    def event_next_session(self) -> None:
+        if self.project_queue is None:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Open a project first')
+            return
+        if self.project_queue.index + 1 >= len(self.project_queue):
+            QtWidgets.QMessageBox.information(self, 'Project', 'This is the last session of the project')
+            return
+        self.open_session(self.project_queue.index + 1)
+
+    def event_previous_session(self) -> None:
+        if self.project_queue is None:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Open a project first')
+            return
+        self.open_session(self.project_queue.index - 1)
+
     def show_shortcuts(self) -> None:
         QtWidgets.QMessageBox.about(self, "Show Shortcuts",
                                     "Next Frame\t\t --> Right Arrow \n"
@@ -418,50 +863,176 @@ class MainGUI(QMainWindow):
                                     "Propagate Backward\t --> Ctrl + [ \n"
                                     "Relabel\t\t --> Ctrl + l \n"
                                     "Done Labeling\t --> Ctrl + ; \n"
+                                    "Show Timings\t --> Ctrl + t \n"
+                                    "Play/Pause\t\t --> Space \n"
+                                    "Open Project\t --> Ctrl + Shift + o \n"
+                                    "Next Session\t --> Ctrl + Shift + Right Arrow \n"
+                                    "Previous Session\t --> Ctrl + Shift + Left Arrow \n"
+                                    "Show Trajectories\t --> Ctrl + j \n"
+                                    "Next Low Confidence\t --> Ctrl + Shift + n \n"
+                                    "Next Divergent Frame\t --> Ctrl + d \n"
+                                    "Previous Divergent Frame\t --> Ctrl + Shift + d \n"
                                     )
 
+    def show_startup_report(self) -> None:
+        QtWidgets.QMessageBox.about(self, "Start Up Report", self.startup_timer.log_text())
+
+    # Print the start up report once the modules loading in the background are ready
+    def print_startup_report(self, preload_thread) -> None:
+        if preload_thread.is_alive():
+            QTimer.singleShot(100, lambda: self.print_startup_report(preload_thread))
+            return
+        print(self.startup_timer.log_text(), file=sys.stderr)
+
+    # Read the current frame from the video, plot the tracked points and show it in the GUI
+    def display_frame(self) -> None:
+        if not self.video_name:
+            return
+        if self.camera_rig:
+            # The other cameras decode the frame while the main video does
+            self.camera_rig.request(self.frame_number)
+        self.image = self.engine.render_frame(self.frame_number, overlay=False)
+        self.engine.mark_visited(self.frame_number)
+        self.update_frame_plots()
+        self.update_low_confidence_status()
+        self.update_edge_outlier_status()
+        self.update_divergence_status()
+        self.show_image()
+        self.frame_view.clear_relabel_points()
+        self.update_overlay()
+        self.update_cameras()
+
+    # Move the tracked points and the skeleton on the frame view to the current frame
+    def update_overlay(self) -> None:
+        if self.engine.data is None:
+            self.frame_view.set_points(None, [])
+            return
+        with self.timer.stage('plot', self.frame_number):
+            points, uncertain, highlight = self.engine.overlay(self.frame_number)
+            self.frame_view.set_points(points, self.engine.bpt_indices, uncertain, highlight)
+            self.frame_view.set_comparison_points(self.engine.comparison_overlay(self.frame_number),
+                                                  self.engine.bpt_indices)
+
+    # Show the frame number in the line edit and the slider without triggering their events, which would display the
+    # frame again
+    def update_frame_widgets(self) -> None:
+        self.goto_frame.blockSignals(True)
+        self.frame_slider_widget.blockSignals(True)
+        self.goto_frame.setText(str(self.frame_number))
+        self.frame_slider_widget.setValue(self.frame_number)
+        self.goto_frame.blockSignals(False)
+        self.frame_slider_widget.blockSignals(False)
+        self.update_frame_plots()
+
+    # Mark the current frame on the tracking quality strip and the trajectory panel
+    def update_frame_plots(self) -> None:
+        self.quality_strip.set_frame(self.frame_number)
+        self.trajectory_panel.set_frame(self.frame_number, self.engine.edit_count)
+
+    # Show the number of body points with a low likelihood of each individual in the current frame
+    def update_low_confidence_status(self) -> None:
+        counts = self.engine.low_confidence_counts
+        if counts is None or self.frame_number >= len(counts):
+            self.low_confidence_status.setText('')
+            return
+        self.low_confidence_status.setText('Low Confidence\n' + '\n'.join(
+            f'{individual}: {count}' for individual, count in zip(self.engine.individuals, counts[self.frame_number])))
+
+    # Show the skeleton edges with outlier lengths of each individual in the current frame
+    def update_edge_outlier_status(self) -> None:
+        outliers = self.engine.edge_outliers(self.frame_number)
+        if not outliers:
+            self.edge_outlier_status.setText('')
+            return
+        self.edge_outlier_status.setText('Bad Limbs\n' + '\n'.join(
+            f'{individual}: {bp1}-{bp2}' for individual, bp1, bp2 in outliers))
+
+    # Show the current frame of the other cameras, with their tracked points
+    def update_cameras(self) -> None:
+        if not self.camera_rig:
+            return
+        with self.timer.stage('cameras', self.frame_number):
+            frames = self.camera_rig.read(self.frame_number)
+            cameras = self.camera_rig.cameras
+            self.camera_panel.set_frames(frames, [camera.overlay(self.frame_number) for camera in cameras],
+                                         [camera.bpt_indices for camera in cameras])
+
+    # Show how far the tracked points are from the comparison in the current frame
+    def update_divergence_status(self) -> None:
+        divergence = self.engine.divergence_at(self.frame_number) if self.engine.data is not None else None
+        if divergence is None:
+            self.divergence_status.setText('')
+            return
+        largest, mean, rank = divergence
+        self.divergence_status.setText(f'Divergence\nmax: {largest:.1f} px\nmean: {mean:.1f} px\n'
+                                       f'rank: {rank + 1} / {len(self.engine.divergence_ranking()[0])}')
+
+    # Plot the traces of the tracked points that were loaded
+    def update_trajectory_data(self) -> None:
+        self.trajectory_panel.set_data(self.engine.data, self.engine.individuals, self.engine.bodyparts)
+        self.trajectory_bodypart.blockSignals(True)
+        self.trajectory_bodypart.clear()
+        self.trajectory_bodypart.addItems(['All Body Parts'] + self.engine.bodyparts)
+        self.trajectory_bodypart.blockSignals(False)
+        self.trajectory_panel.set_bodypart(None)
+
+    def event_trajectory_window(self, index: int) -> None:
+        self.trajectory_panel.set_window(WINDOWS[index][1])
+
+    def event_trajectory_bodypart(self, index: int) -> None:
+        self.trajectory_panel.set_bodypart(index - 1 if index > 0 else None)
+
+    def show_image(self) -> None:
+        # The frame view resizes the frame for the zoom and converts it to a pixmap
+        with self.timer.stage('qimage', self.frame_number):
+            self.frame_view.set_frame(self.image)
+        self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+        if self.show_timings_action.isChecked():
+            self.timings_overlay.setText(self.timer.summary_text())
+            self.timings_overlay.adjustSize()
+
+    def event_show_timings(self, checked: bool) -> None:
+        if checked:
+            self.timings_overlay.setText(self.timer.summary_text())
+            self.timings_overlay.adjustSize()
+        self.timings_overlay.setVisible(checked)
+
+    def event_export_timings(self) -> None:
+        csv_name, _ = QFileDialog.getSaveFileName(self, caption="Save Timings", filter="*.csv",
+                                                  dir='stage_timings.csv')
+        if csv_name:
+            self.timer.export_csv(csv_name)
+
     # Sliding through the video
     def event_frame_slider(self) -> None:
         try:
             self.frame_number = int(self.frame_slider_widget.value())
+            self.goto_frame.blockSignals(True)
             self.goto_frame.setText(str(self.frame_number))
+            self.goto_frame.blockSignals(False)
             if self.video_name:
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Unable to read the Video \n'
                                                          'Reload it again')
 
+    # Going to the frame clicked on the tracking quality strip
+    def event_quality_strip(self, frame_number: int) -> None:
+        if not self.video_name:
+            return
+        self.frame_number = self.engine.clamp(frame_number)
+        self.update_frame_widgets()
+        self.display_frame()
+
     # Moving forward through the video one frame at a time.
     def event_next_frame(self) -> None:
         try:
             self.frame_number += 1
             if self.frame_number > self.length:
                 self.frame_number = self.length
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
+            self.update_frame_widgets()
             if self.video_name:
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -471,20 +1042,9 @@ class MainGUI(QMainWindow):
             self.frame_number -= 1
             if self.frame_number < 0:
                 self.frame_number = 0
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
+            self.update_frame_widgets()
             if self.video_name:
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -501,20 +1061,9 @@ class MainGUI(QMainWindow):
                 QtWidgets.QMessageBox.warning(self, 'ValueError', 'invalid number entered - integer required')
             if self.frame_number > self.length:
                 self.frame_number = self.length
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
+            self.update_frame_widgets()
             if self.video_name:
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -531,20 +1080,9 @@ class MainGUI(QMainWindow):
                 QtWidgets.QMessageBox.warning(self, 'ValueError', 'invalid number entered - integer required')
             if self.frame_number < 0:
                 self.frame_number = 0
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
+            self.update_frame_widgets()
             if self.video_name:
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -558,26 +1096,65 @@ class MainGUI(QMainWindow):
                 self.frame_number = int(self.goto_num)
             except ValueError:
                 QtWidgets.QMessageBox.warning(self, 'ValueError', 'invalid number entered')
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
+            self.update_frame_widgets()
             if self.video_name:
                 if self.frame_number > self.length:
                     self.frame_number = self.length
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Frame does not exits')
 
     # Get the frame number to start the sequence swap
+    def event_play_pause(self, play: bool) -> None:
+        if play and not self.video_name:
+            self.play_action.setChecked(False)
+            return
+        if play:
+            self.play_action.setText('Pause')
+            self.event_playback_rate()
+            self.playback_clock.start(self.frame_number)
+            self.playback_timer.start()
+        else:
+            self.play_action.setText('Play')
+            self.playback_timer.stop()
+            # Show the frame playback stopped on with the tracked points
+            if self.video_name:
+                self.display_frame()
+
+    # Change the frame rate or the speed of the playback
+    def event_playback_rate(self) -> None:
+        try:
+            fps = float(self.playback_fps.text())
+        except ValueError:
+            fps = self.engine.fps
+            self.playback_fps.setText('')
+        speed = float(self.playback_speed.currentText()[:-1])
+        self.playback_clock.set_rate(self.frame_number, fps, speed)
+        self.playback_timer.setInterval(max(int(self.playback_clock.interval), 1))
+
+    # Show the frame that is due now. Frames are read sequentially, and when playback falls behind the frames in
+    # between are skipped, so it stays in real time
+    def event_playback_tick(self) -> None:
+        target = min(self.playback_clock.target_frame(), self.length)
+        if target <= self.frame_number:
+            if self.frame_number >= self.length:
+                self.play_action.setChecked(False)
+            return
+        dropped = target - self.frame_number - 1
+        self.frame_number = target
+        self.image = self.engine.render_frame(self.frame_number, overlay=False)
+        self.show_image()
+        # The tracked points are only moved when playback keeps up. Behind, they are hidden rather than left on the
+        # frame they belong to
+        if dropped == 0:
+            self.update_overlay()
+        else:
+            self.frame_view.set_overlay_visible(False)
+        self.update_frame_widgets()
+        self.playback_clock.frame_shown(dropped)
+        self.playback_status.setText(f'{self.playback_clock.achieved_fps():.1f} fps\n'
+                                     f'{self.playback_clock.dropped} dropped')
+
     def event_mark_start(self) -> None:
         self.frame_from.setText(str(self.frame_number))
 
@@ -589,12 +1166,8 @@ class MainGUI(QMainWindow):
     def event_swap_frame(self) -> None:
         try:
             if self.h5_name:
-                swap_labels(self.h5, self.frame_number, self.h5_name)
-                self.h5 = pd.read_hdf(self.h5_name)
-                self.image = process_frame(self.image, scale_factor=1 / self.scale_factor)
-                self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                self.imageLabel.setPixmap(qt_image_process(self.image))
+                self.engine.swap(self.frame_number)
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -612,12 +1185,8 @@ class MainGUI(QMainWindow):
                     self.to_frame_number = self.to_frame_number
                 else:
                     self.to_frame_number += 1
-                swap_label_sequences(self.h5, self.from_frame_number, self.to_frame_number, self.h5_name)
-                self.h5 = pd.read_hdf(self.h5_name)
-                self.image = process_frame(self.image, scale_factor=1 / self.scale_factor)
-                self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                self.imageLabel.setPixmap(qt_image_process(self.image))
+                self.engine.swap_sequence(self.from_frame_number, self.to_frame_number)
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -636,12 +1205,8 @@ class MainGUI(QMainWindow):
                 if steps == 1:
                     steps += 1
                 animal_ident = self.prop_animal.currentText()
-                propagate_frame(self.h5, self.frame_number, self.h5_name, 'forward', steps, animal_ident)
-                self.h5 = pd.read_hdf(self.h5_name)
-                self.image = process_frame(self.image, scale_factor=1 / self.scale_factor)
-                self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                self.imageLabel.setPixmap(qt_image_process(self.image))
+                self.engine.propagate(self.frame_number, 'forward', steps, animal_ident)
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -658,36 +1223,24 @@ class MainGUI(QMainWindow):
                 except ValueError:
                     QtWidgets.QMessageBox.warning(self, 'ValueError', 'invalid number entered - integer required')
                 animal_ident = self.prop_animal.currentText()
-                propagate_frame(self.h5, self.frame_number, self.h5_name, 'backward', steps, animal_ident)
-                self.h5 = pd.read_hdf(self.h5_name)
-                self.image = process_frame(self.image, scale_factor=1 / self.scale_factor)
-                self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                self.imageLabel.setPixmap(qt_image_process(self.image))
+                self.engine.propagate(self.frame_number, 'backward', steps, animal_ident)
+                self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
     def event_relabel_animals(self) -> None:
         if self.video_name:
-            self.cap.set(1, self.frame_number)
-            ret, self.image = self.cap.read()
-            self.image = process_frame(self.image, scale_factor=self.parameters.scale_factor)
-            self.imageLabel.setPixmap(qt_image_process(self.image))
-            self.animal_bodypoints = {}
-            self.bodypoints1 = {}
-            self.bodypoints2 = {}
+            self.frame_view.set_overlay_visible(False)
+            self.frame_view.clear_relabel_points()
             self.index = 0
 
     def event_done_labeling(self) -> None:
         try:
-            self.cap.set(1, self.frame_number)
-            ret, self.image = self.cap.read()
-            new_points = relabel_points(self.animal_bodypoints, self.body_parts, self.scale_factor)
-            update_h5file(new_points, self.h5, self.frame_number, self.h5_name)
-            self.h5 = pd.read_hdf(self.h5_name)
-            self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-            self.image = process_frame(self.image, scale_factor=self.scale_factor)
-            self.imageLabel.setPixmap(qt_image_process(self.image))
+            if self.h5_name:
+                # The relabel points are in the pixels of the video, so they are not scaled back
+                new_points = relabelPoints.relabel_points(self.frame_view.relabel_points(), self.body_parts, 1)
+                self.engine.relabel(self.frame_number, new_points)
+            self.display_frame()
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video first')
 
@@ -695,47 +1248,28 @@ class MainGUI(QMainWindow):
         self.index = 0
         self.body_parts_list.setCurrentRow(self.index)
 
-    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+    # Add a relabel point for the selected animal and body part where the frame was clicked, and select the next
+    # body part
+    def event_label_point(self, position, button) -> None:
         if self.label_with_left_click.isChecked():
             self.click_label_button = Qt.LeftButton
         else:
             self.click_label_button = Qt.RightButton
 
-        if event.button() == self.click_label_button:
-            canvas = self.imageLabel.pixmap()
-            painter = QPainter(canvas)
-            pen = painter.pen()
-            pen.setWidth(6)
+        if button == self.click_label_button:
             animal_id = self.label_animal.currentText()
             if self.label_animal.currentIndex() == 1:
-                pen.setColor(QtGui.QColor('blue'))
+                colour = 'blue'
             else:
-                pen.setColor(QtGui.QColor('red'))
-            painter.setPen(pen)
-            self.calculate_image_pos()
-            globalPos = event.scenePosition().toPoint()
-            mouse_x_value, mouse_y_value = globalPos.x(), globalPos.y()
-            x_value = mouse_x_value - self.image_x_value
-            y_value = mouse_y_value - self.image_y_value
-            start_point = (x_value, y_value)
-            draw_value = QPoint(x_value, y_value)
-            painter.drawPoint(draw_value)
-            painter.end()
-
+                colour = 'red'
             bpt = self.body_parts[self.body_parts_list.currentRow()]
-            if animal_id == self.animals_list[1]:
-                self.bodypoints2[bpt] = start_point
-                self.animal_bodypoints[animal_id] = self.bodypoints2
-            else:
-                self.bodypoints1[bpt] = start_point
-                self.animal_bodypoints[animal_id] = self.bodypoints1
+            self.frame_view.add_relabel_point(animal_id, bpt, position, colour)
 
             self.index = self.body_parts_keys[bpt]
             self.index += 1
             if self.index == len(self.body_parts):
                 self.index = 0
             self.body_parts_list.setCurrentRow(self.index)
-            self.imageLabel.setPixmap(canvas)
 
     def mouseDoubleClickEvent(self, event: QtGui.QMouseEvent) -> None:
         self.top_toolbar.setFocus()
@@ -755,65 +1289,257 @@ class MainGUI(QMainWindow):
     def event_disable_lineedit(self) -> None:
         self.top_toolbar.setFocus()
 
-    def calculate_image_pos(self) -> None:
-        # check if any toolbar is at the starting corner
-        self.image_x_value = self.imageLabel.pos().x()
-        self.image_y_value = self.imageLabel.pos().y()
-
     def event_save_frame(self) -> None:
+        if self.video_name:
+            output_path = f'{self.save_frame_path[0]}{Path(self.video_name).stem}'
+            self.engine.save_frame(self.frame_number, output_path)
+
+    def event_export_flagged_frames(self) -> None:
+        if not (self.video_name and self.h5_name):
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video and the H5 file first')
+            return
+        try:
+            self.engine.next_flagged_frame(self.frame_number)
+        except FileNotFoundError:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Find the bad tracking first')
+            return
+        keypoints_output = QtWidgets.QMessageBox.question(self, 'Export Flagged Frames',
+                                                          'Do you want to save the corrected keypoints as well',
+                                                          buttons=(QtWidgets.QMessageBox.StandardButton.Yes |
+                                                                   QtWidgets.QMessageBox.StandardButton.No),
+                                                          defaultButton=QtWidgets.QMessageBox.StandardButton.Yes)
         output_path = f'{self.save_frame_path[0]}{Path(self.video_name).stem}'
-        if not os.path.exists(output_path):
-            os.makedirs(output_path)
-        self.cap.set(1, self.frame_number)
-        ret, image = self.cap.read()
-        save_frame(frame=image, index=self.frame_number, indexlength=self.indexlength, output_path=output_path)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with self.timer.stage('export', self.frame_number):
+                saved = self.engine.export_frames(self.engine.flagged, output_path,
+                                                  keypoints_output == QtWidgets.QMessageBox.StandardButton.Yes)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(f'Saved {len(saved)} frames to {output_path}', 5000)
+
+    def event_export_video(self) -> None:
+        if not (self.video_name and self.h5_name):
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Load the Video and the H5 file first')
+            return
+        # Export the marked sequence of frames if there is one, otherwise the whole video
+        try:
+            start, end = int(self.frame_from.text()), int(self.frame_to.text())
+        except ValueError:
+            start, end = 0, self.length
+        video_name, _ = QFileDialog.getSaveFileName(self, caption="Save Overlay Video", filter="*.mp4 *.avi",
+                                                    dir=f'{Path(self.video_name).with_suffix("")}_corrected.mp4')
+        if not video_name:
+            return
+
+        progress_dialog = QtWidgets.QProgressDialog('Exporting video', 'Cancel', 0, end - start + 1, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+
+        def progress(written, total):
+            if written % 10 == 0 or written == total:
+                progress_dialog.setValue(written)
+                QApplication.processEvents()
+            return not progress_dialog.wasCanceled()
+
+        try:
+            written, seconds, fps = self.engine.export_video(video_name, start, end, progress=progress)
+            self.statusBar().showMessage(f'Exported {written} frames in {seconds:.1f} s ({fps:.1f} fps)', 10000)
+        except exportVideo.ExportCancelled:
+            self.statusBar().showMessage('Export cancelled', 5000)
+        finally:
+            progress_dialog.close()
+
+    # Save the last frame and the settings of the video, so the next session continues from where this one stopped
+    def save_session(self) -> None:
+        if not self.video_name:
+            return
+        if self._engine is not None and self._engine.progress is not None:
+            self._engine.progress.flush()
+        saveLastFrameNumber.save_last_frame_number(self.frame_number, self.video_name, self.session_store)
+        self.session_store.set_setting(self.video_name, 'jump_steps', self.jump_number.text())
+        self.session_store.set_setting(self.video_name, 'propagate_steps', self.prop_line.text())
+        self.session_store.set_setting(self.video_name, 'playback_speed', self.playback_speed.currentText())
+
+    def restore_settings(self) -> None:
+        self.jump_number.setText(self.session_store.get_setting(self.video_name, 'jump_steps', ''))
+        self.prop_line.setText(self.session_store.get_setting(self.video_name, 'propagate_steps', ''))
+        self.playback_speed.setCurrentText(self.session_store.get_setting(self.video_name, 'playback_speed', '1x'))
+
+    def event_review_summary(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        try:
+            segment_size, counts = self.engine.review_summary()
+        except FileNotFoundError:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Find the bad tracking first')
+            return
+        lines = ['Frames\t\tBad Tracking\tReviewed\tEdited']
+        for i, (flagged, reviewed, edited) in enumerate(zip(counts['flagged'], counts['reviewed'], counts['edited'])):
+            lines.append(f'{i * segment_size}-{(i + 1) * segment_size - 1}\t{flagged}\t\t{reviewed}\t\t{edited}')
+        percentage = self.engine.progress.percentage(reviewProgress.REVIEWED, self.engine.flagged)
+        lines.append(f'\nReviewed: {percentage}% of the frames with bad tracking')
+        QtWidgets.QMessageBox.about(self, 'Review Progress', '\n'.join(lines))
+
+    def event_fix_jumps(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        jumps = self.engine.find_jumps()
+        n_frames = int(jumps.any(axis=(1, 2)).sum())
+        if n_frames == 0:
+            QtWidgets.QMessageBox.information(self, 'Fix Jumping Points', 'No body points jumped away')
+            return
+        fix_output = QtWidgets.QMessageBox.question(self, 'Fix Jumping Points',
+                                                    f'{int(jumps.sum())} body points jumped away in {n_frames} '
+                                                    f'frames. Do you want to replace them by interpolation',
+                                                    buttons=(QtWidgets.QMessageBox.StandardButton.Yes |
+                                                             QtWidgets.QMessageBox.StandardButton.No),
+                                                    defaultButton=QtWidgets.QMessageBox.StandardButton.Yes)
+        if fix_output == QtWidgets.QMessageBox.StandardButton.Yes:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                self.engine.interpolate(jumps)
+            finally:
+                QApplication.restoreOverrideCursor()
+            self.display_frame()
+
+    def event_smooth(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        # Smooth the marked sequence of frames if there is one, otherwise the whole video
+        try:
+            start, end = int(self.frame_from.text()), int(self.frame_to.text())
+        except ValueError:
+            start, end = 0, self.length
+        dialog = smoothDialog.SmoothDialog(self.engine.individuals, self.length, start, end, self)
+
+        # The smoothed points are plotted as the tracked points and the points before as rings
+        def preview():
+            try:
+                before, after = self.engine.preview_smoothing(self.frame_number, **dialog.parameters())
+            except ValueError as error:
+                QtWidgets.QMessageBox.warning(self, 'Error', str(error))
+                return
+            self.frame_view.set_points(after, self.engine.bpt_indices)
+            self.frame_view.set_comparison_points(before, self.engine.bpt_indices)
+
+        dialog.preview_clicked.connect(preview)
+        if dialog.exec() != QtWidgets.QDialog.DialogCode.Accepted:
+            self.update_overlay()
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            outliers, filled = self.engine.smooth(**dialog.parameters())
+        except ValueError as error:
+            QtWidgets.QMessageBox.warning(self, 'Error', str(error))
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage(f'Smoothed the trajectories: {outliers} outliers removed and {filled} body points '
+                                     f'filled', 10000)
+        self.display_frame()
+
+    def event_replay_corrections(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        log_file, _ = QFileDialog.getOpenFileName(self, caption="Open Correction Log", filter="*corrections.npz",
+                                                  dir=str(Path(self.h5_name).parent))
+        if not log_file:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            report = self.engine.replay_corrections(log_file)
+        finally:
+            QApplication.restoreOverrideCursor()
+        counts = report['status'].value_counts()
+        message = (f'{counts.get("applied", 0)} body points corrected, {counts.get("already corrected", 0)} already '
+                   f'corrected and {counts.get("missing", 0)} not in the h5 file')
+        conflicts = report[report['status'] == 'conflict']
+        if len(conflicts):
+            conflicts_file = findBadTracking.sidecar_filename(self.h5_name, 'replay_conflicts.csv')
+            conflicts.to_csv(conflicts_file, index=False)
+            message += (f'\n\n{len(conflicts)} body points in {conflicts["frame"].nunique()} frames are tracked '
+                        f'differently now and were not corrected. They are listed in {conflicts_file}')
+        QtWidgets.QMessageBox.information(self, 'Replay Corrections', message)
+        self.display_frame()
 
     def my_exit_handler(self) -> None:
+        if self.project_queue is not None:
+            self.project_queue.close()
+        if self._engine is not None and self._engine.decoder_pool is not None:
+            self._engine.decoder_pool.close()
+        if self.camera_rig is not None:
+            self.camera_rig.close()
+        if self.recorder is not None:
+            self.recorder.close()
         try:
-            if self.video_name:
-                save_last_frame_number(self.frame_number, self.video_name)
+            self.save_session()
         except AttributeError:
             return
 
     def event_find_bad_tracking(self):
-        try:
-            find_bad_tracking(self.h5_name)
-        except NotImplementedError:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        self.engine.find_bad_tracking()
+        self.quality_strip.set_pyramid(self.engine.quality)
+
+    def event_next_low_confidence(self) -> None:
+        if not self.h5_name:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        if self.engine.low_confidence_frames() is None:
+            QtWidgets.QMessageBox.information(self, 'Low Confidence', 'The h5 file has no likelihood')
+            return
+        next_index = self.engine.next_low_confidence_frame(self.frame_number)
+        if next_index is None:
+            QtWidgets.QMessageBox.information(self, 'Low Confidence',
+                                              'No more frames with body points with a low likelihood')
+            return
+        self.frame_number = self.engine.clamp(int(next_index[0]))
+        self.update_frame_widgets()
+        self.display_frame()
 
     def event_move_to_index(self) -> None:
+        if not self.h5_name:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Make sure to load the h5 file')
+            return
+        # Moving on from a frame means it has been reviewed
+        self.engine.mark_reviewed(self.frame_number)
         try:
-            self.goto_index, self.index_completion = move_to_index(self.h5_name, self.frame_number)
-            if self.goto_index == '':
-                self.goto_index = '0'
-            try:
-                self.frame_number = int(self.goto_index)
-            except ValueError:
-                QtWidgets.QMessageBox.warning(self, 'ValueError', 'invalid number entered')
-            self.goto_frame.setText(str(self.frame_number))
-            self.frame_slider_widget.setValue(self.frame_number)
-            self.behavior_index_completion.setText(f'Gone through: {self.index_completion}%')
+            next_index = self.engine.next_unreviewed_frame(self.frame_number)
+        except FileNotFoundError:
+            QtWidgets.QMessageBox.warning(self, 'Error', 'Find the bad tracking first')
+            return
+        if next_index is None:
+            self.behavior_index_completion.setText('Reviewed: 100%')
+            QtWidgets.QMessageBox.information(self, 'Bad Tracking', 'All the frames with bad tracking are reviewed')
+            return
+        try:
+            self.goto_index, self.index_completion = next_index
+            self.frame_number = int(self.goto_index)
+            self.update_frame_widgets()
+            self.behavior_index_completion.setText(f'Reviewed: {self.index_completion}%')
             if self.video_name:
+                self.session_store.save_progress(self.video_name, self.index_completion)
                 if self.frame_number > self.length:
                     self.frame_number = self.length
-                self.cap.set(1, self.frame_number)
-                ret, self.image = self.cap.read()
-                if self.h5_name:
-                    self.image = plot_tracked_points(self.image, self.h5, self.frame_number, self.skeleton)
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
-                else:
-                    self.image = process_frame(self.image, scale_factor=self.scale_factor)
-                    self.imageLabel.setPixmap(qt_image_process(self.image))
-                    self.frame_number_widget.setText(f"Frames: {self.frame_number} / {self.length}")
+                self.display_frame()
+                # The next frames to review are decoded while this one is looked at
+                self.engine.prefetch_unreviewed(self.frame_number)
         except AttributeError:
             QtWidgets.QMessageBox.warning(self, 'Error', 'Frame does not exits')
 
 
 def main():
     app = QApplication([])
-    widget = MainGUI()
+    # --record trace.jsonl records the actions of the session to replay them as a benchmark (see replayActions.py)
+    record_file = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv[:-1] else None
+    widget = MainGUI(defer_loading=True, record_file=record_file)
+    widget.startup_timer.record('import PySide6', qt_import_time * 1000)
     app.aboutToQuit.connect(widget.my_exit_handler)
     widget.resize(800, 800)
     widget.setWindowTitle('Pose Correction GUI')
@@ -824,6 +1550,10 @@ def main():
     widget.move(40, 40)
     widget.show()
     widget.top_toolbar.setFocus()
+    widget.startup_timer.record('time to window', (time.perf_counter() - import_start) * 1000)
+    preload_thread = preload_modules(preloaded_modules, widget.startup_timer)
+    if '--startup-report' in sys.argv:
+        widget.print_startup_report(preload_thread)
     sys.exit(app.exec())
 
 
@@ -1,5 +1,6 @@
 import numpy as np
-from pathlib import Path
+
+from findBadTracking import bad_tracking_filename
 
 
 def move_to_index(h5_path, current_frame_number):
@@ -10,14 +11,21 @@ def move_to_index(h5_path, current_frame_number):
     :return:
     """
 
-    destination_name = Path(h5_path).stem
-    destination_name = destination_name[:destination_name.find('CNN')]
-    destination_name += 'bad_tracking.npy'
-    destination_file = f'{str(Path(h5_path).parent)}/{destination_name}'
+    data = np.load(bad_tracking_filename(h5_path))
+
+    return next_flagged_frame(np.unique(data), current_frame_number)
 
-    data = np.load(destination_file)
 
-    for i, dt in enumerate(data):
-        if dt > current_frame_number:
-            percentage = np.round((i / data.shape[0]) * 100)
-            return dt, percentage
+def next_flagged_frame(flagged, current_frame_number):
+    """
+    Find the next frame with bad tracking after the current frame
+    :param flagged: the sorted frame numbers with bad tracking
+    :param current_frame_number: the current frame number is GUI is on
+    :return: the next frame number and the percentage of the frames with bad tracking gone through.
+    None if there are no more frames with bad tracking
+    """
+    i = np.searchsorted(flagged, current_frame_number, side='right')
+    if i == flagged.shape[0]:
+        return None
+    percentage = np.round((i / flagged.shape[0]) * 100)
+    return flagged[i], percentage
@@ -0,0 +1,172 @@
+import cv2
+import pandas as pd
+
+from correctionEngine import h5_lock
+from decoderPool import DecoderPool
+from plotTrackedPoints import create_body_indices
+from trackingQuality import uncertain_points
+
+
+def read_tracked_points(h5_name):
+    """
+    Read the tracked points of a h5 file as an array, like CorrectionEngine.load_h5
+    :param h5_name: the filepath for the h5 file
+    :return: the tracked points with shape (frames, individuals, body parts, coords), and the names of the individuals,
+    the body parts and the coords
+    """
+    with h5_lock:
+        h5 = pd.read_hdf(h5_name)
+    scorer = h5.columns.get_level_values('scorer').unique().item()
+    individuals = h5.columns.get_level_values('individuals').unique().to_list()
+    bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
+    coords = h5.columns.get_level_values('coords').unique().to_list()
+    columns = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, coords],
+                                         names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    data = h5.reindex(columns=columns).to_numpy(dtype=float).reshape(
+        (len(h5), len(individuals), len(bodyparts), len(coords)))
+    return data, individuals, bodyparts, coords
+
+
+class Camera:
+    """
+    Another camera of the session, shown next to the main video: its video, the tracked points of its h5 file and its
+    frame offset from the main video. The frames are decoded by a worker process of its own (see
+    decoderPool.DecoderPool), so all the cameras decode a frame at the same time
+    """
+
+    def __init__(self, video_name, h5_name=None, skeleton=None, offset=0, pcutoff=0.6, max_gap=30, cache_size=8):
+        """
+        :param video_name: the filepath for the video
+        :param h5_name: the filepath for the h5 file of the video. Only the frames are shown without it
+        :param skeleton: the skeleton to plot, as pairs of body part names
+        :param offset: the frame of this camera at frame 0 of the main video, to sync them
+        :param pcutoff: the likelihood below which body points are plotted dimmed
+        :param max_gap: frames at most this many frames ahead are read on to instead of sought
+        :param cache_size: the number of decoded frames kept
+        """
+        self.video_name = video_name
+        self.h5_name = h5_name
+        self.offset = offset
+        self.max_gap = max_gap
+        self.pool = DecoderPool(video_name, n_workers=1, max_gap=max_gap, cache_size=cache_size)
+        self.length = self.pool.length - 1
+        self.cap = None
+        self.position = -1
+        self.data, self.uncertain, self.bpt_indices = None, None, []
+        if h5_name:
+            self.data, _, bodyparts, coords = read_tracked_points(h5_name)
+            self.uncertain = uncertain_points(self.data, coords, pcutoff)
+            self.bpt_indices = create_body_indices(bodyparts, skeleton or [])
+
+    def frame_for(self, frame_number):
+        """
+        :param frame_number: the frame number of the main video
+        :return: the frame number of this camera. None if the camera has no such frame
+        """
+        frame_number = frame_number + self.offset
+        return frame_number if 0 <= frame_number <= self.length else None
+
+    def request(self, frame_numbers):
+        """
+        Start decoding frames in the background
+        :param frame_numbers: the frame numbers of the main video
+        """
+        if self.pool is not None:
+            self.pool.prefetch([n for n in map(self.frame_for, frame_numbers) if n is not None])
+
+    def read(self, frame_number):
+        """
+        :param frame_number: the frame number of the main video
+        :return: the frame (not a copy, do not draw on it). None if the camera has no such frame
+        """
+        frame_number = self.frame_for(frame_number)
+        if frame_number is None:
+            return None
+        if self.pool is not None:
+            try:
+                return self.pool.read(frame_number)
+            except (IndexError, TimeoutError):
+                if self.pool.alive:
+                    return None
+                # The worker could not start e.g. a script without a __main__ guard, so the frames are read here
+                self.pool.close()
+                self.pool = None
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(self.video_name)
+        gap = frame_number - self.position
+        if 0 < gap <= self.max_gap and self.position >= 0:
+            for _ in range(gap):
+                self.cap.grab()
+        elif gap != 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = self.cap.read()
+        self.position = frame_number + 1 if ret else -1
+        return frame if ret else None
+
+    def overlay(self, frame_number):
+        """
+        :param frame_number: the frame number of the main video
+        :return: the tracked points of the frame with shape (individuals, body parts, coords) and the body points with
+        a low likelihood. None if there are no tracked points for the frame
+        """
+        frame_number = self.frame_for(frame_number)
+        if self.data is None or frame_number is None or frame_number >= len(self.data):
+            return None, None
+        return self.data[frame_number], None if self.uncertain is None else self.uncertain[frame_number]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class CameraRig:
+    """
+    The other cameras of the session, sharing the frame number of the main video. All the cameras are asked for a
+    frame before any of them is read, so their workers decode it in parallel with each other and with the main video,
+    and the frames after it are decoded ahead while the frame is shown
+    """
+
+    def __init__(self, read_ahead=1):
+        """
+        :param read_ahead: the number of frames after the current one each camera decodes ahead
+        """
+        self.cameras = []
+        self.read_ahead = read_ahead
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def add(self, camera):
+        self.cameras.append(camera)
+
+    def remove(self, index):
+        self.cameras.pop(index).close()
+
+    def request(self, frame_number):
+        """
+        Start decoding a frame of all the cameras, e.g. before reading the frame of the main video
+        :param frame_number: the frame number of the main video
+        """
+        for camera in self.cameras:
+            camera.request([frame_number])
+
+    def read(self, frame_number):
+        """
+        Read a frame of all the cameras, and start decoding the frames after it
+        :param frame_number: the frame number of the main video
+        :return: list with the frame of each camera (None where a camera has no such frame)
+        """
+        self.request(frame_number)
+        frames = [camera.read(frame_number) for camera in self.cameras]
+        for camera in self.cameras:
+            camera.request(range(frame_number + 1, frame_number + 1 + self.read_ahead))
+        return frames
+
+    def close(self):
+        for camera in self.cameras:
+            camera.close()
+        self.cameras = []
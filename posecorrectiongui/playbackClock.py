@@ -0,0 +1,75 @@
+import time
+from collections import deque
+
+
+class PlaybackClock:
+    """
+    Keeps playback in real time. It works out which frame should be shown from the time since playback started, so
+    frames are dropped when showing them takes longer than the frame interval, and measures the achieved fps
+    """
+
+    def __init__(self, fps=30.0, speed=1.0):
+        """
+        :param fps: the frame rate to play the video at
+        :param speed: the playback speed e.g. 0.25 to 4
+        """
+        self.fps = fps
+        self.speed = speed
+        self.start_time = time.perf_counter()
+        self.start_frame = 0
+        self.dropped = 0
+        self.shown_times = deque()
+
+    def start(self, frame_number):
+        """
+        Start (or restart) the clock from a frame
+        :param frame_number: the frame number playback starts from
+        """
+        self.start_time = time.perf_counter()
+        self.start_frame = frame_number
+        self.dropped = 0
+        self.shown_times.clear()
+
+    def set_rate(self, frame_number, fps=None, speed=None):
+        """
+        Change the frame rate or the speed without jumping, by restarting the clock from the current frame
+        :param frame_number: the current frame number
+        :param fps: the new frame rate
+        :param speed: the new playback speed
+        """
+        self.fps = fps or self.fps
+        self.speed = speed or self.speed
+        self.start_time = time.perf_counter()
+        self.start_frame = frame_number
+
+    @property
+    def interval(self):
+        """
+        The time between frames in milliseconds
+        """
+        return 1000 / (self.fps * self.speed)
+
+    def target_frame(self):
+        """
+        The frame that should be shown now
+        """
+        return self.start_frame + int((time.perf_counter() - self.start_time) * self.fps * self.speed)
+
+    def frame_shown(self, dropped=0):
+        """
+        Record that a frame was shown
+        :param dropped: the number of frames that were skipped to catch up
+        """
+        now = time.perf_counter()
+        self.dropped += dropped
+        self.shown_times.append(now)
+        while self.shown_times and now - self.shown_times[0] > 1:
+            self.shown_times.popleft()
+
+    def achieved_fps(self):
+        """
+        The number of frames shown in the last second
+        """
+        if len(self.shown_times) < 2:
+            return 0.0
+        return (len(self.shown_times) - 1) / (self.shown_times[-1] - self.shown_times[0])
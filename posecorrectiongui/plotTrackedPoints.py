@@ -19,7 +19,7 @@ def create_body_indices(bodyparts, skeleton):
     return sk_num
 
 
-def plot_tracked_points(image, h5, frame_number, skeleton, dot_size=4):
+def plot_tracked_points(image, h5, frame_number, skeleton, dot_size=4, pcutoff=None):
     """
     Plot the tracked body points on the image
     :param image: the frame
@@ -27,12 +27,35 @@ def plot_tracked_points(image, h5, frame_number, skeleton, dot_size=4):
     :param frame_number: the frame number to plot the tracked points
     :param skeleton: the defined skeleton for the tracked points
     :param dot_size: the size for the tracked points to plot
+    :param pcutoff: dim the body points with a likelihood below this, if the h5 data has the likelihood
     :return: an image with plotted skeleton points
     """
-    scorer = h5.columns.get_level_values('scorer').unique().item()
     bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
     individuals = h5.columns.get_level_values('individuals').unique().to_list()
+    coords = h5.columns.get_level_values('coords').unique().to_list()
 
+    points = h5.iloc[frame_number].values.reshape((len(individuals), len(bodyparts), -1))
+    bpt_indices = create_body_indices(bodyparts, skeleton)
+    uncertain = None
+    if pcutoff is not None and 'likelihood' in coords:
+        uncertain = points[..., coords.index('likelihood')] < pcutoff
+
+    return plot_points(image, points, bpt_indices, dot_size, uncertain)
+
+
+def plot_points(image, points, bpt_indices, dot_size=4, uncertain=None, highlight=None):
+    """
+    Plot the tracked body points of a single frame on the image
+    :param image: the frame
+    :param points: the tracked points for the frame with shape (individuals, body parts, coords)
+    :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+    :param dot_size: the size for the tracked points to plot
+    :param uncertain: boolean array with shape (individuals, body parts) of the body points with a low likelihood.
+    They are plotted dimmed and smaller, and so are the lines of the skeleton to them
+    :param highlight: boolean array with shape (individuals, edges) of the skeleton edges to plot thicker in yellow
+    e.g. the edges with outlier lengths
+    :return: an image with plotted skeleton points
+    """
     # Color
     # Red for individual 1 and Blue for 2
     color = [[0, 0, 1], [(1, 0, 0)]]
@@ -40,26 +63,35 @@ def plot_tracked_points(image, h5, frame_number, skeleton, dot_size=4):
     height, width = image.shape[:2]
     ny, nx = height, width
 
-    bpt_indices = create_body_indices(bodyparts, skeleton)
-
-    for j, ind in enumerate(individuals):
-
-        individual = h5[scorer][ind]
-        df_x, df_y = individual.values.reshape((len(individual), -1, 2)).T
+    for j in range(points.shape[0]):
+        df_x, df_y = points[j, :, 0], points[j, :, 1]
 
-        for bp1, bp2 in bpt_indices:
-            if not (np.any(np.isnan(df_x[[bp1, bp2], frame_number]))
-                    or np.any(np.isnan(df_y[[bp1, bp2], frame_number]))):
+        for edge, (bp1, bp2) in enumerate(bpt_indices):
+            if not (np.any(np.isnan(df_x[[bp1, bp2]]))
+                    or np.any(np.isnan(df_y[[bp1, bp2]]))):
                 rr, cc, val = draw.line_aa(
-                    int(np.clip(df_y[bp1, frame_number], 0, ny - 1)),
-                    int(np.clip(df_x[bp1, frame_number], 0, nx - 1)),
-                    int(np.clip(df_y[bp2, frame_number], 0, ny - 1)),
-                    int(np.clip(df_x[bp2, frame_number], 0, nx - 1))
+                    int(np.clip(df_y[bp1], 0, ny - 1)),
+                    int(np.clip(df_x[bp1], 0, nx - 1)),
+                    int(np.clip(df_y[bp2], 0, ny - 1)),
+                    int(np.clip(df_x[bp2], 0, nx - 1))
                 )
-                image[rr, cc] = (np.array([1, 1, 1]) * 255).astype(np.uint8)
+                if highlight is not None and highlight[j, edge]:
+                    # Yellow (BGR) and 3 pixels wide
+                    for offset in (-1, 0, 1):
+                        image[np.clip(rr + offset, 0, ny - 1), cc] = (0, 255, 255)
+                        image[rr, np.clip(cc + offset, 0, nx - 1)] = (0, 255, 255)
+                    continue
+                dimmed = uncertain is not None and (uncertain[j, bp1] or uncertain[j, bp2])
+                image[rr, cc] = (np.array([1, 1, 1]) * (110 if dimmed else 255)).astype(np.uint8)
 
-        for i, bp in enumerate(bodyparts):
-            rr, cc = draw.disk((df_y[i, frame_number], df_x[i, frame_number]), dot_size, shape=image.shape)
-            image[rr, cc, :] = (np.array(color[j]) * 255).astype(np.uint8)
+        for i in range(points.shape[1]):
+            if np.isnan(df_x[i]) or np.isnan(df_y[i]):
+                continue
+            if uncertain is not None and uncertain[j, i]:
+                rr, cc = draw.disk((df_y[i], df_x[i]), max(dot_size - 1, 1), shape=image.shape)
+                image[rr, cc, :] = (np.array(color[j % len(color)]) * 110 + 40).astype(np.uint8)
+                continue
+            rr, cc = draw.disk((df_y[i], df_x[i]), dot_size, shape=image.shape)
+            image[rr, cc, :] = (np.array(color[j % len(color)]) * 255).astype(np.uint8)
 
     return image
@@ -0,0 +1,165 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+
+from correctionEngine import h5_lock
+from findBadTracking import tracked_points, bad_tracking_filename
+from plotTrackedPoints import create_body_indices
+from trackingFeatures import TrackingFeatures
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.mpg', '.mpeg', '.wmv')
+
+
+def find_session_pairs(videos_path, h5files_path, video_extensions=VIDEO_EXTENSIONS):
+    """
+    Match the videos with their h5 files. The name of a h5 file starts with the name of its video e.g. mouse1.mp4 and
+    mouse1DLC_resnet50.h5. A h5 file goes with the video with the longest matching name, so mouse1.mp4 is not matched
+    with mouse10DLC_resnet50.h5. Videos with more than one h5 file use the first one in alphabetical order
+    :param videos_path: the folder with the videos
+    :param h5files_path: the folder with the h5 files
+    :param video_extensions: the file extensions of the videos
+    :return: list of (video filepath, h5 filepath) sorted by the video name. Videos without a h5 file are left out
+    """
+    videos = sorted(p for p in Path(videos_path).iterdir() if p.suffix.lower() in video_extensions)
+    longest_first = sorted(videos, key=lambda p: len(p.stem), reverse=True)
+    h5_files = {}
+    for h5_file in sorted(Path(h5files_path).glob('*.h5')):
+        video = next((v for v in longest_first if h5_file.stem.startswith(v.stem)), None)
+        if video is not None:
+            h5_files.setdefault(video, h5_file)
+    return [(str(video), str(h5_files[video])) for video in videos if video in h5_files]
+
+
+class PreparedSession:
+    """
+    A video and h5 file loaded ahead of time: the opened video with the first frame to show decoded, the h5 data and
+    the frames with bad tracking. Loaded into the engine with CorrectionEngine.load_session
+    """
+
+    def __init__(self, video_name, h5_name, frame_number=0, window=None, skeleton=None, edge_threshold=3.5):
+        """
+        :param video_name: the filepath for the video
+        :param h5_name: the filepath for the h5 file
+        :param frame_number: the frame number the session opens at
+        :param window: the number of frames for the rolling thresholds of finding the bad tracking
+        :param skeleton: the defined skeleton for the tracked points, for the skeleton edges of outlier lengths
+        :param edge_threshold: the robust z-score of its length above which a skeleton edge is an outlier
+        """
+        self.video_name = video_name
+        self.h5_name = h5_name
+        self.frame_number = frame_number
+        self.window = window
+        self.skeleton = skeleton if skeleton is not None else []
+        self.edge_threshold = edge_threshold
+        self.cap = None
+        self.frame = None
+        self.h5 = None
+        self.animal_key = None
+        self.flagged = None
+
+    def load(self):
+        cap = cv2.VideoCapture(self.video_name)
+        if not cap.isOpened():
+            raise FileNotFoundError(f'Unable to open the video {self.video_name}')
+        last_frame = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) - 1
+        self.frame_number = int(min(max(self.frame_number, 0), last_frame))
+        if self.frame_number > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_number)
+        ret, frame = cap.read()
+        self.cap = cap
+        self.frame = frame if ret else None
+
+        with h5_lock:
+            self.h5 = pd.read_hdf(self.h5_name)
+            with pd.HDFStore(self.h5_name, 'r') as df:
+                self.animal_key = df.keys()[0]
+
+        # Use the saved frames with bad tracking, otherwise find them like CorrectionEngine.find_bad_tracking, without
+        # saving them until asked to
+        bad_tracking_file = bad_tracking_filename(self.h5_name)
+        if os.path.exists(bad_tracking_file):
+            self.flagged = np.unique(np.load(bad_tracking_file)).astype(int)
+        else:
+            data, bodyparts = tracked_points(self.h5)
+            features = TrackingFeatures(None, bodyparts, create_body_indices(bodyparts, self.skeleton), self.window,
+                                        self.edge_threshold)
+            self.flagged = features.compute(data).astype(int)
+        return self
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ProjectQueue:
+    """
+    The queue of video and h5 file pairs of a project. The next session is loaded in a background thread while the
+    current one is being corrected, so moving on to it does not wait for the video, the h5 file or finding the bad
+    tracking
+    """
+
+    def __init__(self, pairs, window=None, skeleton=None, edge_threshold=3.5):
+        """
+        :param pairs: list of (video filepath, h5 filepath) e.g. from find_session_pairs
+        :param window: the number of frames for the rolling thresholds of finding the bad tracking. Over the whole file
+        if None
+        :param skeleton: the defined skeleton for the tracked points
+        :param edge_threshold: the robust z-score of its length above which a skeleton edge is an outlier
+        """
+        self.pairs = list(pairs)
+        self.window = window
+        self.skeleton = skeleton
+        self.edge_threshold = edge_threshold
+        self.index = -1
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch-session')
+        self._prefetched = {}
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def prefetch(self, index, frame_number=0):
+        """
+        Start loading a session in the background
+        :param index: the index of the session in the queue
+        :param frame_number: the frame number the session opens at
+        """
+        if 0 <= index < len(self.pairs) and index not in self._prefetched:
+            session = PreparedSession(*self.pairs[index], frame_number=frame_number, window=self.window,
+                                      skeleton=self.skeleton, edge_threshold=self.edge_threshold)
+            self._prefetched[index] = self._executor.submit(session.load)
+
+    def take(self, index, frame_number=0):
+        """
+        The loaded session. Waits for it if it is still loading in the background and loads it now if it was not
+        prefetched. Sessions prefetched for other places in the queue are dropped
+        :param index: the index of the session in the queue
+        :param frame_number: the frame number the session opens at, if it was not prefetched
+        :return: the PreparedSession
+        """
+        self.prefetch(index, frame_number)
+        future = self._prefetched.pop(index)
+        self._drop(keep=index + 1)
+        session = future.result()
+        self.index = index
+        return session
+
+    def is_ready(self, index):
+        return index in self._prefetched and self._prefetched[index].done()
+
+    def _drop(self, keep=None):
+        for index in list(self._prefetched):
+            if index != keep:
+                self._prefetched.pop(index).add_done_callback(_release)
+
+    def close(self):
+        self._drop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _release(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().release()
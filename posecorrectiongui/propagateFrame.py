@@ -1,5 +1,7 @@
 import pandas as pd
 
+from updateH5file import h5_columns
+
 
 def propagate_frame(h5, frame_number, h5_filename, forward_backward='forward', steps=1, animal_ident='both'):
     """
@@ -18,7 +20,6 @@ def propagate_frame(h5, frame_number, h5_filename, forward_backward='forward', s
         animal_key = df.keys()[0]
 
     scorer = h5.columns.get_level_values('scorer').unique().item()
-    bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
     individuals = h5.columns.get_level_values('individuals').unique().to_list()
 
     data_df = pd.DataFrame()
@@ -40,8 +41,7 @@ def propagate_frame(h5, frame_number, h5_filename, forward_backward='forward', s
         df = pd.DataFrame(data)
         data_df = pd.concat((data_df, df), axis=1, ignore_index=True)
 
-    col = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, ['x', 'y']],
-                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    col = h5_columns(h5, scorer, individuals)
     data_ind = h5.index
     dataframe = pd.DataFrame(data_df.values, index=data_ind, columns=col)
     dataframe.to_hdf(h5_filename, animal_key)
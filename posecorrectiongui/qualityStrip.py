@@ -0,0 +1,104 @@
+from PySide6 import QtGui, QtWidgets
+from PySide6.QtCore import Qt, Signal
+
+from lazyImport import lazy_import
+
+np = lazy_import('numpy')
+
+# Colours for the scores 0 (good), 0.5 and 1 (bad)
+_score_stops = [0.0, 0.5, 1.0]
+_colour_stops = [(40, 160, 60), (230, 200, 40), (220, 40, 40)]
+
+
+class QualityStrip(QtWidgets.QWidget):
+    """
+    Strip along the frame slider that colours each pixel column by the worst tracking quality score of its frames, from
+    green (good) to red (bad). The colours come from a ScorePyramid, so redrawing does not depend on the number of
+    frames. Scroll to zoom in around the mouse, double-click to show the whole video and click to go to a frame
+    """
+    frame_clicked = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pyramid = None
+        self.view_start = 0
+        self.view_end = 0
+        self.frame_number = 0
+        self.setFixedHeight(14)
+        self.setMinimumWidth(100)
+        self.setToolTip('Tracking quality: green is good and red is bad tracking, missing points or swaps\n'
+                        'Click to go to a frame, scroll to zoom and double-click to show the whole video')
+
+    def set_pyramid(self, pyramid):
+        """
+        :param pyramid: the ScorePyramid of the tracking quality scores. None to clear the strip
+        """
+        self.pyramid = pyramid
+        self.view_start, self.view_end = 0, 0 if pyramid is None else pyramid.n_frames
+        self.update()
+
+    def set_frame(self, frame_number):
+        """
+        Mark the current frame, and keep it in view when zoomed in
+        :param frame_number: the current frame number
+        """
+        self.frame_number = frame_number
+        span = self.view_end - self.view_start
+        if self.pyramid is not None and span > 0 and not self.view_start <= frame_number < self.view_end:
+            self._set_view(frame_number - span // 2, span)
+        self.update()
+
+    def frame_at(self, x):
+        """
+        The frame number at a position on the strip
+        :param x: the x position in pixels
+        """
+        span = self.view_end - self.view_start
+        frame_number = self.view_start + int(x / max(self.width(), 1) * span)
+        return min(max(frame_number, self.view_start), max(self.view_end - 1, 0))
+
+    def _set_view(self, start, span):
+        n_frames = self.pyramid.n_frames
+        span = min(max(span, min(20, n_frames)), n_frames)
+        self.view_start = int(min(max(start, 0), n_frames - span))
+        self.view_end = self.view_start + span
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), Qt.darkGray)
+        span = self.view_end - self.view_start
+        if self.pyramid is None or span <= 0:
+            painter.end()
+            return
+        width = self.width()
+        _, worst = self.pyramid.columns(self.view_start, self.view_end, width)
+        colours = np.ascontiguousarray(
+            np.stack([np.interp(worst, _score_stops, [colour[i] for colour in _colour_stops]) for i in range(3)],
+                     axis=1).astype(np.uint8))
+        image = QtGui.QImage(colours.data, len(colours), 1, 3 * len(colours), QtGui.QImage.Format_RGB888)
+        painter.drawImage(self.rect(), image)
+
+        if self.view_start <= self.frame_number < self.view_end:
+            x = int((self.frame_number - self.view_start + 0.5) / span * width)
+            painter.setPen(QtGui.QPen(Qt.white, 2))
+            painter.drawLine(x, 0, x, self.height())
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.pyramid is not None:
+            self.frame_clicked.emit(self.frame_at(event.position().x()))
+
+    def mouseDoubleClickEvent(self, event):
+        if self.pyramid is not None:
+            self.view_start, self.view_end = 0, self.pyramid.n_frames
+            self.update()
+
+    def wheelEvent(self, event):
+        if self.pyramid is None:
+            return
+        x = event.position().x()
+        anchor = self.frame_at(x)
+        zoom = 0.8 ** (event.angleDelta().y() / 120)
+        span = max(int((self.view_end - self.view_start) * zoom), 1)
+        self._set_view(anchor - int(x / max(self.width(), 1) * span), span)
+        self.update()
@@ -0,0 +1,204 @@
+"""
+Replay an annotation session recorded with the GUI (python mainApp.py --record trace.jsonl) without a window, and
+report how long each kind of action took, to benchmark the GUI on the way annotators use it. Run it from the
+posecorrectiongui folder:
+
+    python replayActions.py trace.jsonl --output latency.json
+
+The h5 files are copied to a temporary folder first, so the edits of the session are not saved over them, and the
+sessions are saved to a session store there too. Message boxes are answered with their default button straight away
+"""
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+
+from PySide6 import QtWidgets
+from PySide6.QtWidgets import QApplication
+
+from actionRecorder import read_trace, set_gui_inputs, decode_args
+from findBadTracking import bad_tracking_filename
+from runBenchmarks import summarize
+
+
+def _answer_dialogs(counts):
+    # Message boxes wait for a click, so they return their default button at once and are counted instead
+    def answer(*args, **kwargs):
+        counts['dialogs'] += 1
+        return kwargs.get('defaultButton', QtWidgets.QMessageBox.StandardButton.Yes)
+    for name in ('warning', 'information', 'question', 'critical', 'about'):
+        setattr(QtWidgets.QMessageBox, name, staticmethod(answer))
+
+
+def _wait(app, seconds):
+    # Let the GUI run e.g. the decoding ahead, like it did while the annotator looked at the frame
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+class SessionFiles:
+    """
+    The videos and copies of the h5 files of a trace
+    """
+
+    def __init__(self, workdir, folder=None):
+        """
+        :param workdir: the folder for the copies of the h5 files and the session store of the replay
+        :param folder: the folder to find the files in by name, e.g. on another computer. Where they were recorded by
+        default
+        """
+        self.workdir = Path(workdir)
+        self.folder = folder
+        self._copies = {}
+
+    def find(self, filepath):
+        if filepath and self.folder:
+            return str(Path(self.folder) / Path(filepath).name)
+        return filepath
+
+    def copy_h5(self, h5_name):
+        """
+        Copy a h5 file with its frames with bad tracking. The review progress is not copied, as the session changed it
+        since it was recorded, so every replay starts with no frames reviewed. Loading it again gives the same copy
+        :param h5_name: the filepath for the h5 file
+        :return: the filepath for the copy
+        """
+        h5_name = self.find(h5_name)
+        if h5_name not in self._copies:
+            copy = self.workdir / str(len(self._copies)) / Path(h5_name).name
+            copy.parent.mkdir(parents=True)
+            shutil.copy(h5_name, copy)
+            if os.path.exists(bad_tracking_filename(h5_name)):
+                shutil.copy(bad_tracking_filename(h5_name), bad_tracking_filename(copy))
+            self._copies[h5_name] = str(copy)
+        return self._copies[h5_name]
+
+
+def load_files(gui, files, entry):
+    """
+    Load the video and h5 file of a load entry of the trace
+    """
+    video_name, h5_name = files.find(entry['video_name']), entry['h5_name']
+    if video_name and video_name != gui.video_name:
+        gui.video_name = video_name
+        gui.length = gui.engine.load_video(video_name)
+        gui.frame_slider_widget.setRange(0, gui.length)
+    if h5_name:
+        gui.h5_name = files.copy_h5(h5_name)
+        gui.engine.load_h5(gui.h5_name)
+        gui.quality_strip.set_pyramid(gui.engine.quality)
+        gui.update_trajectory_data()
+    gui.frame_number = gui.engine.clamp(entry['frame'])
+    gui.update_frame_widgets()
+    gui.display_frame()
+
+
+def replay_trace(trace, files, pace=1.0, max_pause=1.0):
+    """
+    Replay the actions of a trace on the GUI
+    :param trace: the entries of the trace (see actionRecorder.read_trace)
+    :param files: the SessionFiles for the files of the trace
+    :param pace: how fast the pauses between the actions pass: 1 as recorded, 0 for no pauses
+    :param max_pause: the longest pause between actions in seconds, e.g. instead of a coffee break
+    :return: the milliseconds each action took by action, the milliseconds recorded by action, the stage timings of
+    the GUI and counts of the dialogs answered, the actions that went to another frame than recorded and the actions
+    that failed
+    """
+    from mainApp import MainGUI
+
+    app = QApplication.instance() or QApplication([])
+    counts = defaultdict(int)
+    _answer_dialogs(counts)
+    # A session store in the folder of the copies, as the actions save e.g. the review progress of the videos to it
+    gui = MainGUI(config_overrides={'sessions_db': str(files.workdir / 'sessions.sqlite')})
+    timings, recorded = defaultdict(list), defaultdict(list)
+    last_time = None
+    try:
+        for entry in trace:
+            if last_time is not None and pace > 0:
+                _wait(app, min((entry['t'] - last_time) * pace, max_pause))
+            last_time = entry['t']
+            if entry['action'] == 'load':
+                load_files(gui, files, entry)
+                continue
+            if not gui.video_name:
+                continue
+            gui.frame_number = gui.engine.clamp(entry['frame'])
+            gui.update_frame_widgets()
+            set_gui_inputs(gui, entry['inputs'])
+            action = getattr(gui, entry['action'])
+            start = time.perf_counter()
+            try:
+                action(*decode_args(entry['args']))
+            except Exception as error:
+                counts['failed'] += 1
+                print(f'{entry["action"]} at frame {entry["frame"]} failed: {error!r}', file=sys.stderr)
+                continue
+            timings[entry['action']].append((time.perf_counter() - start) * 1000)
+            recorded[entry['action']].append(entry['ms'])
+            if gui.frame_number != entry['frame_after']:
+                counts['diverged'] += 1
+            app.processEvents()
+        stages = {stage: list(samples) for stage, samples in gui.timer.samples.items()}
+    finally:
+        # Not my_exit_handler, which would save the last frame of the replay to the session store of the annotator
+        gui.engine.close()
+        gui.session_store.close()
+        gui.close()
+        app.processEvents()
+    return timings, recorded, stages, dict(counts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a recorded annotation session as a benchmark')
+    parser.add_argument('trace_file', help='the trace recorded with mainApp.py --record')
+    parser.add_argument('--folder', default=None, help='the folder to find the videos and h5 files of the trace in '
+                                                       'by name. Where they were recorded by default')
+    parser.add_argument('--pace', type=float, default=1.0,
+                        help='how fast the pauses between actions pass: 1 as recorded, 0 for no pauses')
+    parser.add_argument('--max-pause', type=float, default=1.0, help='the longest pause between actions in seconds')
+    parser.add_argument('--output', default=None, help='JSON file for the results. Prints to stdout by default')
+    args = parser.parse_args(argv)
+
+    trace = read_trace(args.trace_file)
+    workdir = tempfile.mkdtemp(prefix='pcg_replay_')
+    try:
+        timings, recorded, stages, counts = replay_trace(trace, SessionFiles(workdir, args.folder), args.pace,
+                                                         args.max_pause)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = [summarize(action, samples, recorded_p50_ms=float(np.percentile(recorded[action], 50)),
+                         recorded_p95_ms=float(np.percentile(recorded[action], 95)))
+               for action, samples in timings.items()]
+    results += [summarize(f'gui_stage_{stage}', samples) for stage, samples in stages.items() if samples]
+    for result in results:
+        print(f"{result['benchmark']:<32}{result['calls']:>7}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f} ms",
+              file=sys.stderr)
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'opencv': cv2.__version__, 'pandas': pd.__version__, 'numpy': np.__version__,
+              'trace': str(args.trace_file), 'actions': len(trace), 'dialogs': counts.get('dialogs', 0),
+              'diverged': counts.get('diverged', 0), 'failed': counts.get('failed', 0), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as fw:
+            json.dump(report, fw, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
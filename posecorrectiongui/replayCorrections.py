@@ -0,0 +1,56 @@
+"""
+Replay the corrections of an earlier tracking run onto a new h5 file of the same video, e.g. after tracking it again
+with a better model. Run it from the posecorrectiongui folder:
+
+    python replayCorrections.py old_corrections.npz videoDLC_new.h5 --output videoDLC_new_corrected.h5
+
+The correction log of a h5 file is saved next to it (e.g. videocorrections.npz) as it is corrected. The points the new
+tracking already differs from are not corrected, and are listed in a csv file to review
+"""
+import argparse
+import sys
+from pathlib import Path
+import yaml
+
+from correctionEngine import CorrectionEngine
+from findBadTracking import sidecar_filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a correction log onto a new h5 file')
+    parser.add_argument('log_file', help='the correction log of the earlier tracking run')
+    parser.add_argument('h5_file', help='the new h5 file')
+    parser.add_argument('--output', default=None, help='the h5 file to save the corrected points to. Overwrites the '
+                                                       'new h5 file by default')
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help='the most pixels the new tracking can be from where a point was before it was corrected')
+    parser.add_argument('--force', action='store_true', help='correct the conflicting points too')
+    parser.add_argument('--conflicts', default=None, help='csv file for the conflicts. Saved next to the output by '
+                                                          'default')
+    args = parser.parse_args(argv)
+
+    skeleton = []
+    if (Path('.') / 'config.yaml').exists():
+        with open(Path('.') / 'config.yaml', 'r') as fr:
+            skeleton = yaml.load(fr, Loader=yaml.FullLoader).get('skeleton') or []
+
+    output = args.output or args.h5_file
+    engine = CorrectionEngine(h5_name=args.h5_file, skeleton=skeleton)
+    report = engine.replay_corrections(args.log_file, args.tolerance, args.force)
+    engine.save(output)
+    engine.close()
+
+    counts = report['status'].value_counts()
+    for status in ['applied', 'already corrected', 'forced', 'conflict', 'missing']:
+        if counts.get(status):
+            print(f'{status}: {counts[status]} body points in {report.loc[report.status == status, "frame"].nunique()} '
+                  f'frames')
+    conflicts = report[report['status'].isin(['conflict', 'forced'])]
+    if len(conflicts):
+        conflicts_file = args.conflicts or sidecar_filename(output, 'replay_conflicts.csv')
+        conflicts.to_csv(conflicts_file, index=False)
+        print(f'Conflicts saved to {conflicts_file}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+from pathlib import Path
+import numpy as np
+
+VISITED, REVIEWED, EDITED = 0, 1, 2
+
+# Number of set bits in each byte value
+_popcount = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class ReviewProgress:
+    """
+    Remembers which frames were visited, reviewed and edited with one bit per frame for each. The bits are kept in a
+    memory-mapped file next to the h5 file, so marking a frame only writes the page it is on and the progress is kept
+    between sessions. A million frames take 375 KB
+    """
+
+    def __init__(self, n_frames, progress_file=None):
+        """
+        :param n_frames: the number of frames
+        :param progress_file: the filepath for the file with the bits. Only kept in memory if not given
+        """
+        self.n_frames = n_frames
+        n_bytes = (n_frames + 7) // 8
+        if progress_file is None:
+            self.bits = np.zeros((3, n_bytes), dtype=np.uint8)
+        else:
+            # Start again if the file is for a different number of frames
+            exists = Path(progress_file).exists() and Path(progress_file).stat().st_size == 3 * n_bytes
+            self.bits = np.memmap(progress_file, dtype=np.uint8, mode='r+' if exists else 'w+', shape=(3, n_bytes))
+
+    def mark(self, kind, frames):
+        """
+        Set the bit of the frames
+        :param kind: VISITED, REVIEWED or EDITED
+        :param frames: a frame number or an array of frame numbers
+        """
+        frames = np.atleast_1d(np.asarray(frames, dtype=np.int64))
+        np.bitwise_or.at(self.bits[kind], frames >> 3, (128 >> (frames & 7)).astype(np.uint8))
+
+    def mark_range(self, kind, start, end):
+        """
+        Set the bit of a range of frames. Whole bytes are set at once
+        :param kind: VISITED, REVIEWED or EDITED
+        :param start: the first frame number
+        :param end: the frame number to stop at (not included)
+        """
+        start, end = max(start, 0), min(end, self.n_frames)
+        if end <= start:
+            return
+        first_full, last_full = (start + 7) // 8, end // 8
+        if first_full >= last_full:
+            self.mark(kind, np.arange(start, end))
+            return
+        self.bits[kind, first_full:last_full] = 0xFF
+        self.mark(kind, np.r_[start:first_full * 8, last_full * 8:end])
+
+    def is_set(self, kind, frames):
+        """
+        :param kind: VISITED, REVIEWED or EDITED
+        :param frames: a frame number or an array of frame numbers
+        :return: boolean array with whether the bit of each frame is set
+        """
+        frames = np.atleast_1d(np.asarray(frames, dtype=np.int64))
+        return (self.bits[kind][frames >> 3] & (128 >> (frames & 7))) != 0
+
+    def count(self, kind):
+        return int(_popcount[self.bits[kind]].sum(dtype=np.int64))
+
+    def percentage(self, kind, frames):
+        """
+        The percentage of the frames with the bit set e.g. the percentage of the flagged frames reviewed
+        :param kind: VISITED, REVIEWED or EDITED
+        :param frames: array of frame numbers
+        """
+        if len(frames) == 0:
+            return 100.0
+        return float(np.round(self.is_set(kind, frames).mean() * 100, 1))
+
+    def next_unset(self, kind, frames, frame_number):
+        """
+        The first frame after the current frame whose bit is not set e.g. the next flagged frame not reviewed yet.
+        Wraps around to the start
+        :param kind: VISITED, REVIEWED or EDITED
+        :param frames: sorted array of frame numbers
+        :param frame_number: the current frame number
+        :return: the frame number. None if the bit of every frame is set
+        """
+        unset = frames[~self.is_set(kind, frames)]
+        if len(unset) == 0:
+            return None
+        i = np.searchsorted(unset, frame_number, side='right')
+        return int(unset[i % len(unset)])
+
+    def segment_counts(self, kind, segment_size, frames=None):
+        """
+        The number of frames with the bit set in each segment of the video
+        :param kind: VISITED, REVIEWED or EDITED
+        :param segment_size: the number of frames in each segment
+        :param frames: only count these frame numbers e.g. the flagged frames. Counts all frames if not given
+        :return: array with the count for each segment
+        """
+        n_segments = (self.n_frames + segment_size - 1) // segment_size
+        if frames is None:
+            if segment_size % 8 == 0:
+                per_byte = _popcount[self.bits[kind]]
+                return np.add.reduceat(per_byte, np.arange(0, len(per_byte), segment_size // 8)).astype(np.int64)
+            frames = np.arange(self.n_frames)
+        frames = np.asarray(frames, dtype=np.int64)
+        return np.bincount(frames[self.is_set(kind, frames)] // segment_size, minlength=n_segments)
+
+    def flush(self):
+        if isinstance(self.bits, np.memmap):
+            self.bits.flush()
@@ -0,0 +1,50 @@
+import warnings
+import numpy as np
+from scipy.ndimage import median_filter
+
+
+def rolling_median(values, window):
+    """
+    The median of a centred window of frames around each frame. Missing values are filled by linear interpolation
+    first, so they do not pull the median. Uses the 1-D median filter of scipy, which keeps the window sorted as it
+    slides (O(n log w) for each column) instead of sorting every window again
+    :param values: array with the frames along the first axis e.g. shape (frames, individuals, edges)
+    :param window: the number of frames in the window. The median of all the frames if None or longer than the values
+    :return: array with the shape of the values. NaN for columns with no values
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if window is None or window >= len(values):
+        with warnings.catch_warnings():
+            # Columns with no values give NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(values, axis=0)
+        return np.broadcast_to(median, values.shape).copy()
+    columns = values.reshape((len(values), -1))
+    median = np.empty_like(columns)
+    frames = np.arange(len(values))
+    for column in range(columns.shape[1]):
+        series = columns[:, column]
+        valid = ~np.isnan(series)
+        if not valid.any():
+            median[:, column] = np.nan
+            continue
+        if not valid.all():
+            series = np.interp(frames, frames[valid], series[valid]).astype(np.float32)
+        # The windows at the ends are filled by mirroring the values, which keeps the median and the spread of a trend.
+        # Repeating the first and last value would give a MAD of 0
+        median[:, column] = median_filter(series, size=int(window), mode='reflect')
+    return median.reshape(values.shape)
+
+
+def rolling_mad(values, window, median=None):
+    """
+    The median absolute deviation from the rolling median, over the same windows
+    :param values: array with the frames along the first axis
+    :param window: the number of frames in the window. Over all the frames if None
+    :param median: the rolling median of the values, if it was already worked out
+    :return: array with the shape of the values
+    """
+    if median is None:
+        median = rolling_median(values, window)
+    return rolling_median(np.abs(np.asarray(values, dtype=np.float32) - median), window)
+
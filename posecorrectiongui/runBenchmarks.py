@@ -0,0 +1,216 @@
+"""
+Headless benchmarks for navigation, overlay rendering, the edit functions and the bad tracking detection. Run it from
+the posecorrectiongui folder:
+
+    python runBenchmarks.py --frames 1000 10000 --resolution 640x480 --codec mp4v --output results.json
+"""
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+import yaml
+
+from PySide6.QtWidgets import QApplication
+
+from syntheticData import make_synthetic_session
+from plotTrackedPoints import plot_tracked_points
+from swapLabels import swap_labels, swap_label_sequences
+from propagateFrame import propagate_frame
+from updateH5file import update_h5file
+from findBadTracking import find_bad_tracking
+from moveToIndex import move_to_index
+from correctionEngine import CorrectionEngine
+
+
+def time_calls(func, args_list):
+    """
+    Time a function for each set of arguments
+    :param func: the function to time
+    :param args_list: list with the arguments for each call
+    :return: the time for each call in milliseconds
+    """
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(name, timings, **info):
+    timings = np.asarray(timings)
+    result = {'benchmark': name, 'calls': len(timings), 'mean_ms': float(timings.mean()),
+              'p50_ms': float(np.percentile(timings, 50)), 'p95_ms': float(np.percentile(timings, 95)),
+              'min_ms': float(timings.min()), 'max_ms': float(timings.max())}
+    result.update(info)
+    return result
+
+
+def run_session_benchmarks(video_file, h5_file, skeleton, repeats=20, seed=0):
+    """
+    Time every stage on a single video and h5 file
+    :param video_file: the filepath for the video
+    :param h5_file: the filepath for the h5 file. It is overwritten by the edit functions
+    :param skeleton: the defined skeleton for the tracked points
+    :param repeats: the number of calls to time per benchmark
+    :param seed: seed for the random frame numbers
+    :return: list with the summary of each benchmark
+    """
+    rng = np.random.default_rng(seed)
+    h5 = pd.read_hdf(h5_file)
+    n_frames = len(h5)
+    frames = rng.integers(0, n_frames - 1, repeats)
+    results = []
+
+    cap = cv2.VideoCapture(video_file)
+    cap.set(1, 0)
+    results.append(summarize('navigation_sequential', time_calls(cap.read, [()] * repeats)))
+
+    def seek_and_read(frame_number):
+        cap.set(1, frame_number)
+        return cap.read()
+    results.append(summarize('navigation_random', time_calls(seek_and_read, [(f,) for f in frames])))
+
+    ret, image = seek_and_read(0)
+    results.append(summarize('plot_tracked_points',
+                             time_calls(lambda f: plot_tracked_points(image.copy(), h5, f, skeleton),
+                                        [(f,) for f in frames])))
+    cap.release()
+
+    results.append(summarize('read_hdf', time_calls(pd.read_hdf, [(h5_file,)] * repeats)))
+
+    def reload_after(func):
+        # The GUI reads the h5 file again after each edit
+        def edit(*args):
+            func(pd.read_hdf(h5_file), *args)
+        return edit
+
+    results.append(summarize('swap_labels', time_calls(reload_after(swap_labels),
+                                                       [(f, h5_file) for f in frames])))
+    spans = [(f, min(f + 100, n_frames - 1), h5_file) for f in frames]
+    results.append(summarize('swap_label_sequences', time_calls(reload_after(swap_label_sequences), spans)))
+    results.append(summarize('propagate_frame', time_calls(reload_after(propagate_frame),
+                                                           [(f, h5_file, 'forward', 10, 'both') for f in frames])))
+
+    individuals = h5.columns.get_level_values('individuals').unique().to_list()
+    n_points = len(h5[h5.columns.get_level_values('scorer')[0]][individuals[0]].columns)
+    new_points = {ind: rng.uniform(0, 100, n_points) for ind in individuals}
+    results.append(summarize('update_h5file', time_calls(lambda *args: update_h5file(new_points, pd.read_hdf(h5_file),
+                                                                                     *args),
+                                                         [(f, h5_file) for f in frames])))
+
+    results.append(summarize('find_bad_tracking', time_calls(find_bad_tracking,
+                                                                  [(h5_file, None, skeleton)] * max(repeats // 5, 1))))
+    results.append(summarize('move_to_index', time_calls(move_to_index, [(h5_file, f) for f in frames])))
+
+    engine = CorrectionEngine(h5_name=h5_file, skeleton=skeleton)
+    results.append(summarize('engine_swap', time_calls(engine.swap, [(f,) for f in frames])))
+    results.append(summarize('engine_swap_sequence', time_calls(engine.swap_sequence, [span[:2] for span in spans])))
+    results.append(summarize('engine_propagate', time_calls(engine.propagate,
+                                                            [(f, 'forward', 10, 'both') for f in frames])))
+    results.append(summarize('engine_save', time_calls(engine.save, [()] * max(repeats // 5, 1))))
+
+    return results
+
+
+def run_gui_benchmarks(video_file, h5_file, repeats=20, seed=0):
+    """
+    Time the frame display path of the GUI with the stage timers of the GUI
+    :param video_file: the filepath for the video
+    :param h5_file: the filepath for the h5 file
+    :param repeats: the number of frames to display
+    :param seed: seed for the random frame numbers
+    :return: list with the summary of each stage
+    """
+    from mainApp import MainGUI
+
+    app = QApplication.instance() or QApplication([])
+    # A session store of its own, so the sessions of the annotator are left alone, and every frame read in the GUI
+    # process as in the session benchmarks
+    store_dir = tempfile.mkdtemp(prefix='pcg_bench_sessions_')
+    gui = MainGUI(config_overrides={'sessions_db': str(Path(store_dir) / 'sessions.sqlite'), 'decoder_workers': 0})
+    try:
+        gui.video_name, gui.h5_name = video_file, h5_file
+        gui.length = gui.engine.load_video(video_file)
+        gui.engine.load_h5(h5_file)
+
+        rng = np.random.default_rng(seed)
+        frames = rng.integers(0, gui.length, repeats)
+
+        def display(frame_number):
+            gui.frame_number = int(frame_number)
+            gui.display_frame()
+        results = [summarize('gui_display_frame', time_calls(display, [(f,) for f in frames]))]
+        for stage, samples in gui.timer.samples.items():
+            results.append(summarize(f'gui_stage_{stage}', list(samples)))
+    finally:
+        gui.engine.close()
+        gui.session_store.close()
+        gui.close()
+        app.processEvents()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless benchmarks for the Pose Correction GUI')
+    parser.add_argument('--frames', type=int, nargs='+', default=[1000, 10000],
+                        help='the number of frames of each synthetic session')
+    parser.add_argument('--resolution', nargs='+', default=['640x480'], help='WIDTHxHEIGHT of the videos')
+    parser.add_argument('--codec', nargs='+', default=['mp4v'], help='fourcc codes of the videos')
+    parser.add_argument('--repeats', type=int, default=20, help='the number of calls to time per benchmark')
+    parser.add_argument('--output', default=None, help='JSON file for the results. Prints to stdout by default')
+    parser.add_argument('--workdir', default=None, help='folder for the synthetic files. Removed if not given')
+    parser.add_argument('--no-gui', action='store_true', help='skip the benchmarks of the GUI display path')
+    args = parser.parse_args(argv)
+
+    with open(Path('.') / 'config.yaml', 'r') as fr:
+        config = yaml.load(fr, Loader=yaml.FullLoader)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='pcg_bench_'))
+    results = []
+    try:
+        for resolution in args.resolution:
+            width, height = (int(v) for v in resolution.lower().split('x'))
+            for codec in args.codec:
+                for n_frames in args.frames:
+                    video_file, h5_file = make_synthetic_session(workdir, n_frames, width, height, codec,
+                                                                 individuals=config['animals'],
+                                                                 bodyparts=config['body_parts'])
+                    info = {'frames': n_frames, 'resolution': resolution, 'codec': codec}
+                    print(f'Benchmarking {info}', file=sys.stderr)
+                    session_results = []
+                    if not args.no_gui:
+                        session_results += run_gui_benchmarks(video_file, h5_file, args.repeats)
+                    session_results += run_session_benchmarks(video_file, h5_file, config['skeleton'], args.repeats)
+                    for result in session_results:
+                        result.update(info)
+                    results += session_results
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'opencv': cv2.__version__, 'pandas': pd.__version__, 'numpy': np.__version__,
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as fw:
+            json.dump(report, fw, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,16 @@
-from pathlib import Path
-import yaml
+from sessionStore import SessionStore
 
 
-def save_last_frame_number(frame_number, video_file):
+def save_last_frame_number(frame_number, video_file, session_store=None):
     """
     Saves the frame number for the video when the GUI is cancelled. It allows the GUI to continue from where it stopped
     in the previous session
     :param frame_number: the last frame number when the GUI is closed
     :param video_file: the name of the video file
+    :param session_store: the SessionStore to save the frame number in. Uses the default session store if not given
     :return:
     """
-    destination_file = Path('.') / 'last_video_frame.yaml'
+    if session_store is None:
+        session_store = SessionStore()
 
-    video_frame = {f"{video_file}": frame_number}
-
-    if not destination_file.exists():
-        with open(destination_file, 'w') as fw:
-            yaml.dump(video_frame, fw, default_flow_style=False, sort_keys=False)
-    else:
-        with open(destination_file, 'r') as fr:
-            data = yaml.load(fr, Loader=yaml.FullLoader)
-            data[f'{video_file}'] = frame_number
-        with open(destination_file, 'w') as fw:
-            yaml.dump(data, fw, default_flow_style=False, sort_keys=False)
+    session_store.save_last_frame(video_file, frame_number)
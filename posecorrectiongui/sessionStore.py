@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+import yaml
+
+
+class SessionStore:
+    """
+    Embedded SQLite store for the sessions of the GUI: the last frame, review progress, timestamps and settings of
+    each video. Lookups use the primary key on the video path and every write only touches one row, in its own
+    transaction. The database uses write-ahead logging, so several GUI instances can use it at the same time
+    """
+
+    def __init__(self, db_file=None):
+        """
+        :param db_file: the filepath for the database. Uses ~/.posecorrectiongui/sessions.sqlite by default
+        """
+        if not db_file:
+            db_file = Path.home() / '.posecorrectiongui' / 'sessions.sqlite'
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.db_file = str(db_file)
+
+        self.connection = sqlite3.connect(self.db_file, timeout=10, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                video_path TEXT PRIMARY KEY,
+                h5_path TEXT,
+                last_frame INTEGER,
+                reviewed REAL,
+                created REAL,
+                updated REAL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                video_path TEXT,
+                key TEXT,
+                value TEXT,
+                PRIMARY KEY (video_path, key)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    @staticmethod
+    def _key(video_path):
+        return os.path.abspath(str(video_path))
+
+    def _upsert(self, video_path, **values):
+        now = time.time()
+        columns = ', '.join(values)
+        updates = ', '.join(f'{column}=excluded.{column}' for column in values)
+        placeholders = ', '.join('?' * len(values))
+        self.connection.execute(f'INSERT INTO sessions (video_path, {columns}, created, updated) '
+                                f'VALUES (?, {placeholders}, ?, ?) '
+                                f'ON CONFLICT(video_path) DO UPDATE SET {updates}, updated=excluded.updated',
+                                (self._key(video_path), *values.values(), now, now))
+
+    def get_session(self, video_path):
+        """
+        Everything saved for a video
+        :param video_path: the filepath for the video
+        :return: dictionary with h5_path, last_frame, reviewed, created and updated. None for a new video
+        """
+        row = self.connection.execute('SELECT h5_path, last_frame, reviewed, created, updated FROM sessions '
+                                      'WHERE video_path = ?', (self._key(video_path),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(['h5_path', 'last_frame', 'reviewed', 'created', 'updated'], row))
+
+    def last_frame(self, video_path):
+        """
+        The frame number the GUI was on when the video was last closed
+        :param video_path: the filepath for the video
+        :return: the frame number. None for a new video
+        """
+        row = self.connection.execute('SELECT last_frame FROM sessions WHERE video_path = ?',
+                                      (self._key(video_path),)).fetchone()
+        return None if row is None else row[0]
+
+    def save_last_frame(self, video_path, frame_number):
+        self._upsert(video_path, last_frame=int(frame_number))
+
+    def save_h5_path(self, video_path, h5_path):
+        self._upsert(video_path, h5_path=os.path.abspath(str(h5_path)))
+
+    def save_progress(self, video_path, reviewed):
+        """
+        Save how much of the bad tracking has been reviewed
+        :param video_path: the filepath for the video
+        :param reviewed: the percentage reviewed
+        """
+        self._upsert(video_path, reviewed=float(reviewed))
+
+    def get_setting(self, video_path, key, default=None):
+        row = self.connection.execute('SELECT value FROM settings WHERE video_path = ? AND key = ?',
+                                      (self._key(video_path), key)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_setting(self, video_path, key, value):
+        self.connection.execute('INSERT INTO settings (video_path, key, value) VALUES (?, ?, ?) '
+                                'ON CONFLICT(video_path, key) DO UPDATE SET value=excluded.value',
+                                (self._key(video_path), key, json.dumps(value)))
+
+    def import_yaml(self, yaml_file):
+        """
+        Import the last frames saved by earlier versions in last_video_frame.yaml. Each file is only imported once
+        and never overwrites newer values
+        :param yaml_file: the filepath for last_video_frame.yaml
+        """
+        meta_key = f'imported:{os.path.abspath(str(yaml_file))}'
+        if not Path(yaml_file).exists() or self.connection.execute('SELECT 1 FROM meta WHERE key = ?',
+                                                                   (meta_key,)).fetchone():
+            return
+        with open(yaml_file, 'r') as fr:
+            data = yaml.load(fr, Loader=yaml.FullLoader) or {}
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('INSERT OR IGNORE INTO sessions (video_path, last_frame, created, updated) '
+                                        'VALUES (?, ?, ?, ?)',
+                                        [(self._key(video), int(frame), now, now) for video, frame in data.items()])
+            self.connection.execute('INSERT INTO meta (key, value) VALUES (?, ?)', (meta_key, str(now)))
+
+    def close(self):
+        self.connection.close()
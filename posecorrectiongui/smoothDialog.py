@@ -0,0 +1,98 @@
+from PySide6 import QtWidgets
+from PySide6.QtCore import Signal
+
+# The methods of smoothPoints.smooth_points and their names in the dialog
+METHODS = [('median', 'Running Median'), ('savgol', 'Savitzky-Golay')]
+
+
+class SmoothDialog(QtWidgets.QDialog):
+    """
+    The settings for smoothing the trajectories of the body points (see CorrectionEngine.smooth): the filter and its
+    window, the outlier threshold, the longest gap to fill, the frames and the individuals. Preview shows the current
+    frame before and after smoothing without changing the tracked points
+    """
+    preview_clicked = Signal()
+
+    def __init__(self, individuals, length, start=0, end=None, parent=None):
+        """
+        :param individuals: the names of the individuals
+        :param length: the last frame number of the video
+        :param start: the first frame to smooth
+        :param end: the last frame to smooth. The last frame of the video by default
+        """
+        super().__init__(parent)
+        self.setWindowTitle('Smooth Trajectories')
+        layout = QtWidgets.QFormLayout(self)
+
+        self.method = QtWidgets.QComboBox()
+        self.method.addItems([name for _, name in METHODS])
+        self.method.currentIndexChanged.connect(self._update_polyorder)
+        layout.addRow('Filter', self.method)
+        self.window = QtWidgets.QSpinBox()
+        self.window.setRange(3, 999)
+        self.window.setSingleStep(2)
+        self.window.setValue(7)
+        self.window.setToolTip('The number of frames in the window of the filter. Odd')
+        layout.addRow('Window (frames)', self.window)
+        self.polyorder = QtWidgets.QSpinBox()
+        self.polyorder.setRange(1, 10)
+        self.polyorder.setValue(2)
+        layout.addRow('Polynomial Order', self.polyorder)
+        self.outlier_threshold = QtWidgets.QDoubleSpinBox()
+        self.outlier_threshold.setRange(0, 10000)
+        self.outlier_threshold.setValue(0)
+        self.outlier_threshold.setSpecialValueText('Off')
+        self.outlier_threshold.setToolTip('Remove the body points further than this many pixels from the running median '
+                                          'of their trajectory')
+        layout.addRow('Outlier Threshold (px)', self.outlier_threshold)
+        self.max_gap = QtWidgets.QSpinBox()
+        self.max_gap.setRange(0, 100000)
+        self.max_gap.setValue(0)
+        self.max_gap.setSpecialValueText('Off')
+        self.max_gap.setToolTip('Fill the runs of missing frames up to this long by linear interpolation')
+        layout.addRow('Fill Gaps Up To (frames)', self.max_gap)
+
+        frames = QtWidgets.QHBoxLayout()
+        self.start = QtWidgets.QSpinBox()
+        self.start.setRange(0, length)
+        self.start.setValue(start)
+        self.end = QtWidgets.QSpinBox()
+        self.end.setRange(0, length)
+        self.end.setValue(length if end is None else end)
+        frames.addWidget(self.start)
+        frames.addWidget(QtWidgets.QLabel('to'))
+        frames.addWidget(self.end)
+        layout.addRow('Frames', frames)
+        self.individuals = []
+        animals = QtWidgets.QHBoxLayout()
+        for name in individuals:
+            check = QtWidgets.QCheckBox(name)
+            check.setChecked(True)
+            animals.addWidget(check)
+            self.individuals.append(check)
+        layout.addRow('Individuals', animals)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.StandardButton.Apply |
+                                             QtWidgets.QDialogButtonBox.StandardButton.Cancel)
+        preview = buttons.addButton('Preview', QtWidgets.QDialogButtonBox.ButtonRole.ActionRole)
+        preview.clicked.connect(self.preview_clicked.emit)
+        buttons.button(QtWidgets.QDialogButtonBox.StandardButton.Apply).clicked.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+        self._update_polyorder()
+
+    def _update_polyorder(self):
+        self.polyorder.setEnabled(METHODS[self.method.currentIndex()][0] == 'savgol')
+
+    def parameters(self):
+        """
+        :return: the keyword arguments for CorrectionEngine.smooth and preview_smoothing
+        """
+        window = self.window.value()
+        return {'method': METHODS[self.method.currentIndex()][0],
+                'window': window if window % 2 else window + 1,
+                'polyorder': self.polyorder.value(),
+                'outlier_threshold': self.outlier_threshold.value() or None,
+                'max_gap': self.max_gap.value(),
+                'start': self.start.value(), 'end': self.end.value() + 1,
+                'individuals': [i for i, check in enumerate(self.individuals) if check.isChecked()]}
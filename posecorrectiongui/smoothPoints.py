@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.signal import savgol_filter
+
+from interpolatePoints import interpolate_points
+
+SMOOTHING_METHODS = ['median', 'savgol']
+
+
+def _fill_nearest(rows):
+    # Fill the missing values of each row with the closest value along it, so a filtered value only depends on the
+    # samples within its window and the filters do not spread the missing values. Rows with no values are 0
+    n_frames = rows.shape[1]
+    frames = np.arange(n_frames)
+    missing = np.isnan(rows)
+    before = np.maximum.accumulate(np.where(missing, -1, frames), axis=1)
+    after = np.minimum.accumulate(np.where(missing, n_frames, frames)[:, ::-1], axis=1)[:, ::-1]
+    closest = np.where((before >= 0) & ((after >= n_frames) | (frames - before <= after - frames)), before, after)
+    filled = np.take_along_axis(rows, np.minimum(closest, n_frames - 1), axis=1)
+    filled[missing.all(axis=1)] = 0
+    return filled
+
+
+def _filter_rows(rows, method, window, polyorder):
+    # Filter each row along the frames. The missing values stay missing
+    missing = np.isnan(rows)
+    filled = _fill_nearest(rows) if missing.any() else rows
+    if method == 'median':
+        # One row at a time, as the one dimensional running median of scipy is much quicker than a two dimensional
+        # one. The windows at the ends mirror the values, like rollingStats.rolling_median
+        filtered = np.array([median_filter(row, window, mode='reflect') for row in filled])
+    else:
+        filtered = savgol_filter(filled, window, polyorder, axis=-1)
+    filtered[missing] = np.nan
+    return filtered
+
+
+def filter_columns(columns, method='median', window=7, polyorder=2, processes=None, chunk_columns=4):
+    """
+    Filter each column of an array along its first axis, in chunks of columns across threads. The scipy filters let
+    go of the GIL, so the chunks run on all the cores. The columns are filtered as contiguous rows of frames
+    :param columns: array with the frames along the first axis and a column for each coordinate
+    :param method: 'median' for a running median, 'savgol' for a Savitzky-Golay filter
+    :param window: the number of frames in the window. Odd
+    :param polyorder: the order of the polynomial of the Savitzky-Golay filter
+    :param processes: the number of threads. Uses all cores by default
+    :param chunk_columns: the number of columns filtered at once
+    :return: array with the shape of the columns. The missing values stay missing
+    """
+    if method not in SMOOTHING_METHODS:
+        raise ValueError(f'Unknown smoothing method {method}. Use one of {SMOOTHING_METHODS}')
+    if window < 1 or window % 2 == 0:
+        raise ValueError('The window must be an odd number of frames')
+    if method == 'savgol' and polyorder >= window:
+        raise ValueError('The polynomial order must be less than the window')
+    if len(columns) < window:
+        return np.array(columns, dtype=float)
+    rows = np.ascontiguousarray(np.transpose(columns), dtype=float)
+    filtered = np.empty_like(rows)
+    chunks = [slice(start, start + chunk_columns) for start in range(0, len(rows), chunk_columns)]
+
+    def run(chunk):
+        filtered[chunk] = _filter_rows(rows[chunk], method, window, polyorder)
+
+    with ThreadPoolExecutor(processes or os.cpu_count()) as pool:
+        list(pool.map(run, chunks))
+    return np.ascontiguousarray(filtered.T)
+
+
+def smooth_points(data, method='median', window=7, polyorder=2, outlier_threshold=None, max_gap=0, processes=None):
+    """
+    Remove the jitter of the tracked points in one pass over all the frames: the body points further than the
+    threshold from the running median of their trajectory are removed, the runs of missing frames up to max_gap long
+    are filled by linear interpolation (see interpolatePoints.interpolate_points), and the trajectories are filtered
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param method: 'median' for a running median, 'savgol' for a Savitzky-Golay filter
+    :param window: the number of frames in the window of the filter and of the running median for the outliers. Odd
+    :param polyorder: the order of the polynomial of the Savitzky-Golay filter
+    :param outlier_threshold: the most pixels a body point can be from the running median. No outliers are removed if
+    None
+    :param max_gap: the longest run of missing frames to fill. None fills all of them and 0 none
+    :param processes: the number of threads to filter with. Uses all cores by default
+    :return: the smoothed x and y with shape (frames, individuals, body parts, 2), the boolean array with shape
+    (frames, individuals, body parts) of the outliers removed and the one of the body points filled
+    """
+    points = data[..., :2].astype(float)
+    shape = points.shape
+    outliers = np.zeros(shape[:3], dtype=bool)
+    if outlier_threshold is not None:
+        median = filter_columns(points.reshape((len(points), -1)), 'median', window,
+                                processes=processes).reshape(shape)
+        with np.errstate(invalid='ignore'):
+            outliers = np.hypot(*np.moveaxis(points - median, -1, 0)) > outlier_threshold
+    filled = np.zeros(shape[:3], dtype=bool)
+    if outliers.any() or max_gap != 0:
+        points, filled = interpolate_points(points, outliers, max_gap)
+    smoothed = filter_columns(points.reshape((len(points), -1)), method, window, polyorder, processes)
+    return smoothed.reshape(shape), outliers, filled
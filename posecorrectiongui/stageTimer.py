@@ -0,0 +1,92 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Lightweight timers for the stages of the frame-display and edit paths (seek, decode, plot, resize, ...).
+    Keeps a rolling window of the latest timings per stage for the on-screen overlay and a session log of every
+    timing that can be exported as CSV
+    """
+
+    def __init__(self, window=200):
+        """
+        :param window: the number of latest timings per stage used for the rolling percentiles
+        """
+        self.window = window
+        self.samples = {}
+        self.session_log = []
+
+    @contextmanager
+    def stage(self, name, frame_number=None):
+        """
+        Time the code in the with block and record it under the stage name
+        :param name: the name of the stage e.g. seek, decode, plot
+        :param frame_number: the frame number the stage was run for
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, frame_number)
+
+    def record(self, name, milliseconds, frame_number=None):
+        """
+        Record a timing for a stage
+        :param name: the name of the stage
+        :param milliseconds: how long the stage took
+        :param frame_number: the frame number the stage was run for
+        """
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.window)
+        self.samples[name].append(milliseconds)
+        self.session_log.append((time.time(), frame_number, name, milliseconds))
+
+    def percentiles(self, name):
+        """
+        The rolling p50 and p95 for a stage in milliseconds
+        :param name: the name of the stage
+        :return: p50, p95
+        """
+        samples = sorted(self.samples[name])
+        return _percentile(samples, 50), _percentile(samples, 95)
+
+    def summary_text(self):
+        """
+        Text for the on-screen overlay with the rolling p50/p95 per stage
+        """
+        lines = [f"{'stage':<10}{'p50 ms':>9}{'p95 ms':>9}"]
+        for name in self.samples:
+            p50, p95 = self.percentiles(name)
+            lines.append(f"{name:<10}{p50:>9.2f}{p95:>9.2f}")
+        return '\n'.join(lines)
+
+    def export_csv(self, csv_file):
+        """
+        Save the session log of the timings as a CSV file
+        :param csv_file: the filepath for the CSV file
+        """
+        with open(csv_file, 'w', newline='') as fw:
+            writer = csv.writer(fw)
+            writer.writerow(['timestamp', 'frame_number', 'stage', 'milliseconds'])
+            writer.writerows(self.session_log)
+
+    def log_text(self):
+        """
+        Text with every timing of the session in the order they were recorded e.g. for the start up report
+        """
+        return '\n'.join(f'{name:<28}{milliseconds:>9.1f} ms' for _, _, name, milliseconds in self.session_log)
+
+    def reset(self):
+        self.samples = {}
+        self.session_log = []
+
+
+def _percentile(sorted_samples, q):
+    # Linear interpolation between the closest ranks, like numpy.percentile
+    position = (len(sorted_samples) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
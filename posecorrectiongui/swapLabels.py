@@ -1,5 +1,7 @@
 import pandas as pd
 
+from updateH5file import h5_columns
+
 
 def swap_labels(h5, frame_number, h5_filename):
     """
@@ -15,7 +17,6 @@ def swap_labels(h5, frame_number, h5_filename):
         animal_key = df.keys()[0]
 
     scorer = h5.columns.get_level_values('scorer').unique().item()
-    bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
     individuals = h5.columns.get_level_values('individuals').unique().to_list()
 
     anim1 = h5[scorer][individuals[0]].values
@@ -28,8 +29,7 @@ def swap_labels(h5, frame_number, h5_filename):
     data2[frame_number, :] = anim1[frame_number, :]
 
     data_df = pd.concat((pd.DataFrame(data1), pd.DataFrame(data2)), axis=1, ignore_index=True)
-    col = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, ['x', 'y']],
-                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    col = h5_columns(h5, scorer, individuals)
     data_ind = h5.index
     dataframe = pd.DataFrame(data_df.values, index=data_ind, columns=col)
     dataframe.to_hdf(h5_filename, animal_key)
@@ -50,7 +50,6 @@ def swap_label_sequences(h5, from_frame, to_frame, h5_filename):
         animal_key = df.keys()[0]
 
     scorer = h5.columns.get_level_values('scorer').unique().item()
-    bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
     individuals = h5.columns.get_level_values('individuals').unique().to_list()
 
     anim1 = h5[scorer][individuals[0]].values
@@ -63,8 +62,7 @@ def swap_label_sequences(h5, from_frame, to_frame, h5_filename):
     data2[from_frame:to_frame, :] = anim1[from_frame:to_frame, :]
 
     data_df = pd.concat((pd.DataFrame(data1), pd.DataFrame(data2)), axis=1, ignore_index=True)
-    col = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, ['x', 'y']],
-                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    col = h5_columns(h5, scorer, individuals)
     data_ind = h5.index
     dataframe = pd.DataFrame(data_df.values, index=data_ind, columns=col)
     dataframe.to_hdf(h5_filename, animal_key)
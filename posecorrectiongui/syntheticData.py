@@ -0,0 +1,112 @@
+from pathlib import Path
+import cv2
+import numpy as np
+import pandas as pd
+
+# Position of the body points (in pixels) relative to the center of the animal when it faces right
+body_template = {'Nose': (30, 0), 'leftEar': (20, -6), 'betweenEars': (20, 0), 'rightEar': (20, 6),
+                 'rightMidWaist': (0, 10), 'leftMidWaist': (0, -10), 'leftHip': (-15, -8), 'midHip': (-15, 0),
+                 'rightHip': (-15, 8), 'tailStart': (-25, 0)}
+
+
+def make_synthetic_pose(n_frames, width=640, height=480, individuals=('ind1', 'ind2'), bodyparts=None,
+                        scorer='Stacked_Autoencoder', seed=0, likelihood=False):
+    """
+    Create tracked body points for animals walking around the arena in the DLC MultiIndex format
+    :param n_frames: the number of frames
+    :param width: the width of the video
+    :param height: the height of the video
+    :param individuals: the names of the animals
+    :param bodyparts: the names of the body points. Uses the body points of the config file by default
+    :param scorer: the annotator/scorer of the h5 data
+    :param seed: seed for the random number generator
+    :param likelihood: add a likelihood coord like the maDLC output. About 5% of the body points have a low likelihood
+    :return: the h5 data (not file) with the tracked points
+    """
+    if bodyparts is None:
+        bodyparts = list(body_template.keys())
+    rng = np.random.default_rng(seed)
+
+    # Body points not in the template are placed along the body axis
+    template = np.array([body_template.get(bp, (30 - 55 * i / max(len(bodyparts) - 1, 1), 0))
+                         for i, bp in enumerate(bodyparts)], dtype=float)
+    template *= min(width, height) / 300
+
+    # Smoothed random walk of the center and heading of each animal, reflected at the edges of the arena
+    steps = rng.normal(0, 2, (n_frames, len(individuals), 2)).cumsum(axis=0)
+    start = rng.uniform(0.25, 0.75, (1, len(individuals), 2)) * (width, height)
+    center = start + steps
+    margin = template.max() + 5
+    for axis, size in enumerate((width, height)):
+        span = size - 2 * margin
+        pos = np.mod(center[..., axis] - margin, 2 * span)
+        center[..., axis] = margin + np.where(pos > span, 2 * span - pos, pos)
+    heading = rng.normal(0, 0.05, (n_frames, len(individuals))).cumsum(axis=0)
+
+    cos, sin = np.cos(heading)[..., None], np.sin(heading)[..., None]
+    x = center[..., 0:1] + cos * template[:, 0] - sin * template[:, 1]
+    y = center[..., 1:2] + sin * template[:, 0] + cos * template[:, 1]
+    points = np.stack((x, y), axis=-1)
+    points += rng.normal(0, 0.5, points.shape)
+    coords = ['x', 'y']
+    if likelihood:
+        confidence = np.where(rng.random(x.shape) < 0.05, rng.uniform(0, 0.5, x.shape), rng.uniform(0.9, 1, x.shape))
+        points = np.concatenate((points, confidence[..., None]), axis=-1)
+        coords.append('likelihood')
+
+    col = pd.MultiIndex.from_product([[scorer], list(individuals), list(bodyparts), coords],
+                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    return pd.DataFrame(points.reshape((n_frames, -1)), columns=col)
+
+
+def make_synthetic_video(video_file, h5, width=640, height=480, codec='mp4v', fps=30):
+    """
+    Create a video of the animals (drawn as circles at their body points) for the h5 data
+    :param video_file: the filepath for the video
+    :param h5: the h5 data (not file) with the tracked points
+    :param width: the width of the video
+    :param height: the height of the video
+    :param codec: the fourcc code for the video codec
+    :param fps: the frame rate of the video
+    """
+    writer = cv2.VideoWriter(str(video_file), cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    points = h5.loc[:, h5.columns.get_level_values('coords').isin(['x', 'y'])].values
+    points = points.reshape((len(h5), -1, 2)).astype(np.int32)
+    background = np.tile(np.linspace(40, 120, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+    radius = max(2, min(width, height) // 100)
+    for frame_number in range(len(h5)):
+        image = background.copy()
+        for x, y in points[frame_number]:
+            cv2.circle(image, (int(x), int(y)), radius, (200, 200, 200), -1)
+        cv2.putText(image, str(frame_number), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        writer.write(image)
+    writer.release()
+
+
+def make_synthetic_session(output_path, n_frames, width=640, height=480, codec='mp4v', fps=30,
+                           individuals=('ind1', 'ind2'), bodyparts=None, seed=0, likelihood=False):
+    """
+    Create a video and the matching h5 file for benchmarking. The h5 file is named like the AutoPoseMapper output
+    so the bad tracking files are saved next to it
+    :param output_path: the folder to save the video and h5 file in
+    :param n_frames: the number of frames
+    :param width: the width of the video
+    :param height: the height of the video
+    :param codec: the fourcc code for the video codec
+    :param fps: the frame rate of the video
+    :param individuals: the names of the animals
+    :param bodyparts: the names of the body points
+    :param seed: seed for the random number generator
+    :param likelihood: add a likelihood coord like the maDLC output
+    :return: the filepaths for the video and the h5 file
+    """
+    Path(output_path).mkdir(parents=True, exist_ok=True)
+    name = f'synthetic_{n_frames}_{width}x{height}_{codec}_'
+    video_file = Path(output_path) / f'{name}.avi'
+    h5_file = Path(output_path) / f'{name}CNN_Stacked_Autoencoder.h5'
+
+    h5 = make_synthetic_pose(n_frames, width, height, individuals, bodyparts, seed=seed, likelihood=likelihood)
+    h5.to_hdf(h5_file, key='df_with_missing', format='table')
+    make_synthetic_video(video_file, h5, width, height, codec, fps)
+
+    return str(video_file), str(h5_file)
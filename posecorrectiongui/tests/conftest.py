@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+
+# The modules of the GUI import each other by name, as when it is run from the posecorrectiongui folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+BODYPARTS = ['Nose', 'betweenEars', 'leftMidWaist', 'rightMidWaist', 'midHip', 'tailStart', 'tailEnd']
+SKELETON = [['Nose', 'betweenEars'], ['betweenEars', 'leftMidWaist'], ['betweenEars', 'rightMidWaist'],
+            ['leftMidWaist', 'midHip'], ['rightMidWaist', 'midHip'], ['midHip', 'tailStart']]
+
+
+@pytest.fixture
+def tracked_points():
+    """
+    Two animals walking about, with the shape of the body in BODYPARTS, some body points that jump away for a few
+    frames (the end of the tail of the first animal in frames 400 to 404) and some missing, with shape (frames,
+    individuals, body parts, coords)
+    """
+    rng = np.random.default_rng(0)
+    n_frames = 600
+    shape = np.array([[0, 30], [0, 18], [-8, 5], [8, 5], [0, -15], [0, -25], [0, -40]], dtype=float)
+    centre = 200 + np.cumsum(rng.normal(0, 2, (n_frames, 2, 1, 2)), axis=0)
+    centre[:, 1] += 150
+    xy = centre + shape + rng.normal(0, 1.5, (n_frames, 2, len(BODYPARTS), 2))
+    for frame in rng.choice(n_frames - 10, 12, replace=False):
+        xy[frame:frame + rng.integers(1, 6), rng.integers(2), rng.integers(len(BODYPARTS))] += 80
+    # The end of the tail is not in the skeleton, so its jump is the only reason these frames are flagged
+    xy[400:405, 0, 6] += 80
+    xy[rng.random(xy.shape[:3]) < 0.01] = np.nan
+    likelihood = np.where(np.isnan(xy[..., :1]), 0.0, 0.9)
+    return np.concatenate([xy, likelihood], axis=-1)
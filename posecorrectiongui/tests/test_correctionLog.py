@@ -0,0 +1,117 @@
+import zipfile
+import numpy as np
+
+from conftest import BODYPARTS
+from correctionLog import CorrectionLog, SWAP, RELABEL, REMOVE
+
+INDIVIDUALS = ['ind1', 'ind2']
+
+
+def _correct(log, data):
+    # A round of corrections like in the GUI, each recorded with the points before and after it
+    corrected = data.copy()
+
+    def edit(kind, frames, change):
+        before = corrected[frames, ..., :2].copy()
+        change(corrected)
+        log.record(kind, frames, before, corrected[frames, ..., :2])
+
+    edit(SWAP, np.arange(50, 60), lambda points: points.__setitem__(slice(50, 60), points[50:60, ::-1].copy()))
+    edit(RELABEL, np.array([70]), lambda points: points.__setitem__((70, 0, 1, slice(0, 2)), [120.0, 80.0]))
+    edit(REMOVE, np.array([80]), lambda points: points.__setitem__((80, 1, 3, slice(0, 2)), np.nan))
+    # Moved back to where it was, so it is not a correction
+    edit(RELABEL, np.array([70]), lambda points: points.__setitem__((70, 0, 1, slice(0, 2)), data[70, 0, 1, :2]))
+    return corrected
+
+
+def _assert_same_points(points, other):
+    # The log keeps the points as float32
+    np.testing.assert_allclose(points, other, rtol=0, atol=1e-3)
+
+
+def _assert_same_entries(log, other):
+    for values, other_values in zip(log.entries(), other.entries()):
+        np.testing.assert_array_equal(values, other_values)
+
+
+def test_save_load_replay(tracked_points, tmp_path):
+    log_file = tmp_path / 'mouse1corrections.npz'
+    log = CorrectionLog(INDIVIDUALS, BODYPARTS)
+    corrected = _correct(log, tracked_points)
+    log.save(log_file)
+    assert not log.modified
+
+    loaded = CorrectionLog.load(log_file)
+    _assert_same_entries(loaded, log)
+    frames = loaded.entries()[1]
+    assert set(frames.tolist()) == set(range(50, 60)) | {80}
+
+    # Replayed onto the tracking it was made on, every point is corrected as by hand
+    replayed = tracked_points.copy()
+    result = loaded.replay(replayed, INDIVIDUALS, BODYPARTS, coords=['x', 'y', 'likelihood'])
+    assert set(result['status']) == {'applied'}
+    _assert_same_points(replayed[..., :2], corrected[..., :2])
+    assert (replayed[50:60, ..., 2][~np.isnan(replayed[50:60, ..., 0])] == 1.0).all()
+
+    # and onto its own output there is nothing to do
+    result = loaded.replay(replayed.copy(), INDIVIDUALS, BODYPARTS)
+    assert set(result['status']) == {'already corrected'}
+
+
+def test_replay_small_corrections_once(tracked_points):
+    # A point nudged by less than the tolerance is at both places, and replayed onto the output it is already done
+    log = CorrectionLog(INDIVIDUALS, BODYPARTS)
+    corrected = tracked_points.copy()
+    corrected[90, 0, 0, :2] += 1
+    log.record(RELABEL, [90], tracked_points[[90], ..., :2], corrected[[90], ..., :2])
+    result = log.replay(corrected.copy(), INDIVIDUALS, BODYPARTS, tolerance=2.0)
+    assert result['status'].tolist() == ['already corrected']
+
+
+def test_replay_onto_another_tracking(tracked_points, tmp_path):
+    log_file = tmp_path / 'mouse1corrections.npz'
+    log = CorrectionLog(INDIVIDUALS, BODYPARTS)
+    corrected = _correct(log, tracked_points)
+    log.save(log_file)
+
+    # Another model tracked frame 55 differently and has the individuals in the other order and no tailEnd
+    other = tracked_points[:, ::-1, :-1].copy()
+    other[55, 0, 0, :2] += 50
+    loaded = CorrectionLog.load(log_file, INDIVIDUALS[::-1], BODYPARTS[:-1])
+    result = loaded.replay(other, INDIVIDUALS[::-1], BODYPARTS[:-1])
+
+    conflict = result['status'] == 'conflict'
+    assert result[conflict][['frame', 'individual', 'bodypart']].values.tolist() == [[55, 'ind2', 'Nose']]
+    assert (result['status'][result['bodypart'] == 'tailEnd'] == 'missing').all()
+    applied = (result['status'] == 'applied').to_numpy()
+    assert applied.sum() == len(result) - conflict.sum() - (result['bodypart'] == 'tailEnd').sum()
+    expected = corrected[:, ::-1, :-1, :2].copy()
+    expected[55, 0, 0] = other[55, 0, 0, :2]
+    _assert_same_points(other[..., :2], expected)
+
+
+def test_appended_saves(tracked_points, tmp_path):
+    log_file = tmp_path / 'mouse1corrections.npz'
+    log = CorrectionLog(INDIVIDUALS, BODYPARTS)
+    data = _correct(log, tracked_points)
+    log.save(log_file)
+    # Later edits are appended to the file, including one that moves a corrected point again
+    for frame in [55, 200, 201]:
+        before = data[[frame], ..., :2].copy()
+        data[frame, 0, 0, :2] += 5
+        log.record(RELABEL, [frame], before, data[[frame], ..., :2])
+        log.save(log_file)
+    with zipfile.ZipFile(log_file) as archive:
+        assert 'chunk3_after.npy' in archive.namelist()
+
+    loaded = CorrectionLog.load(log_file)
+    _assert_same_entries(loaded, log)
+    replayed = tracked_points.copy()
+    loaded.replay(replayed, INDIVIDUALS, BODYPARTS)
+    _assert_same_points(replayed[..., :2], data[..., :2])
+
+    # Saved to another file it is written again as a whole, with each point once
+    log.save(tmp_path / 'copy.npz')
+    with zipfile.ZipFile(tmp_path / 'copy.npz') as archive:
+        assert not any(name.startswith('chunk') for name in archive.namelist())
+    _assert_same_entries(CorrectionLog.load(tmp_path / 'copy.npz'), log)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from conftest import BODYPARTS, SKELETON
+from findBadTracking import tracking_features, bad_tracking_mask, skeleton_edge_outliers, keypoint_jumps
+from plotTrackedPoints import create_body_indices
+from trackingFeatures import TrackingFeatures, SHAPE, EDGE, JUMP
+
+
+def _edit(data):
+    # Place the body points again in a few frames and move one away, remove a body point, move the frame the jump at
+    # 400 comes back in so the frames before it are not flagged any more, and swap the animals at the end, like a round
+    # of corrections
+    edited = data.copy()
+    edited[100:110, ..., :2] = np.nan_to_num(data[100:110, ..., :2], nan=200) + 0.5
+    edited[101:103, 0, 0, :2] += 90
+    edited[300, 1, 2, :2] = np.nan
+    edited[405, 0, 6, :2] += 40
+    edited[590:, 1] = data[590:, 0]
+    return edited, np.r_[100:110, 300, 405, 590:600]
+
+
+def _expected(features, data):
+    # The reasons of each frame worked out from scratch, against the baselines of the features
+    arrays = features.arrays
+    area, distances = tracking_features(data, BODYPARTS)
+    shape = bad_tracking_mask(area, distances, (arrays['area_median'], arrays['distance_median'],
+                                                arrays['distance_mad']))
+    edges = skeleton_edge_outliers(data, create_body_indices(BODYPARTS, SKELETON), features.params['edge_threshold'],
+                                   (arrays['edge_median'], arrays['edge_mad']))[0]
+    jumps = keypoint_jumps(data, features.params['jump_threshold'], features.params['max_length'],
+                           baseline=(arrays['displacement_median'], arrays['displacement_mad']))[0]
+    reasons = shape * SHAPE | edges.any(axis=(1, 2)) * EDGE | jumps.any(axis=(1, 2)) * JUMP
+    return reasons.astype(np.uint8), edges, jumps
+
+
+@pytest.mark.parametrize('window', [None, 101])
+@pytest.mark.parametrize('saved', [False, True])
+def test_update_matches_compute(tracked_points, tmp_path, window, saved):
+    features = TrackingFeatures(tmp_path / 'features' if saved else None, BODYPARTS,
+                                create_body_indices(BODYPARTS, SKELETON), window)
+    features.compute(tracked_points)
+    flagged = features.flagged.copy()
+    assert features.arrays['jumps'][400:405, 0, 6].all()
+    edited, frames = _edit(tracked_points)
+
+    changed = features.update(edited, frames)
+
+    reasons, edges, jumps = _expected(features, edited)
+    np.testing.assert_array_equal(features.arrays['reasons'], reasons)
+    np.testing.assert_array_equal(features.edge_flags, edges)
+    np.testing.assert_array_equal(features.arrays['jumps'], jumps)
+    assert not features.arrays['jumps'][401:405, 0, 6].any()
+    np.testing.assert_array_equal(changed, np.setxor1d(flagged, np.flatnonzero(reasons)))
+    assert not len(features.stale_frames(edited))
+
+
+def test_update_keeps_the_baselines(tracked_points):
+    features = TrackingFeatures(None, BODYPARTS, create_body_indices(BODYPARTS, SKELETON))
+    features.compute(tracked_points)
+    baselines = {name: np.copy(features.arrays[name]) for name in ['area_median', 'distance_median', 'distance_mad',
+                                                                   'edge_median', 'edge_mad', 'displacement_median',
+                                                                   'displacement_mad']}
+    edited, frames = _edit(tracked_points)
+    features.update(edited, frames)
+    for name, values in baselines.items():
+        np.testing.assert_array_equal(features.arrays[name], values)
+    assert features.stale_frames(tracked_points).tolist() == frames.tolist()
+
+
+def test_saved_features_load(tracked_points, tmp_path):
+    bpt_indices = create_body_indices(BODYPARTS, SKELETON)
+    features = TrackingFeatures(tmp_path / 'features', BODYPARTS, bpt_indices)
+    flagged = features.compute(tracked_points)
+    edited, frames = _edit(tracked_points)
+    features.update(edited, frames)
+
+    loaded = TrackingFeatures(tmp_path / 'features', BODYPARTS, bpt_indices)
+    assert loaded.load(len(edited))
+    np.testing.assert_array_equal(loaded.flagged, features.flagged)
+    assert not np.array_equal(loaded.flagged, flagged)
+    assert not TrackingFeatures(tmp_path / 'features', BODYPARTS, bpt_indices, window=51).load(len(edited))
@@ -0,0 +1,214 @@
+import json
+import shutil
+from pathlib import Path
+import numpy as np
+
+from findBadTracking import (tracking_features, tracking_baseline, bad_tracking_mask, skeleton_edge_outliers,
+                             keypoint_jumps)
+
+# Why a frame is flagged, as bits: the area of an animal or a distance between body parts (detect_bad_tracking), a
+# skeleton edge with an outlier length, a body point that jumped away
+SHAPE, EDGE, JUMP = 1, 2, 4
+
+_ARRAYS = ['area', 'distances', 'edge_flags', 'jumps', 'reasons', 'checksums', 'area_median', 'distance_median',
+           'distance_mad', 'edge_median', 'edge_mad', 'displacement_median', 'displacement_mad']
+
+
+def frame_checksums(data):
+    """
+    A checksum of the tracked points of each frame, to find the frames changed since the features were worked out e.g.
+    by another program. Each coordinate has its own weight, so swapping individuals or body parts changes it too
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :return: array with the checksum of each frame
+    """
+    points = data[..., :2].reshape((len(data), -1))
+    weights = np.random.default_rng(0).uniform(1, 2, points.shape[1])
+    missing = np.isnan(points)
+    return np.where(missing, 0, points) @ weights + missing @ weights
+
+
+def _at(baseline, frames, ndim):
+    # A rolling baseline has a value for each frame, a baseline over the whole file the same for all of them
+    return tuple(values[frames] if values.ndim == ndim else values for values in baseline)
+
+
+class TrackingFeatures:
+    """
+    The features of each frame that bad tracking is found from: the area of the animals and the distances between
+    body parts (detect_bad_tracking), the skeleton edges with outlier lengths and the body points that jumped away,
+    with the baselines they were scored against and why each frame is flagged. They are kept in memory-mapped files in
+    a folder next to the h5 file, so finding the bad tracking again after a round of corrections only works out the
+    features of the frames edited since (see update) and only writes the pages they are on
+    """
+
+    def __init__(self, folder, bodyparts, bpt_indices, window=None, edge_threshold=3.5, jump_threshold=3.5,
+                 max_length=15):
+        """
+        :param folder: the folder for the files of the features. None to keep them in memory only, e.g. to find the
+        bad tracking of a session loaded in the background without saving anything
+        :param bodyparts: the names of the body parts
+        :param bpt_indices: the skeleton as indices of the body parts (from create_body_indices)
+        :param window: the number of frames for rolling medians and MADs. Over the whole file if None
+        :param edge_threshold: the robust z-score of its length above which a skeleton edge is an outlier
+        :param jump_threshold: the robust z-score of the displacement above which a body point jumped
+        :param max_length: the most frames a body point stays away before the return jump
+        """
+        self.folder = Path(folder) if folder is not None else None
+        self.params = {'bodyparts': list(bodyparts), 'bpt_indices': np.asarray(bpt_indices, dtype=int).tolist(),
+                       'window': window, 'edge_threshold': edge_threshold, 'jump_threshold': jump_threshold,
+                       'max_length': max_length}
+        self.arrays = dict.fromkeys(_ARRAYS)
+
+    @property
+    def flagged(self):
+        """
+        The sorted frame numbers with bad tracking
+        """
+        return np.flatnonzero(self.arrays['reasons'])
+
+    @property
+    def edge_flags(self):
+        """
+        Boolean array with shape (frames, individuals, skeleton edges) of the skeleton edges with outlier lengths. None
+        without a skeleton
+        """
+        return self.arrays['edge_flags']
+
+    @property
+    def edge_baseline(self):
+        """
+        The median and MAD of the skeleton edge lengths the edges are scored against
+        """
+        if self.arrays['edge_median'] is None:
+            return None
+        return self.arrays['edge_median'], self.arrays['edge_mad']
+
+    def compute(self, data):
+        """
+        Work out the features and baselines of all the frames and save them in the folder
+        :param data: the tracked points with shape (frames, individuals, body parts, coords)
+        :return: the sorted frame numbers with bad tracking
+        """
+        window = self.params['window']
+        area, distances = tracking_features(data, self.params['bodyparts'])
+        area_median, distance_median, distance_mad = tracking_baseline(area, distances, window)
+        edge_flags, edge_median, edge_mad = None, None, None
+        if len(self.params['bpt_indices']):
+            edge_flags, (edge_median, edge_mad) = skeleton_edge_outliers(data, self.params['bpt_indices'],
+                                                                         self.params['edge_threshold'], window=window)
+        jumps, (displacement_median, displacement_mad) = keypoint_jumps(data, self.params['jump_threshold'],
+                                                                        self.params['max_length'], window=window)
+        self.arrays = {'area': area, 'distances': distances, 'edge_flags': edge_flags, 'jumps': jumps,
+                       'reasons': np.zeros(len(data), dtype=np.uint8), 'checksums': frame_checksums(data),
+                       'area_median': area_median, 'distance_median': distance_median, 'distance_mad': distance_mad,
+                       'edge_median': edge_median, 'edge_mad': edge_mad, 'displacement_median': displacement_median,
+                       'displacement_mad': displacement_mad}
+        self._classify(slice(None))
+        if self.folder is not None:
+            self._save()
+        return self.flagged
+
+    def _classify(self, frames):
+        # Work out why the frames are flagged from their features
+        arrays = self.arrays
+        # The distance baselines have one more dimension than the area one
+        baseline = (_at((arrays['area_median'],), frames, 2)
+                    + _at((arrays['distance_median'], arrays['distance_mad']), frames, 3))
+        reasons = bad_tracking_mask(arrays['area'][frames], arrays['distances'][frames], baseline) * np.uint8(SHAPE)
+        if arrays['edge_flags'] is not None:
+            reasons |= arrays['edge_flags'][frames].any(axis=(1, 2)) * np.uint8(EDGE)
+        reasons |= arrays['jumps'][frames].any(axis=(1, 2)) * np.uint8(JUMP)
+        arrays['reasons'][frames] = reasons
+
+    def update(self, data, frames):
+        """
+        Work out the features of the edited frames again and score them against the same baselines. The jumps are
+        found again around the edited frames, as far as a body point can stay away
+        :param data: the tracked points with shape (frames, individuals, body parts, coords)
+        :param frames: the sorted frame numbers that were edited
+        :return: the frame numbers that are flagged or not flagged any more
+        """
+        frames = np.asarray(frames, dtype=np.int64)
+        if not len(frames):
+            return frames
+        arrays = self.arrays
+        n_frames, max_length = len(data), self.params['max_length']
+        arrays['area'][frames], arrays['distances'][frames] = tracking_features(data[frames], self.params['bodyparts'])
+        if arrays['edge_flags'] is not None:
+            arrays['edge_flags'][frames] = skeleton_edge_outliers(data[frames], self.params['bpt_indices'],
+                                                                  self.params['edge_threshold'],
+                                                                  _at(self.edge_baseline, frames, 3))[0]
+
+        # The jumps are found in a margin of twice the longest jump around each run of edited frames, and kept within
+        # one. Runs closer than the margin are joined
+        margin = 2 * max_length
+        breaks = np.flatnonzero(np.diff(frames) > 2 * margin) + 1
+        starts = np.maximum(frames[np.r_[0, breaks]] - margin, 0)
+        ends = np.minimum(frames[np.r_[breaks - 1, len(frames) - 1]] + margin + 1, n_frames)
+        if (ends - starts).sum() > n_frames // 4:
+            starts, ends = np.array([0]), np.array([n_frames])
+        displacement_baseline = (arrays['displacement_median'], arrays['displacement_mad'])
+        changed = [frames]
+        for start, end in zip(starts, ends):
+            jumps = keypoint_jumps(data[start:end], self.params['jump_threshold'], max_length,
+                                   baseline=_at(displacement_baseline, slice(start, end - 1), 3))[0]
+            keep_start = start if start == 0 else start + max_length
+            keep_end = end if end == n_frames else end - max_length
+            arrays['jumps'][keep_start:keep_end] = jumps[keep_start - start:keep_end - start]
+            changed.append(np.arange(keep_start, keep_end))
+
+        changed = np.unique(np.concatenate(changed))
+        before = np.zeros(n_frames, dtype=bool)
+        before[changed] = arrays['reasons'][changed] != 0
+        self._classify(changed)
+        arrays['checksums'][frames] = frame_checksums(data[frames])
+        self._flush()
+        return changed[before[changed] != (arrays['reasons'][changed] != 0)]
+
+    def stale_frames(self, data):
+        """
+        The frames whose tracked points changed since their features were worked out
+        :param data: the tracked points with shape (frames, individuals, body parts, coords)
+        :return: the sorted frame numbers
+        """
+        return np.flatnonzero(~np.isclose(frame_checksums(data), self.arrays['checksums'], rtol=1e-12, atol=0))
+
+    def _save(self):
+        if self.folder.exists():
+            shutil.rmtree(self.folder)
+        self.folder.mkdir(parents=True)
+        for name, values in self.arrays.items():
+            if values is not None:
+                np.save(self.folder / f'{name}.npy', values)
+        # Written last, so a folder without it is not used
+        (self.folder / 'params.json').write_text(json.dumps(self.params))
+        self._open()
+
+    def _open(self):
+        self.arrays = {name: np.load(self.folder / f'{name}.npy', mmap_mode='r+')
+                       if (self.folder / f'{name}.npy').exists() else None for name in _ARRAYS}
+
+    def _flush(self):
+        for values in self.arrays.values():
+            if isinstance(values, np.memmap):
+                values.flush()
+
+    def load(self, n_frames):
+        """
+        Open the saved features
+        :param n_frames: the number of frames of the tracked points
+        :return: whether they were saved with the same settings for the same number of frames
+        """
+        if self.folder is None:
+            return False
+        params_file = self.folder / 'params.json'
+        if not params_file.exists() or json.loads(params_file.read_text()) != self.params:
+            return False
+        try:
+            self._open()
+        except (OSError, ValueError):
+            return False
+        if self.arrays['reasons'] is None or len(self.arrays['reasons']) != n_frames:
+            self.arrays = dict.fromkeys(_ARRAYS)
+            return False
+        return True
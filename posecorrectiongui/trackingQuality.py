@@ -0,0 +1,148 @@
+import numpy as np
+
+
+def nan_fraction(data):
+    """
+    The fraction of the body points of all the individuals that are missing in each frame
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :return: array with the fraction for each frame
+    """
+    return np.isnan(data[..., 0]).mean(axis=(1, 2), dtype=np.float32)
+
+
+def swap_likelihood(data):
+    """
+    How likely the identities of the individuals were swapped in each frame compared to the frame before. Compares how
+    far each individual moved from its own body points with how far it is from the body points another individual had
+    in the frame before: 0 when it is closer to its own, 1 when it is only close to the other one
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :return: array with the likelihood for each frame. The first frame is 0
+    """
+    n_frames, n_individuals = data.shape[:2]
+    likelihood = np.zeros(n_frames, dtype=np.float32)
+    if n_individuals < 2 or n_frames < 2:
+        return likelihood
+    # Contiguous (individuals, body parts, frames) arrays for each coordinate, so the sums over the body parts add
+    # whole rows
+    x = np.ascontiguousarray(data[..., 0].transpose(1, 2, 0), dtype=np.float32)
+    y = np.ascontiguousarray(data[..., 1].transpose(1, 2, 0), dtype=np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(n_individuals):
+            same = _mean_distance(x[i, :, 1:], y[i, :, 1:], x[i, :, :-1], y[i, :, :-1])
+            cross = np.full(n_frames - 1, np.inf, dtype=np.float32)
+            for j in range(n_individuals):
+                if j != i:
+                    np.fmin(cross, _mean_distance(x[i, :, 1:], y[i, :, 1:], x[j, :, :-1], y[j, :, :-1]), out=cross)
+            score = (same - cross) / (same + cross)
+            np.fmax(likelihood[1:], np.nan_to_num(score, nan=0.0, posinf=0.0, neginf=0.0).clip(0, 1),
+                    out=likelihood[1:])
+    return likelihood
+
+
+def _mean_distance(x1, y1, x2, y2):
+    # Mean distance between matching body points, ignoring missing ones. NaN when all of them are missing
+    dx, dy = x1 - x2, y1 - y2
+    distance = np.sqrt(dx * dx + dy * dy, out=dx)
+    count = (distance == distance).sum(axis=0)
+    # fmax ignores NaN, so the missing body points add 0
+    total = np.fmax(distance, 0, out=distance).sum(axis=0)
+    return np.divide(total, count, out=np.full(len(total), np.nan, dtype=np.float32), where=count > 0)
+
+
+def uncertain_points(data, coords, pcutoff=0.6):
+    """
+    Which body points have a likelihood below the cutoff (missing body points are not uncertain)
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param coords: the names of the coords e.g. ['x', 'y', 'likelihood']
+    :param pcutoff: the likelihood below which a body point is uncertain
+    :return: boolean array with shape (frames, individuals, body parts). None if there is no likelihood
+    """
+    if 'likelihood' not in coords:
+        return None
+    return data[..., list(coords).index('likelihood')] < pcutoff
+
+
+def frame_scores(data, flagged=None, start=0, end=None):
+    """
+    The tracking quality score of each frame: the worst of being flagged as bad tracking (1), the fraction of missing
+    body points and the swap likelihood. 0 is good and 1 is bad
+    :param data: the tracked points with shape (frames, individuals, body parts, coords)
+    :param flagged: the sorted frame numbers with bad tracking
+    :param start: the first frame number to score
+    :param end: the frame number to stop at (not included). Scores to the end by default
+    :return: array with the score for each frame from start to end
+    """
+    end = len(data) if end is None else min(end, len(data))
+    first = max(start - 1, 0)
+    scores = np.fmax(nan_fraction(data[start:end]), swap_likelihood(data[first:end])[start - first:])
+    if flagged is not None and len(flagged):
+        frames = np.arange(start, end)
+        i = np.searchsorted(flagged, frames).clip(max=len(flagged) - 1)
+        scores[flagged[i] == frames] = 1
+    return scores
+
+
+class ScorePyramid:
+    """
+    The min and max of the frame scores over blocks of 1, 2, 4, 8, ... frames. The worst score of any range of frames
+    is found from the level whose blocks are just smaller than the range, so the quality strip redraws at any zoom by
+    reading about one value per pixel column, even for a million frames
+    """
+
+    def __init__(self, scores):
+        """
+        :param scores: the score of each frame
+        """
+        self.n_frames = len(scores)
+        self.min_levels = [np.asarray(scores, dtype=np.float32)]
+        self.max_levels = [self.min_levels[0]]
+        while len(self.max_levels[-1]) > 1:
+            self.min_levels.append(_reduce_pairs(self.min_levels[-1], np.fmin))
+            self.max_levels.append(_reduce_pairs(self.max_levels[-1], np.fmax))
+
+    def update(self, start, scores):
+        """
+        Replace the scores of a range of frames e.g. after an edit. Only the blocks over the range are recomputed
+        :param start: the first frame number
+        :param scores: the new scores from the first frame number on
+        """
+        end = min(start + len(scores), self.n_frames)
+        self.min_levels[0][start:end] = scores[:end - start]
+        for level in range(1, len(self.max_levels)):
+            start, end = start // 2, (end + 1) // 2
+            for levels, reduce in ((self.min_levels, np.fmin), (self.max_levels, np.fmax)):
+                below = levels[level - 1]
+                block = below[2 * start:2 * end]
+                if len(block) % 2:
+                    block = np.append(block, block[-1])
+                levels[level][start:end] = reduce(block[0::2], block[1::2])
+
+    def columns(self, start, end, n_columns):
+        """
+        The min and max score in each pixel column for a range of frames
+        :param start: the first frame number shown
+        :param end: the frame number to stop at (not included)
+        :param n_columns: the number of pixel columns
+        :return: array with the min and array with the max score of each column
+        """
+        start, end = max(int(start), 0), min(int(end), self.n_frames)
+        if end <= start or n_columns < 1:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        frames_per_column = (end - start) / n_columns
+        level = min(max(int(np.log2(frames_per_column)), 0) if frames_per_column >= 1 else 0,
+                    len(self.max_levels) - 1)
+        frame_edges = (start + np.arange(n_columns + 1) * frames_per_column).astype(np.int64)
+        frame_edges[-1] = end
+        edges = frame_edges[:-1] >> level
+        # The block with the last frame of a column can start before the next column, so it is added to the column
+        last_blocks = (np.maximum(frame_edges[1:], frame_edges[:-1] + 1) - 1) >> level
+        last = -(-end >> level)
+        min_level, max_level = self.min_levels[level], self.max_levels[level]
+        return (np.fmin(np.fmin.reduceat(min_level[:last], edges), min_level[last_blocks]),
+                np.fmax(np.fmax.reduceat(max_level[:last], edges), max_level[last_blocks]))
+
+
+def _reduce_pairs(values, reduce):
+    if len(values) % 2:
+        values = np.append(values, values[-1])
+    return reduce(values[0::2], values[1::2])
@@ -0,0 +1,172 @@
+from PySide6 import QtGui, QtWidgets
+from PySide6.QtCore import QPointF, QRectF, Qt, Signal
+
+from lazyImport import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+decimation = lazy_import('decimation')
+
+# Colours of the individuals, matching the points plotted on the frames: red for individual 1 and blue for 2
+_individual_colours = [(230, 40, 40), (40, 90, 230), (40, 170, 60), (200, 150, 20), (150, 60, 200)]
+# The half windows around the current frame to choose from. None shows the whole video
+WINDOWS = [('± 50 frames', 50), ('± 250 frames', 250), ('± 1000 frames', 1000), ('± 5000 frames', 5000),
+           ('Whole video', None)]
+
+
+class TrajectoryPanel(QtWidgets.QWidget):
+    """
+    Plots the x (top) and y (bottom) traces of the body points of each individual over a window of frames around the
+    current frame, from the tracked points in memory. The traces are decimated to the min and max of each pixel column
+    (see decimation.min_max_decimate) and drawn with OpenCV into an image that is kept until the frames shown or the
+    tracked points change, so drawing takes the same time for 100 frames or the whole video. Click on a trace to go
+    to that frame
+    """
+    frame_clicked = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.data = None
+        self.individuals = []
+        self.bodyparts = []
+        self.bodypart = None
+        self.half_window = WINDOWS[0][1]
+        self.frame_number = 0
+        self.edit_count = 0
+        self._cache_key = None
+        self._traces_image = None
+        self.setMinimumHeight(180)
+
+    def set_data(self, data, individuals, bodyparts):
+        """
+        :param data: the tracked points with shape (frames, individuals, body parts, coords). Not copied, so edits
+        show up after set_frame
+        :param individuals: the names of the individuals
+        :param bodyparts: the names of the body parts
+        """
+        self.data = data
+        self.individuals = list(individuals)
+        self.bodyparts = list(bodyparts)
+        self._cache_key = None
+        self.update()
+
+    def set_frame(self, frame_number, edit_count=0):
+        """
+        :param frame_number: the current frame number
+        :param edit_count: the number of edits made to the tracked points, to know when to plot the traces again
+        """
+        self.frame_number = frame_number
+        self.edit_count = edit_count
+        if self.isVisible():
+            self.update()
+
+    def set_window(self, half_window):
+        """
+        :param half_window: the number of frames to show before and after the current frame. None for the whole video
+        """
+        self.half_window = half_window
+        self.update()
+
+    def set_bodypart(self, bodypart):
+        """
+        :param bodypart: the index of the body part to plot. None for all the body parts
+        """
+        self.bodypart = bodypart
+        self.update()
+
+    def frame_range(self):
+        """
+        The frames shown: the first frame number and the frame number to stop at (not included)
+        """
+        n_frames = len(self.data)
+        if self.half_window is None or 2 * self.half_window + 1 >= n_frames:
+            return 0, n_frames
+        start = min(max(self.frame_number - self.half_window, 0), n_frames - 2 * self.half_window - 1)
+        return start, start + 2 * self.half_window + 1
+
+    def _plot_areas(self):
+        margin = 6
+        height = (self.height() - 3 * margin) / 2
+        width = self.width() - 2 * margin
+        return [QRectF(margin, margin, width, height), QRectF(margin, 2 * margin + height, width, height)]
+
+    def frame_at(self, x):
+        """
+        The frame number at a position on the plots
+        :param x: the x position in pixels
+        """
+        start, end = self.frame_range()
+        area = self._plot_areas()[0]
+        frame_number = start + int((x - area.left()) / max(area.width(), 1) * (end - start))
+        return min(max(frame_number, start), end - 1)
+
+    def _traces(self, start, end, n_columns):
+        # The decimated frame numbers and values of each trace. The traces are ordered by individual, body part and
+        # coordinate
+        bodyparts = slice(None) if self.bodypart is None else slice(self.bodypart, self.bodypart + 1)
+        # All the coords are decimated, as the frames of the tracked points are contiguous in memory
+        positions, values = decimation.min_max_decimate(self.data[start:end, :, bodyparts], n_columns)
+        positions, values = positions[..., :2], values[..., :2]
+        return (positions + start).reshape((len(values), -1)), values.reshape((len(values), -1)), values.shape[2]
+
+    def _draw_traces(self):
+        start, end = self.frame_range()
+        areas = self._plot_areas()
+        frames, values, n_bodyparts = self._traces(start, end, max(int(areas[0].width()), 1))
+        image = np.full((self.height(), self.width(), 3), 30, dtype=np.uint8)
+        for coord, area in enumerate(areas):
+            coord_values = values[:, coord::2]
+            if np.isnan(coord_values).all():
+                continue
+            low, high = np.nanmin(coord_values), np.nanmax(coord_values)
+            scale = area.height() / max(high - low, 1e-6)
+            xs = area.left() + (frames[:, coord::2] - start + 0.5) / (end - start) * area.width()
+            ys = area.bottom() - (coord_values - low) * scale
+            for trace in range(coord_values.shape[1]):
+                individual, bodypart = divmod(trace, n_bodyparts)
+                red, green, blue = _individual_colours[individual % len(_individual_colours)]
+                # Body parts of the same individual get lighter shades of its colour
+                shade = 1 + 0.6 * bodypart / max(n_bodyparts - 1, 1)
+                colour = (min(int(red * shade), 255), min(int(green * shade), 255), min(int(blue * shade), 255))
+                # Missing values split the trace into separate lines. The points have 4 fractional bits (shift=4)
+                valid = ~np.isnan(ys[:, trace])
+                points = np.round(np.stack([xs[:, trace], ys[:, trace]], axis=1) * 16)
+                breaks = np.flatnonzero(np.diff(valid.astype(np.int8))) + 1
+                lines = [points[segment].astype(np.int32) for segment in np.split(np.arange(len(valid)), breaks)
+                         if len(segment) and valid[segment[0]]]
+                cv2.polylines(image, lines, False, colour, 1, cv2.LINE_AA, shift=4)
+        self._traces_image = image
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), QtGui.QColor(30, 30, 30))
+        if self.data is None or len(self.data) == 0:
+            painter.end()
+            return
+        start, end = self.frame_range()
+        key = (start, end, self.width(), self.height(), self.bodypart, self.edit_count, id(self.data))
+        if key != self._cache_key:
+            self._draw_traces()
+            self._cache_key = key
+
+        image = self._traces_image
+        painter.drawImage(0, 0, QtGui.QImage(image.data, image.shape[1], image.shape[0], image.strides[0],
+                                             QtGui.QImage.Format_RGB888))
+
+        painter.setPen(QtGui.QColor(200, 200, 200))
+        areas = self._plot_areas()
+        for name, area in zip(['x', 'y'], areas):
+            painter.drawRect(area)
+            painter.drawText(area.adjusted(4, 2, 0, 0), Qt.AlignLeft | Qt.AlignTop, name)
+        painter.drawText(areas[1].adjusted(4, 0, -4, -2), Qt.AlignLeft | Qt.AlignBottom, str(start))
+        painter.drawText(areas[1].adjusted(4, 0, -4, -2), Qt.AlignRight | Qt.AlignBottom, str(end - 1))
+
+        if start <= self.frame_number < end:
+            x = areas[0].left() + (self.frame_number - start + 0.5) / (end - start) * areas[0].width()
+            painter.setPen(QtGui.QPen(Qt.white, 1, Qt.DashLine))
+            painter.drawLine(QPointF(x, areas[0].top()), QPointF(x, areas[1].bottom()))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.data is not None:
+            self.frame_clicked.emit(self.frame_at(event.position().x()))
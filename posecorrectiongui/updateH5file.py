@@ -1,6 +1,20 @@
 import pandas as pd
 
 
+def h5_columns(h5, scorer, individuals):
+    """
+    The columns of the h5 data in the order the individuals are put together, with all their coords (x, y and
+    likelihood if it is there)
+    :param h5: the H5 data (not the filepath)
+    :param scorer: the scorer of the h5 data
+    :param individuals: the individuals in the order their columns are put together
+    :return: the MultiIndex of the columns
+    """
+    return pd.MultiIndex.from_tuples([(scorer, ind) + column
+                                      for ind in individuals for column in h5[scorer][ind].columns],
+                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+
+
 def update_h5file(new_points, h5, frame_number, h5_filename):
     """
     Update the H5 file with the adjusted relabeled body points
@@ -14,22 +28,25 @@ def update_h5file(new_points, h5, frame_number, h5_filename):
         animal_key = df.keys()[0]
 
     scorer = h5.columns.get_level_values('scorer').unique().item()
-    bodyparts = h5.columns.get_level_values('bodyparts').unique().to_list()
     individuals = h5.columns.get_level_values('individuals').unique().to_list()
 
     data_df = pd.DataFrame()
     for i in range(len(individuals)):
         data = h5[scorer][individuals[i]].values
+        # The new points only have x and y. Body points placed by hand are certain, so their likelihood is 1
+        coords = h5[scorer][individuals[i]].columns.get_level_values('coords')
+        xy, likelihood = coords.isin(['x', 'y']), coords == 'likelihood'
         if len(new_points.keys()) == 2:
-            data[frame_number, :] = new_points[individuals[i]]
+            data[frame_number, xy] = new_points[individuals[i]]
+            data[frame_number, likelihood] = 1.0
         else:
             if individuals[i] in new_points.keys():
-                data[frame_number, :] = new_points[individuals[i]]
+                data[frame_number, xy] = new_points[individuals[i]]
+                data[frame_number, likelihood] = 1.0
         df = pd.DataFrame(data)
         data_df = pd.concat((data_df, df), axis=1, ignore_index=True)
 
-    col = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, ['x', 'y']],
-                                     names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    col = h5_columns(h5, scorer, individuals)
     data_ind = h5.index
     dataframe = pd.DataFrame(data_df.values, index=data_ind, columns=col)
     dataframe.to_hdf(h5_filename, animal_key)